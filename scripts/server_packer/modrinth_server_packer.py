@@ -1,58 +1,209 @@
 import argparse
 import json
+import re
 import os
 import shutil
 import zipfile
 import requests
+import httpx
+import asyncio
 import sys
 import time
 import logging
 import threading
+import socket
+import functools
+import tempfile
+import subprocess
+import hashlib
+import gzip
+import tarfile
+import queue
+import atexit
+import contextlib
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Optional, List, Dict, Any
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, List, Dict, Any, Tuple
 from tqdm import tqdm
 
-# 配置日志
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# 日志
+# 调用线程只负责把日志记录放入队列,格式化和写入由后台线程完成。
+# 并行处理时每个整合包的日志写入各自的文件,全局日志文件只记录整合包之外的内容。
 log_file = "modrinth_server_packer.log"
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    encoding='utf-8',
-    handlers=[
-        logging.FileHandler(log_file, mode='w'),  # 将日志写入文件，每次运行覆盖
-        logging.StreamHandler(sys.stdout)  # 将日志输出到控制台
-    ]
-)
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 logger = logging.getLogger(__name__)
+_log_listener: Optional[QueueListener] = None
+_current_pack_log: contextvars.ContextVar = contextvars.ContextVar("current_pack_log", default=None)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    不在调用线程中格式化日志记录,只标记所属的整合包日志文件。
+    日志参数在后台线程中才会格式化,因此不应传入之后会被修改的对象。
+    """
+
+    def prepare(self, record):
+        record.pack_log = _current_pack_log.get()
+        return record
+
+
+class _GlobalLogFilter(logging.Filter):
+    """只保留不属于任何整合包日志文件的记录。"""
+
+    def filter(self, record):
+        return getattr(record, "pack_log", None) is None
+
+
+class _PackLogRouter(logging.Handler):
+    """将带有整合包日志路径的记录写入对应的文件,收到结束标记后关闭文件。"""
+
+    def __init__(self, formatter, level=logging.INFO):
+        super().__init__()
+        self.setFormatter(formatter)
+        self.record_level = level
+        self._handlers: Dict[str, logging.FileHandler] = {}
+
+    def emit(self, record):
+        path = getattr(record, "pack_log", None)
+        if path is None:
+            return
+        handler = self._handlers.get(path)
+        if handler is None:
+            handler = logging.FileHandler(path, mode="w", encoding="utf-8")
+            handler.setFormatter(self.formatter)
+            self._handlers[path] = handler
+        if record.levelno >= self.record_level:
+            handler.emit(record)
+        if getattr(record, "close_pack_log", False):
+            handler.close()
+            del self._handlers[path]
+
+    def close(self):
+        for handler in self._handlers.values():
+            handler.close()
+        self._handlers.clear()
+        super().close()
+
+
+def setup_logging(level=logging.INFO):
+    """配置基于队列的后台日志: 控制台、全局日志文件 (每次运行覆盖) 和整合包日志文件。"""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.FileHandler(log_file, mode='w', encoding='utf-8')
+    file_handler.addFilter(_GlobalLogFilter())
+    console_handler = logging.StreamHandler(sys.stdout)
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+        handler.setLevel(level)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    # httpx 会为每个请求记录一条 INFO 日志
+    for name in ("httpx", "httpcore", "hpack"):
+        logging.getLogger(name).setLevel(max(level, logging.WARNING))
+    _log_listener = QueueListener(log_queue, file_handler, console_handler, _PackLogRouter(formatter, level),
+                                  respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+
+@contextlib.contextmanager
+def pack_log_context(log_path: str):
+    """在此上下文中 (包括通过 _submit_in_context 提交的线程池任务) 记录的日志写入 log_path。"""
+    os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    token = _current_pack_log.set(log_path)
+    try:
+        yield
+    finally:
+        # 结束标记绕过日志级别检查,确保后台线程能关闭文件
+        record = logger.makeRecord(logger.name, logging.INFO, __file__, 0, "整合包日志结束: %s", (log_path,), None,
+                                   extra={"close_pack_log": True})
+        logger.handle(record)
+        _current_pack_log.reset(token)
+
+
+def _submit_in_context(executor, fn, *args, **kwargs):
+    """向线程池提交任务并保留当前上下文 (例如整合包日志文件)。"""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
 
 # 全局缓存
+# 只保留打包需要的字段: 版本详情 -> project_id,项目详情 -> id/client_side/server_side
 _version_details_cache: Dict[str, Any] = {}
 _project_details_cache: Dict[str, Any] = {}
+VERSION_DETAIL_FIELDS = ("project_id",)
+PROJECT_DETAIL_FIELDS = ("id", "client_side", "server_side")
 _cache_lock = threading.Lock()
 
 def main():
-    # 临时启用调试日志
-    # logging.getLogger().setLevel(logging.DEBUG)
     parser = argparse.ArgumentParser(description="将 Modrinth 整合包打包为 Minecraft 服务器。")
-    parser.add_argument("path", help=".mrpack 文件或包含 .mrpack 文件的目录的路径。")
+    parser.add_argument("path", nargs="?", help=".mrpack 文件或包含 .mrpack 文件的目录的路径。工作节点模式下无需提供。")
     parser.add_argument("--output", "-o", help="输出服务器文件的基础目录。如果未提供,将使用 'output_server/'。对于单个文件,输出将为 'output_server/<modpack_name>'。")
     parser.add_argument("--parallel", "-p", action="store_true", help="并行处理多个整合包 (默认: 顺序)。")
+    parser.add_argument("--coordinator", metavar="HOST:PORT", help="以协调器模式运行: 扫描输入路径并通过 HTTP 向工作节点分发打包任务。")
+    parser.add_argument("--worker", metavar="URL", help="以工作节点模式运行: 从指定协调器 (例如 http://127.0.0.1:8765) 领取并执行打包任务。")
+    parser.add_argument("--max-attempts", type=int, default=3, help="协调器模式下每个整合包的最大尝试次数 (默认: 3)。")
+    parser.add_argument("--job-timeout", type=float, default=3600, help="协调器模式下单个任务的超时秒数,超时后任务会被重新分配 (默认: 3600)。")
+    parser.add_argument("--worker-timeout", type=float, default=60, help="协调器模式下工作节点多少秒未领取任务后视为已停止 (默认: 60)。")
+    parser.add_argument("--memory", "-m", help="服务器堆内存大小,例如 '8G' 或 '6144M'。未提供时使用 4G。")
+    parser.add_argument("--java-version", type=int, help="目标 Java 版本。未提供时根据 Minecraft 版本推断。")
+    parser.add_argument("--cpus", type=int, help="目标机器的 CPU 核心数,用于设置 GC 线程数。未提供时由 JVM 在启动时根据运行机器决定。")
+    parser.add_argument("--large-pages", action="store_true", help="在启动参数中启用大页内存 (需要目标系统已配置大页)。")
+    parser.add_argument("--rules", help="客户端文件排除规则配置文件 (JSON)。未提供时使用内置默认规则。")
+    parser.add_argument("--oci", metavar="DIR", help="将打包结果导出为 OCI 镜像布局到指定目录 (多个整合包共享同一目录以复用相同的层)。")
+    parser.add_argument("--oci-base", metavar="DIR", help="作为基础镜像的 OCI 镜像布局目录 (例如包含 Java 运行时的镜像)。")
+    parser.add_argument("--http2", action="store_true", help="下载时启用 HTTP/2 (需要安装 h2)。")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="日志级别 (默认: INFO)。DEBUG 会记录每个文件的处理结果。")
     args = parser.parse_args()
+    setup_logging(getattr(logging, args.log_level))
+    if args.http2:
+        configure_http_engine(http2=True)
 
     path = args.path
     output_base = args.output
     parallel = args.parallel
+    jvm_options = {
+        "memory": args.memory,
+        "java_version": args.java_version,
+        "cpus": args.cpus,
+        "large_pages": args.large_pages,
+    }
+    if args.memory:
+        try:
+            parse_memory_size(args.memory)
+        except ValueError as e:
+            parser.error(str(e))
+    try:
+        exclusion_rules = ExclusionRules.from_file(args.rules) if args.rules else ExclusionRules.default()
+    except (OSError, ValueError, re.error) as e:
+        parser.error(f"加载排除规则失败: {e}")
+    oci_options = {"layout_dir": args.oci, "base_layout": args.oci_base} if args.oci else None
+    pack_options = {"jvm_options": jvm_options, "exclusion_rules": exclusion_rules, "oci_options": oci_options}
+
+    # 工作节点模式: 任务来自协调器,不需要本地输入路径
+    if args.worker:
+        processed = run_worker(args.worker, output_base, process_func=functools.partial(process_modpack, **pack_options))
+        print(f"\n工作节点已退出,共完成 {processed} 个任务。")
+        return
+
+    if not path:
+        parser.error("需要提供 .mrpack 文件或目录的路径。")
 
     # 判断路径是文件还是目录
     if os.path.isfile(path):
         modpack_files = [path]
     elif os.path.isdir(path):
-        # 递归查找所有 .mrpack 文件
-        modpack_files = []
-        for root, dirs, files in os.walk(path):
-            for file in files:
-                if file.lower().endswith('.mrpack'):
-                    modpack_files.append(os.path.join(root, file))
+        modpack_files = find_modpack_files(path)
         if not modpack_files:
             print(f"错误: 在目录 {path} 中未找到任何 .mrpack 文件。")
             sys.exit(1)
@@ -61,6 +212,19 @@ def main():
         print(f"错误: 路径 '{path}' 不存在。")
         sys.exit(1)
 
+    # 协调器模式: 只负责分发任务,打包工作由工作节点完成
+    if args.coordinator:
+        host, _, port = args.coordinator.rpartition(":")
+        coordinator = PackJobCoordinator(modpack_files, max_attempts=args.max_attempts, job_timeout=args.job_timeout,
+                                         worker_timeout=args.worker_timeout)
+        run_coordinator(coordinator, host or "0.0.0.0", int(port))
+        summary = coordinator.summary()
+        for job in summary["jobs"]:
+            if job["status"] == "failed":
+                print(f"处理 {job['modpack_file']} 时发生错误: {job['error']}")
+        print(f"\n成功处理了 {summary['done']}/{summary['total']} 个整合包。")
+        return
+
     # 处理每个整合包
     success_count = 0
     if parallel:
@@ -71,13 +235,8 @@ def main():
             future_to_file = {}
             for modpack_file in modpack_files:
                 # 确定此整合包的输出目录
-                if output_base:
-                    base_dir = output_base
-                else:
-                    base_dir = "output_server"
-                modpack_name = os.path.splitext(os.path.basename(modpack_file))[0]
-                output_dir = os.path.join(base_dir, modpack_name)
-                future = executor.submit(process_single_modpack, modpack_file, output_dir)
+                output_dir = get_output_dir(modpack_file, output_base)
+                future = executor.submit(process_single_modpack, modpack_file, output_dir, **pack_options)
                 future_to_file[future] = (modpack_file, output_dir)
             
             # 等待所有任务完成
@@ -93,15 +252,10 @@ def main():
         for modpack_file in modpack_files:
             print(f"\n=== 正在处理 {modpack_file} ===")
             # 确定此整合包的输出目录
-            if output_base:
-                base_dir = output_base
-            else:
-                base_dir = "output_server"
-            modpack_name = os.path.splitext(os.path.basename(modpack_file))[0]
-            output_dir = os.path.join(base_dir, modpack_name)
+            output_dir = get_output_dir(modpack_file, output_base)
             print(f"输出目录: {output_dir}")
             try:
-                process_modpack(modpack_file, output_dir)
+                process_modpack(modpack_file, output_dir, **pack_options)
                 success_count += 1
             except Exception as e:
                 print(f"处理 {modpack_file} 时发生错误: {e}")
@@ -109,16 +263,43 @@ def main():
 
     print(f"\n成功处理了 {success_count}/{len(modpack_files)} 个整合包。")
 
-def process_single_modpack(modpack_file, output_dir):
-    """包装器函数，用于并行处理单个整合包，捕获异常。"""
-    try:
-        process_modpack(modpack_file, output_dir)
-    except Exception as e:
-        logger.error(f"处理整合包时发生错误: {e}")
-        raise
+def find_modpack_files(path):
+    """递归查找目录中的所有 .mrpack 文件。"""
+    modpack_files = []
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            if file.lower().endswith('.mrpack'):
+                modpack_files.append(os.path.join(root, file))
+    return modpack_files
+
+def get_output_dir(modpack_file, output_base=None):
+    """返回整合包对应的输出目录: <output_base 或 output_server>/<modpack_name>。"""
+    base_dir = output_base if output_base else "output_server"
+    modpack_name = os.path.splitext(os.path.basename(modpack_file))[0]
+    return os.path.join(base_dir, modpack_name)
+
+def get_pack_log_path(output_dir):
+    """返回整合包日志文件路径: 与输出目录同级的 <modpack_name>.log。"""
+    output_dir = os.path.normpath(output_dir)
+    return os.path.join(os.path.dirname(output_dir), os.path.basename(output_dir) + ".log")
+
+def process_single_modpack(modpack_file, output_dir, **kwargs):
+    """包装器函数，用于并行处理单个整合包，捕获异常。日志写入整合包自己的日志文件。"""
+    with pack_log_context(get_pack_log_path(output_dir)):
+        try:
+            process_modpack(modpack_file, output_dir, **kwargs)
+        except Exception as e:
+            logger.error("处理整合包时发生错误: %s", e)
+            raise
 
-def process_modpack(modpack_file, output_dir):
-    """处理单个整合包文件并生成服务器文件。"""
+def process_modpack(modpack_file, output_dir, jvm_options=None, exclusion_rules=None, oci_options=None):
+    """
+    处理单个整合包文件并生成服务器文件。
+    jvm_options 为传给 build_jvm_profile 的启动参数选项 (memory、java_version、cpus、large_pages)。
+    exclusion_rules 为客户端文件排除规则 (ExclusionRules),未提供时使用默认规则。
+    oci_options 不为空时将结果导出为 OCI 镜像布局 (layout_dir、base_layout)。
+    """
+    exclusion_rules = exclusion_rules or ExclusionRules.default()
     if not os.path.exists(modpack_file):
         raise FileNotFoundError(f"Modpack file not found at {modpack_file}")
 
@@ -126,46 +307,49 @@ def process_modpack(modpack_file, output_dir):
         shutil.rmtree(output_dir)
     os.makedirs(output_dir, exist_ok=True)
 
-    logger.info(f"正在处理整合包: {modpack_file}")
-    logger.info(f"输出目录: {output_dir}")
+    logger.info("正在处理整合包: %s", modpack_file)
+    logger.info("输出目录: %s", output_dir)
 
     # 步骤1: 解压.mrpack文件
     extract_path = os.path.join(output_dir, "extracted_modpack")
     os.makedirs(extract_path, exist_ok=True)
     with zipfile.ZipFile(modpack_file, 'r') as zip_ref:
         zip_ref.extractall(extract_path)
-    logger.info(f"整合包已解压到 {extract_path}")
+    logger.info("整合包已解压到 %s", extract_path)
 
     # 步骤2: 解析modrinth.index.json
     modrinth_index_path = os.path.join(extract_path, "modrinth.index.json")
     if not os.path.exists(modrinth_index_path):
         raise FileNotFoundError(f"在整合包中未找到 modrinth.index.json 文件: {modrinth_index_path}")
 
-    with open(modrinth_index_path, 'r', encoding='utf-8') as f:
-        modrinth_index = json.load(f)
+    modrinth_index = ModrinthIndex.load(modrinth_index_path)
+    dependencies = modrinth_index.dependencies
 
-    game_version = modrinth_index["dependencies"]["minecraft"]
-    logger.info(f"Minecraft版本: {game_version}")
+    game_version = dependencies["minecraft"]
+    logger.info("Minecraft版本: %s", game_version)
 
     # 确定模组加载器
     loader = None
     loader_version = None
-    if "forge" in modrinth_index["dependencies"]:
+    if "forge" in dependencies:
         loader = "forge"
-        loader_version = modrinth_index["dependencies"]["forge"]
-    elif "fabric-loader" in modrinth_index["dependencies"]:
+        loader_version = dependencies["forge"]
+    elif "fabric-loader" in dependencies:
         loader = "fabric"
-        loader_version = modrinth_index["dependencies"]["fabric-loader"]
-    elif "quilt-loader" in modrinth_index["dependencies"]:
+        loader_version = dependencies["fabric-loader"]
+    elif "quilt-loader" in dependencies:
         loader = "quilt"
-        loader_version = modrinth_index["dependencies"]["quilt-loader"]
-    elif "neoforge" in modrinth_index["dependencies"]:
+        loader_version = dependencies["quilt-loader"]
+    elif "neoforge" in dependencies:
         loader = "neoforge"
-        loader_version = modrinth_index["dependencies"]["neoforge"]
+        loader_version = dependencies["neoforge"]
     else:
         raise ValueError("整合包中使用了不支持或未知的模组加载器。")
 
-    logger.info(f"模组加载器: {loader} {loader_version}")
+    logger.info("模组加载器: %s %s", loader, loader_version)
+    if oci_options:
+        # 在下载前检查,避免打包完成后才发现无法导出
+        check_oci_support(loader)
 
     # 步骤3: 下载服务器安装程序
     server_jar_name = install_server(output_dir, game_version, loader, loader_version)
@@ -181,19 +365,19 @@ def process_modpack(modpack_file, output_dir):
     download_tasks = []
     mod_file_hashes = []
     file_hash_to_file_entry = {}
+    excluded_paths = []
 
-    for file_entry in modrinth_index["files"]:
-        path = file_entry["path"]
-        if path.startswith("resourcepacks/") or path.startswith("shaderpacks/") or \
-           (os.sep not in path and (path == "options.txt" or path == "servers.dat" or path == "servers.dat_old")) or \
-           path.startswith("essential/"):
-            logger.info(f"跳过客户端资源或排除的文件/目录: {path}")
+    for file_entry in modrinth_index.files:
+        path = file_entry.path
+        if exclusion_rules.is_excluded(path) or file_entry.env_server == "unsupported":
+            logger.debug("跳过客户端资源或排除的文件/目录: %s", path)
+            excluded_paths.append(path)
             continue
 
         if path.startswith("mods/"):
-            file_hash = file_entry["hashes"].get("sha1") or file_entry["hashes"].get("sha512")
+            file_hash = file_entry.sha1 or file_entry.sha512
             if not file_hash:
-                logger.warning(f"警告: {path} 没有哈希值,跳过")
+                logger.warning("警告: %s 没有哈希值,跳过", path)
                 continue
             mod_file_hashes.append(file_hash)
             file_hash_to_file_entry[file_hash] = file_entry
@@ -201,31 +385,33 @@ def process_modpack(modpack_file, output_dir):
             # 其他文件(configs, scripts等) - 直接下载到输出目录并保留路径
             dest = os.path.join(output_dir, path)
             os.makedirs(os.path.dirname(dest), exist_ok=True)
-            url = file_entry["downloads"][0] if isinstance(file_entry["downloads"], list) else file_entry["downloads"]
-            download_tasks.append((url, dest, path))
+            download_tasks.append((file_entry.url, dest, path))
+
+    if excluded_paths:
+        logger.info("跳过 %s 个客户端资源或排除的文件", len(excluded_paths))
 
     all_project_ids = []
     file_hash_to_project_id = {}
     # 批量获取版本详情
     version_details_map = get_mod_version_details_batch(mod_file_hashes)
-    logger.debug(f"version_details_map keys: {list(version_details_map.keys())}")
     for file_hash in mod_file_hashes:
         version_details = version_details_map.get(file_hash)
-        logger.debug(f"hash {file_hash}: version_details type {type(version_details)} value {version_details}")
         if version_details and version_details.get("project_id"):
             project_id = version_details["project_id"]
             all_project_ids.append(project_id)
             file_hash_to_project_id[file_hash] = project_id
         else:
-            logger.warning(f"警告: 无法获取哈希值为 {file_hash} 的模组的 project_id")
+            logger.warning("警告: 无法获取哈希值为 %s 的模组的 project_id", file_hash)
 
     # 批量获取项目详情
     project_details_cache = get_mods_project_details_batch(all_project_ids)
 
     # 现在,再次遍历模组以确定服务器支持并准备下载任务
+    included_mod_count = 0
+    skipped_mods = []
     for file_hash in mod_file_hashes:
         file_entry = file_hash_to_file_entry[file_hash]
-        path = file_entry["path"]
+        path = file_entry.path
         
         project_id = file_hash_to_project_id.get(file_hash)
         if not project_id:
@@ -235,17 +421,22 @@ def process_modpack(modpack_file, output_dir):
             server_support = get_mod_server_support_from_details(project_details)
 
         if server_support in ["required", "optional"]:
-            url = file_entry["downloads"][0] if isinstance(file_entry["downloads"], list) else file_entry["downloads"]
             filename = os.path.basename(path)
             dest = os.path.join(mods_dir, filename)
-            download_tasks.append((url, dest, filename))
-            logger.info(f"包含模组(服务器支持: {server_support}): {path}")
+            download_tasks.append((file_entry.url, dest, filename))
+            included_mod_count += 1
+            logger.debug("包含模组(服务器支持: %s): %s", server_support, path)
         else:
-            logger.info(f"跳过客户端或不支持的模组(服务器支持: {server_support}): {path}")
+            skipped_mods.append(os.path.basename(path))
+            logger.debug("跳过客户端或不支持的模组(服务器支持: %s): %s", server_support, path)
+
+    logger.info("包含 %s 个模组,跳过 %s 个客户端或不支持的模组", included_mod_count, len(skipped_mods))
+    if skipped_mods:
+        logger.info("跳过的模组: %s", ", ".join(skipped_mods))
 
     # 并行下载并显示进度
     if download_tasks:
-        logger.info(f"正在下载 {len(download_tasks)} 个文件...")
+        logger.info("正在下载 %s 个文件...", len(download_tasks))
         success = download_files_parallel(download_tasks)
         if not success:
             logger.warning("警告: 部分下载失败,但继续执行。")
@@ -255,56 +446,503 @@ def process_modpack(modpack_file, output_dir):
     # 步骤5: 复制覆盖文件,排除客户端资源
     overrides_path = os.path.join(extract_path, "overrides")
     if os.path.exists(overrides_path):
-        logger.info(f"正在将覆盖文件从 {overrides_path} 复制到 {output_dir}")
+        logger.info("正在将覆盖文件从 %s 复制到 %s", overrides_path, output_dir)
+        excluded_overrides = []
         # 定义一个函数来忽略客户端资源目录
         def ignore_client_resources(src, names):
             ignored = set()
             for name in names:
                 full_path = os.path.join(src, name)
-                rel_path = os.path.relpath(full_path, overrides_path)
-                # 跳过任何级别的resourcepacks或shaderpacks目录
-                if (name in ('resourcepacks', 'shaderpacks') and os.path.isdir(full_path)) or \
-                   (rel_path == "options.txt" or rel_path == "servers.dat") or \
-                   (name == 'essential' and os.path.isdir(full_path)):
+                rel_path = os.path.relpath(full_path, overrides_path).replace(os.sep, "/")
+                if exclusion_rules.is_excluded(rel_path, is_dir=os.path.isdir(full_path)):
                     ignored.add(name)
-                    logger.info(f"跳过客户端资源或排除的文件/目录: {rel_path}")
+                    excluded_overrides.append(rel_path)
+                    logger.debug("跳过客户端资源或排除的文件/目录: %s", rel_path)
             return ignored
         shutil.copytree(overrides_path, output_dir, dirs_exist_ok=True, ignore=ignore_client_resources)
+        if excluded_overrides:
+            logger.info("跳过 %s 个客户端资源或排除的覆盖文件/目录: %s", len(excluded_overrides), ", ".join(excluded_overrides))
 
     # 步骤6: 如果有服务器JAR,则创建启动脚本
     if server_jar_name:
-        create_start_script(output_dir, server_jar_name, loader)
+        jvm_profile = build_jvm_profile(game_version, **(jvm_options or {}))
+        create_start_script(output_dir, server_jar_name, loader, jvm_profile, game_version)
+        if oci_options and loader in ("forge", "neoforge"):
+            # 镜像中的服务器必须已经安装,否则每次启动容器都会重新安装
+            run_script = uses_run_script(loader, game_version)
+            run_server_installer(output_dir, server_jar_name, run_script)
+            if not run_script:
+                create_start_script(output_dir, server_jar_name, loader, jvm_profile, game_version, installed=True)
     else:
         logger.info("跳过创建启动脚本,因为没有可用的服务器JAR文件。")
 
     # 步骤7: 清理临时提取目录
     shutil.rmtree(extract_path, ignore_errors=True)
-    logger.info(f"已清理临时提取目录: {extract_path}")
+    logger.info("已清理临时提取目录: %s", extract_path)
+
+    # 步骤8: 导出 OCI 镜像布局
+    if oci_options:
+        image_name = os.path.basename(os.path.normpath(output_dir))
+        manifest_digest = export_oci_image(output_dir, oci_options["layout_dir"], image_name, oci_options.get("base_layout"))
+        logger.info("已导出 OCI 镜像 %s: %s", image_name, manifest_digest)
 
     logger.info("服务器打包完成!")
-    logger.info(f"服务器已准备就绪: {os.path.abspath(output_dir)}")
+    logger.info("服务器已准备就绪: %s", os.path.abspath(output_dir))
+
+
+# ---------------------------------------------------------------------------
+# modrinth.index.json 模型
+#
+# 索引以流式方式解析: files 数组中的条目逐个解码并立即转换为紧凑的 IndexFile,
+# 不保留原始 JSON 对象。
+# ---------------------------------------------------------------------------
+
+INDEX_READ_CHUNK_SIZE = 64 * 1024
+
+
+def _compact(data: Any, fields) -> Any:
+    """只保留 API 响应中指定的字段。"""
+    if not isinstance(data, dict):
+        return data
+    return {field: data.get(field) for field in fields}
+
+
+class IndexFile:
+    """modrinth.index.json 中的单个文件条目 (只保留打包需要的字段)。"""
+
+    __slots__ = ("path", "sha1", "sha512", "url", "size", "env_server")
+
+    def __init__(self, path: str, sha1: Optional[str], sha512: Optional[str], url: Optional[str],
+                 size: Optional[int], env_server: Optional[str]):
+        self.path = path
+        self.sha1 = sha1
+        self.sha512 = sha512
+        self.url = url
+        self.size = size
+        self.env_server = env_server
+
+    @classmethod
+    def from_json(cls, entry: Dict[str, Any]) -> "IndexFile":
+        hashes = entry.get("hashes") or {}
+        downloads = entry.get("downloads")
+        url = downloads[0] if isinstance(downloads, list) and downloads else downloads or None
+        env = entry.get("env") or {}
+        return cls(sys.intern(entry["path"]), hashes.get("sha1"), hashes.get("sha512"), url,
+                   entry.get("fileSize"), env.get("server"))
+
+
+class _JsonStreamReader:
+    """从文件对象中按块读取并逐个解码 JSON 值的简单流式读取器。"""
+
+    def __init__(self, f, chunk_size: int = INDEX_READ_CHUNK_SIZE):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        # 丢弃已消费的部分,保持缓冲区较小
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """跳过空白并返回下一个字符 (不消费)。"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("modrinth.index.json 意外结束")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"modrinth.index.json 格式错误: 期望 '{char}',实际为 '{self.peek()}'")
+        self._pos += 1
+
+    def consume_if(self, char: str) -> bool:
+        if self.peek() == char:
+            self._pos += 1
+            return True
+        return False
+
+    def read_value(self) -> Any:
+        """解码下一个完整的 JSON 值,缓冲区不足时继续读取。"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # 数字等值可能在块边界被截断,确认其后还有内容
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+
+class ModrinthIndex:
+    """modrinth.index.json 的紧凑表示: 依赖字典和 IndexFile 列表。"""
+
+    __slots__ = ("name", "version_id", "dependencies", "files")
+
+    def __init__(self, name: Optional[str], version_id: Optional[str], dependencies: Dict[str, str], files: List[IndexFile]):
+        self.name = name
+        self.version_id = version_id
+        self.dependencies = dependencies
+        self.files = files
+
+    @classmethod
+    def load(cls, path: str) -> "ModrinthIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.parse(f)
+
+    @classmethod
+    def parse(cls, f) -> "ModrinthIndex":
+        """从文件对象流式解析索引,files 数组中的条目逐个解码。"""
+        reader = _JsonStreamReader(f)
+        fields: Dict[str, Any] = {}
+        files: List[IndexFile] = []
+        reader.expect("{")
+        if not reader.consume_if("}"):
+            while True:
+                key = reader.read_value()
+                reader.expect(":")
+                if key == "files":
+                    reader.expect("[")
+                    if not reader.consume_if("]"):
+                        while True:
+                            files.append(IndexFile.from_json(reader.read_value()))
+                            if reader.consume_if("]"):
+                                break
+                            reader.expect(",")
+                else:
+                    fields[key] = reader.read_value()
+                if reader.consume_if("}"):
+                    break
+                reader.expect(",")
+        if "dependencies" not in fields:
+            raise ValueError("modrinth.index.json 缺少 dependencies 字段")
+        return cls(fields.get("name"), fields.get("versionId"), fields["dependencies"], files)
+
+
+# 默认的客户端文件排除规则 (glob)。
+# 以 '/' 结尾的规则匹配整个目录; 以 '**/' 开头的规则匹配任意层级; 其余规则相对于服务器根目录。
+DEFAULT_EXCLUDE_RULES = [
+    # 资源包、光影包和截图
+    "**/resourcepacks/",
+    "**/shaderpacks/",
+    "screenshots/",
+    # 客户端设置与多人游戏服务器列表
+    "options.txt",
+    "optionsof.txt",
+    "optionsshaders.txt",
+    "servers.dat",
+    "servers.dat_old",
+    "config/iris.properties",
+    "config/oculus.properties",
+    "config/sodium-options.json",
+    "config/sodium-mixins.properties",
+    "config/embeddium-options.json",
+    "config/rubidium-options.json",
+    "config/xaerominimap*.txt",
+    "config/xaeroworldmap*.txt",
+    # 模组的客户端缓存和数据
+    "**/essential/",
+    ".bobby/",
+    "journeymap/",
+    "xaero/",
+    "XaeroWaypoints/",
+    "XaeroWorldMap/",
+    "CustomSkinLoader/",
+    "replay_recordings/",
+]
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """将 glob 规则转换为正则表达式 (不含锚点)。'*' 匹配单层路径内的字符, '**' 匹配任意层级。"""
+    pattern = pattern.replace("\\", "/").lstrip("/")
+    if pattern.endswith("/"):
+        # 目录规则: 匹配目录本身 (以 '/' 结尾传入) 及其下所有文件
+        pattern += "**"
+    parts = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif c == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif c == "?":
+            parts.append("[^/]")
+            i += 1
+        else:
+            parts.append(re.escape(c))
+            i += 1
+    return "".join(parts)
+
+
+def _literal_prefix(pattern: str) -> str:
+    """返回 glob 规则中第一个通配符之前的字面前缀。"""
+    pattern = pattern.replace("\\", "/").lstrip("/")
+    match = re.search(r"[*?\[]", pattern)
+    return pattern[:match.start()] if match else pattern
+
+
+class ExclusionRules:
+    """
+    客户端文件排除规则。所有规则在创建时编译为一个排除正则和一个包含正则,
+    路径被排除当且仅当它匹配任一排除规则且不匹配任何包含规则。
+    路径使用 '/' 分隔并相对于服务器根目录; 目录路径以 '/' 结尾传入。
+    """
+
+    _default: Optional["ExclusionRules"] = None
+
+    def __init__(self, exclude: Optional[List[str]] = None, include: Optional[List[str]] = None,
+                 exclude_regex: Optional[List[str]] = None, include_regex: Optional[List[str]] = None):
+        self.exclude = list(exclude or [])
+        self.include = list(include or [])
+        self.exclude_regex = list(exclude_regex or [])
+        self.include_regex = list(include_regex or [])
+        self._exclude_matcher = self._compile(self.exclude, self.exclude_regex)
+        self._include_matcher = self._compile(self.include, self.include_regex)
+        # 包含规则可能命中的目录前缀,用于判断被排除的目录能否整体跳过
+        self._include_prefixes = [_literal_prefix(p) for p in self.include]
+        self._has_include_regex = bool(self.include_regex)
+
+    @staticmethod
+    def _compile(globs: List[str], regexes: List[str]):
+        alternatives = [_glob_to_regex(g) for g in globs] + regexes
+        if not alternatives:
+            return None
+        return re.compile("|".join(f"(?:{a})" for a in alternatives))
+
+    @classmethod
+    def default(cls) -> "ExclusionRules":
+        """返回内置默认规则 (只编译一次)。"""
+        if cls._default is None:
+            cls._default = cls(exclude=DEFAULT_EXCLUDE_RULES)
+        return cls._default
+
+    @classmethod
+    def from_file(cls, path: str) -> "ExclusionRules":
+        """
+        从 JSON 配置文件加载规则。格式:
+        {"use_defaults": true, "exclude": [glob...], "include": [glob...],
+         "exclude_regex": [regex...], "include_regex": [regex...]}
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError(f"排除规则配置必须是 JSON 对象: {path}")
+        exclude = list(DEFAULT_EXCLUDE_RULES) if config.get("use_defaults", True) else []
+        exclude += config.get("exclude", [])
+        return cls(exclude=exclude, include=config.get("include", []),
+                   exclude_regex=config.get("exclude_regex", []), include_regex=config.get("include_regex", []))
+
+    def is_excluded(self, path: str, is_dir: bool = False) -> bool:
+        """判断相对路径是否应从服务器输出中排除。"""
+        if self._exclude_matcher is None:
+            return False
+        path = path.replace("\\", "/").lstrip("/")
+        if is_dir and not path.endswith("/"):
+            path += "/"
+        if not self._exclude_matcher.fullmatch(path):
+            return False
+        if self._include_matcher is not None and self._include_matcher.fullmatch(path):
+            return False
+        if is_dir and self._include_may_match_under(path):
+            # 目录下可能有需要保留的文件,不能整体跳过
+            return False
+        return True
+
+    def _include_may_match_under(self, dir_path: str) -> bool:
+        if self._has_include_regex:
+            return True
+        return any(prefix.startswith(dir_path) or dir_path.startswith(prefix) for prefix in self._include_prefixes)
+
+
+# ---------------------------------------------------------------------------
+# 异步 HTTP 引擎
+#
+# 所有请求都在一个后台事件循环线程中执行,共享按主机复用的长连接池 (可选 HTTP/2)。
+# 同步函数通过 AsyncHttpEngine.run() 提交协程并等待结果;
+# download_files_parallel 在事件循环线程中同时执行数百个下载。
+# ---------------------------------------------------------------------------
+
+HTTP_USER_AGENT = "YuWan886/mc-tools/modrinth_server_packer"
+HTTP_MAX_CONNECTIONS = 256
+HTTP_MAX_CONNECTIONS_PER_HOST = 32
+HTTP_KEEPALIVE_EXPIRY = 30
+HTTP_DOWNLOAD_CONCURRENCY = 128
+HTTP_RETRY_DELAY = 2
+# 下载时累积到该大小再写入文件,写入在线程池中执行,不阻塞事件循环
+HTTP_WRITE_BUFFER_SIZE = 1024 * 1024
+
+_http_engine: Optional["AsyncHttpEngine"] = None
+_http_engine_lock = threading.Lock()
+
+
+async def _run_in_context(coro, context: contextvars.Context):
+    """在事件循环任务中恢复调用方的上下文变量 (例如整合包日志文件) 后执行协程。"""
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+class AsyncHttpEngine:
+    """基于 asyncio 和 httpx 的 HTTP 引擎,在后台线程中运行事件循环并复用连接。"""
+
+    def __init__(self, http2: bool = False, max_connections: int = HTTP_MAX_CONNECTIONS,
+                 max_connections_per_host: int = HTTP_MAX_CONNECTIONS_PER_HOST):
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("未安装 h2,HTTP/2 不可用,将使用 HTTP/1.1 (pip install httpx[http2])")
+                http2 = False
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="http-engine", daemon=True)
+        self._thread.start()
+        self._client = self.run(self._create_client())
+
+    async def _create_client(self):
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections,
+                                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+            timeout=30,
+            follow_redirects=True,
+            headers={"User-Agent": HTTP_USER_AGENT},
+        )
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """在引擎的事件循环中执行协程并阻塞等待结果。"""
+        future = asyncio.run_coroutine_threadsafe(_run_in_context(coro, contextvars.copy_context()), self._loop)
+        return future.result(timeout)
+
+    def _host_slot(self, url) -> asyncio.Semaphore:
+        # 只在事件循环线程中调用,无需加锁
+        host = httpx.URL(url).host
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return slot
+
+    async def request_json(self, method: str, url: str, timeout: float = 30, **kwargs):
+        """发送请求并返回解析后的 JSON。HTTP 错误抛出 httpx.HTTPError,无效 JSON 抛出 ValueError。"""
+        async with self._host_slot(url):
+            response = await self._client.request(method, url, timeout=timeout, **kwargs)
+            response.raise_for_status()
+            return response.json()
+
+    async def download(self, url, dest_path, max_retries: int = 3) -> bool:
+        """下载文件并支持重试。文件读写在线程池中执行,大文件不会阻塞其他传输。"""
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        if isinstance(url, list):
+            url = url[0]
+        for attempt in range(max_retries):
+            try:
+                async with self._host_slot(url):
+                    async with self._client.stream("GET", url) as response:
+                        response.raise_for_status()
+                        f = await asyncio.to_thread(open, dest_path, 'wb')
+                        try:
+                            buffer = bytearray()
+                            async for chunk in response.aiter_bytes(65536):
+                                buffer += chunk
+                                if len(buffer) >= HTTP_WRITE_BUFFER_SIZE:
+                                    data, buffer = buffer, bytearray()
+                                    await asyncio.to_thread(f.write, data)
+                            if buffer:
+                                await asyncio.to_thread(f.write, buffer)
+                        finally:
+                            await asyncio.to_thread(f.close)
+                return True
+            except (httpx.HTTPError, OSError) as e:
+                logger.debug("下载尝试 %s 失败 (URL: %s): %s", attempt + 1, url, e)
+                if attempt == max_retries - 1:
+                    logger.error("所有下载尝试均失败 (URL: %s): %s", url, e)
+                    return False
+                await asyncio.sleep(HTTP_RETRY_DELAY)
+        return False
+
+    async def download_many(self, tasks, concurrency: int, on_done) -> None:
+        """并发下载 (url, dest, name) 任务,每完成一个调用 on_done(task, success)。"""
+        limit = asyncio.Semaphore(concurrency)
+
+        async def run_task(task):
+            async with limit:
+                try:
+                    return task, await self.download(task[0], task[1])
+                except Exception as e:
+                    logger.error("下载 %s 时发生错误: %s", task[2], e)
+                    return task, False
+
+        for next_done in asyncio.as_completed([run_task(task) for task in tasks]):
+            task, success = await next_done
+            on_done(task, success)
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+        self.run(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def configure_http_engine(http2: bool = False, **kwargs) -> "AsyncHttpEngine":
+    """创建 (或替换) 全局 HTTP 引擎。"""
+    global _http_engine
+    with _http_engine_lock:
+        if _http_engine is not None:
+            _http_engine.close()
+        else:
+            atexit.register(_close_http_engine)
+        _http_engine = AsyncHttpEngine(http2=http2, **kwargs)
+        return _http_engine
+
+
+def get_http_engine() -> "AsyncHttpEngine":
+    """返回全局 HTTP 引擎,首次调用时使用默认配置创建。"""
+    global _http_engine
+    with _http_engine_lock:
+        if _http_engine is None:
+            _http_engine = AsyncHttpEngine()
+            atexit.register(_close_http_engine)
+        return _http_engine
+
+
+def _close_http_engine():
+    if _http_engine is not None:
+        _http_engine.close()
 
 
 def download_file(url, dest_path, max_retries=3):
     """下载文件并支持重试"""
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-    if isinstance(url, list):
-        url = url[0]
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(url, stream=True, timeout=30)
-            response.raise_for_status()
-            with open(dest_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=16384):  # 增加 chunk_size
-                    f.write(chunk)
-            return True
-        except Exception as e:
-            logger.debug(f"下载尝试 {attempt + 1} 失败 (URL: {url}): {e}")
-            if attempt == max_retries - 1:
-                logger.error(f"所有下载尝试均失败 (URL: {url}): {e}")
-                return False
-            time.sleep(2)
-    return False
+    engine = get_http_engine()
+    return engine.run(engine.download(url, dest_path, max_retries))
 
 def get_mod_version_details(file_hash):
     """
@@ -317,15 +955,14 @@ def get_mod_version_details(file_hash):
         if file_hash in _version_details_cache:
             return _version_details_cache[file_hash]
     api_url = f"https://api.modrinth.com/v2/version_file/{file_hash}"
+    engine = get_http_engine()
     try:
-        response = requests.get(api_url, timeout=10)
-        response.raise_for_status()
-        details = response.json()
+        details = _compact(engine.run(engine.request_json("GET", api_url, timeout=10)), VERSION_DETAIL_FIELDS)
         with _cache_lock:
             _version_details_cache[file_hash] = details
         return details
-    except requests.exceptions.RequestException as e:
-        logger.error(f"获取哈希值为 {file_hash} 的模组版本详情时发生错误: {e}")
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error("获取哈希值为 %s 的模组版本详情时发生错误: %s", file_hash, e)
         return None
 
 def get_mod_version_details_batch(hashes):
@@ -347,42 +984,35 @@ def get_mod_version_details_batch(hashes):
 
     # 分块请求，每块最多200个哈希
     chunk_size = 200
+    engine = get_http_engine()
     for i in range(0, len(missing), chunk_size):
         chunk = missing[i:i + chunk_size]
         api_url = "https://api.modrinth.com/v2/version_files"
         try:
-            response = requests.post(api_url, json={"hashes": chunk}, timeout=15)
-            response.raise_for_status()
-            data = response.json()  # 可能是列表或字典
-            logger.debug(f"Batch response type: {type(data)}, length: {len(data) if isinstance(data, list) else 'not list'}")
-            if isinstance(data, dict):
-                logger.debug(f"Batch response dict keys: {list(data.keys())}")
-                # 记录第一个键的值以检查类型
-                if data:
-                    first_key = next(iter(data))
-                    logger.debug(f"First value type: {type(data[first_key])}, value: {data[first_key]}")
-            if isinstance(data, list) and data:
-                logger.debug(f"First element type: {type(data[0])}, value: {data[0]}")
+            data = engine.run(engine.request_json("POST", api_url, json={"hashes": chunk}, timeout=15))  # 可能是列表或字典
+            logger.debug("Batch response type: %s, length: %s", type(data).__name__, len(data))
             with _cache_lock:
                 if isinstance(data, dict):
                     # 字典映射哈希 -> 详情
                     for h in chunk:
                         detail = data.get(h)
                         if detail is not None:
+                            detail = _compact(detail, VERSION_DETAIL_FIELDS)
                             _version_details_cache[h] = detail
                             result[h] = detail
                         else:
-                            logger.warning(f"警告: 无法获取哈希值为 {h} 的模组版本详情")
+                            logger.warning("警告: 无法获取哈希值为 %s 的模组版本详情", h)
                 else:
                     # 假设是列表，顺序与请求相同
                     for h, detail in zip(chunk, data):
                         if detail is not None:
+                            detail = _compact(detail, VERSION_DETAIL_FIELDS)
                             _version_details_cache[h] = detail
                             result[h] = detail
                         else:
-                            logger.warning(f"警告: 无法获取哈希值为 {h} 的模组版本详情")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"批量获取版本详情时发生错误: {e}")
+                            logger.warning("警告: 无法获取哈希值为 %s 的模组版本详情", h)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("批量获取版本详情时发生错误: %s", e)
             # 回退到逐个获取
             for h in chunk:
                 detail = get_mod_version_details(h)
@@ -416,7 +1046,7 @@ def get_mods_project_details_batch(project_ids: List[str], chunk_size: int = 100
         return results
 
     total_missing = len(missing_project_ids)
-    logger.info(f"正在从Modrinth API批量获取 {total_missing} 个缺失的项目详情...")
+    logger.info("正在从Modrinth API批量获取 %s 个缺失的项目详情...", total_missing)
 
     # 如果数量小于等于chunk_size,直接单次请求(避免不必要的并发)
     if total_missing <= chunk_size:
@@ -432,12 +1062,12 @@ def get_mods_project_details_batch(project_ids: List[str], chunk_size: int = 100
         chunk = missing_project_ids[i:i + chunk_size]
         chunks.append(chunk)
 
-    logger.info(f"分 {len(chunks)} 个块并发查询...")
+    logger.info("分 %s 个块并发查询...", len(chunks))
 
     failed_chunks = []
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_chunk = {executor.submit(_fetch_project_chunk, chunk): chunk for chunk in chunks}
+        future_to_chunk = {_submit_in_context(executor, _fetch_project_chunk, chunk): chunk for chunk in chunks}
         for future in as_completed(future_to_chunk):
             chunk = future_to_chunk[future]
             try:
@@ -449,12 +1079,12 @@ def get_mods_project_details_batch(project_ids: List[str], chunk_size: int = 100
                 else:
                     failed_chunks.append(chunk)
             except Exception as e:
-                logger.error(f"获取块 {chunk} 时发生错误: {e}")
+                logger.error("获取块 %s 时发生错误: %s", chunk, e)
                 failed_chunks.append(chunk)
 
     # 如果有失败的块,尝试重试(简单重试一次)
     if failed_chunks:
-        logger.warning(f"{len(failed_chunks)} 个块查询失败,正在重试...")
+        logger.warning("%s 个块查询失败,正在重试...", len(failed_chunks))
         for chunk in failed_chunks[:]:  # 复制列表以便修改
             try:
                 chunk_result = _fetch_project_chunk(chunk)
@@ -464,10 +1094,10 @@ def get_mods_project_details_batch(project_ids: List[str], chunk_size: int = 100
                     results.update(chunk_result)
                     failed_chunks.remove(chunk)
             except Exception as e:
-                logger.error(f"重试块 {chunk} 时仍然失败: {e}")
+                logger.error("重试块 %s 时仍然失败: %s", chunk, e)
 
         if failed_chunks:
-            logger.error(f"{len(failed_chunks)} 个块最终失败,将丢失这些项目详情。")
+            logger.error("%s 个块最终失败,将丢失这些项目详情。", len(failed_chunks))
 
     return results
 
@@ -479,26 +1109,21 @@ def _fetch_project_chunk(project_ids: List[str]) -> Dict[str, Any]:
     if not project_ids:
         return {}
     
-    ids_param = json.dumps(project_ids)
-    api_url = f"https://api.modrinth.com/v2/projects?ids={ids_param}"
+    api_url = "https://api.modrinth.com/v2/projects"
+    engine = get_http_engine()
     try:
-        response = requests.get(api_url, timeout=30)
-        response.raise_for_status()
-        projects_data = response.json()
-        return {project["id"]: project for project in projects_data}
-    except requests.exceptions.RequestException as e:
-        logger.error(f"获取块 {project_ids} 时发生错误: {e}")
+        projects_data = engine.run(engine.request_json("GET", api_url, params={"ids": json.dumps(project_ids)}, timeout=30))
+        return {project["id"]: _compact(project, PROJECT_DETAIL_FIELDS) for project in projects_data}
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error("获取块 %s 时发生错误: %s", project_ids, e)
         raise  # 抛出异常供上层处理
 
 def get_mod_server_support_from_details(project_details: Optional[Dict[str, Any]]) -> str:
     """根据项目详情返回 'required'、'optional'、'unsupported' 或 'unknown'。"""
     if not project_details:
         return "unknown"
-    import logging
-    logger = logging.getLogger(__name__)
-    logger.debug(f"project_details type: {type(project_details)}, value: {project_details}")
     if isinstance(project_details, str):
-        logger.error(f"project_details is a string: {project_details}")
+        logger.error("project_details is a string: %s", project_details)
         return "unknown"
 
     client_side = project_details.get("client_side")
@@ -536,23 +1161,22 @@ def install_forge(output_dir, game_version, forge_version):
     # 下载安装程序但不运行它
     installer_url = f"https://maven.minecraftforge.net/net/minecraftforge/forge/{game_version}-{forge_version}/forge-{game_version}-{forge_version}-installer.jar"
     installer_path = os.path.join(output_dir, f"forge-{game_version}-{forge_version}-installer.jar")
-    logger.info(f"正在下载 Forge 安装程序: {installer_url}")
+    logger.info("正在下载 Forge 安装程序: %s", installer_url)
     if not download_file(installer_url, installer_path):
         logger.error("下载 Forge 安装程序失败。")
         return None
 
-    logger.info(f"安装程序已保存为: {os.path.basename(installer_path)}")
+    logger.info("安装程序已保存为: %s", os.path.basename(installer_path))
     return os.path.basename(installer_path)
 
 def install_fabric(output_dir, game_version, fabric_version):
     """下载 Fabric 服务器 JAR。"""
     # 获取最新的 Fabric 安装程序版本
     installer_versions_url = "https://meta.fabricmc.net/v2/versions/installer"
-    logger.info(f"正在从 {installer_versions_url} 获取 Fabric 安装程序版本")
+    logger.info("正在从 %s 获取 Fabric 安装程序版本", installer_versions_url)
+    engine = get_http_engine()
     try:
-        response = requests.get(installer_versions_url, timeout=10)
-        response.raise_for_status()
-        installer_versions = response.json()
+        installer_versions = engine.run(engine.request_json("GET", installer_versions_url, timeout=10))
         if not installer_versions:
             logger.error("错误: 未找到 Fabric 安装程序版本。")
             return None
@@ -561,9 +1185,9 @@ def install_fabric(output_dir, game_version, fabric_version):
         if not latest_installer_version:
             logger.error("错误: 未找到稳定的 Fabric 安装程序版本。")
             return None
-        logger.info(f"最新的 Fabric 安装程序版本: {latest_installer_version}")
-    except requests.exceptions.RequestException as e:
-        logger.error(f"获取 Fabric 安装程序版本时发生错误: {e}")
+        logger.info("最新的 Fabric 安装程序版本: %s", latest_installer_version)
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error("获取 Fabric 安装程序版本时发生错误: %s", e)
         return None
 
     # 使用安装程序版本构建服务器 JAR URL
@@ -571,74 +1195,260 @@ def install_fabric(output_dir, game_version, fabric_version):
     server_jar_name = f"fabric-server-mc.{game_version}-loader.{fabric_version}-installer.{latest_installer_version}.jar"
     server_jar_path = os.path.join(output_dir, server_jar_name)
 
-    logger.info(f"正在从 {server_jar_url} 下载 Fabric 服务器 JAR")
+    logger.info("正在从 %s 下载 Fabric 服务器 JAR", server_jar_url)
     if not download_file(server_jar_url, server_jar_path):
         logger.error("下载 Fabric 服务器 JAR 失败。")
         return None
-    logger.info(f"已下载 Fabric 服务器 JAR: {os.path.basename(server_jar_path)}")
+    logger.info("已下载 Fabric 服务器 JAR: %s", os.path.basename(server_jar_path))
     return os.path.basename(server_jar_path)
 
 def install_quilt(output_dir, game_version, quilt_version):
     """下载 Quilt 安装程序 (不运行)。"""
     installer_url = f"https://maven.quiltmc.org/repository/release/org/quiltmc/quilt-installer/{quilt_version}/quilt-installer-{quilt_version}.jar"
     installer_path = os.path.join(output_dir, f"quilt-installer-{quilt_version}.jar")
-    logger.info(f"正在从 {installer_url} 下载 Quilt 安装程序")
+    logger.info("正在从 %s 下载 Quilt 安装程序", installer_url)
     if not download_file(installer_url, installer_path):
         logger.error("下载 Quilt 安装程序失败。")
         return None
     logger.info("跳过安装程序执行 (用户必须手动运行)。")
-    logger.info(f"安装程序已保存为: {os.path.basename(installer_path)}")
+    logger.info("安装程序已保存为: %s", os.path.basename(installer_path))
     return None
 
 def install_neoforge(output_dir, game_version, neoforge_version):
     """下载 NeoForge 安装程序。"""
     installer_url = f"https://maven.neoforged.net/releases/net/neoforged/neoforge/{neoforge_version}/neoforge-{neoforge_version}-installer.jar"
     installer_path = os.path.join(output_dir, f"neoforge-{neoforge_version}-installer.jar")
-    logger.info(f"正在从 {installer_url} 下载 NeoForge 安装程序")
+    logger.info("正在从 %s 下载 NeoForge 安装程序", installer_url)
     if not download_file(installer_url, installer_path):
         logger.error("下载 NeoForge 安装程序失败。")
         return None
     
-    logger.info(f"安装程序已保存为: {os.path.basename(installer_path)}")
+    logger.info("安装程序已保存为: %s", os.path.basename(installer_path))
     return os.path.basename(installer_path)
 
-def download_files_parallel(tasks, max_workers=10):  # 增加 max_workers
-    """使用进度条并行下载多个文件。"""
+def download_files_parallel(tasks, concurrency=HTTP_DOWNLOAD_CONCURRENCY):
+    """使用进度条并发下载多个文件。所有下载在 HTTP 引擎的事件循环线程中进行。"""
     failed = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_task = {executor.submit(download_file, url, dest): (url, dest, name) for url, dest, name in tasks}
-        
-        for future in tqdm(as_completed(future_to_task), total=len(tasks), desc="下载文件"):
-            url, dest, name = future_to_task[future]
-            try:
-                success = future.result()
-                if success:
-                    logger.info(f"已下载 {name}")
-                else:
-                    logger.warning(f"下载失败 {name}")
-                    failed.append((url, dest, name))
-            except Exception as e:
-                logger.error(f"下载 {name} 时发生错误: {e}")
-                failed.append((url, dest, name))
+    engine = get_http_engine()
+    with tqdm(total=len(tasks), desc="下载文件") as progress:
+        def on_done(task, success):
+            progress.update(1)
+            if success:
+                logger.debug("已下载 %s", task[2])
+            else:
+                logger.warning("下载失败 %s", task[2])
+                failed.append(task)
+
+        engine.run(engine.download_many(tasks, concurrency, on_done))
 
+    logger.info("下载完成: %s/%s 个文件成功", len(tasks) - len(failed), len(tasks))
     if failed:
-        logger.error(f"{len(failed)} 个文件下载失败。")
+        logger.error("%s 个文件下载失败: %s", len(failed), ", ".join(name for url, dest, name in failed))
         return False
     return True
 
-def create_start_script(output_dir, server_jar_name, loader):
-    """为 Windows 和 Linux 创建启动脚本。"""
-    # 根据加载器确定 Java 参数
-    java_args = "-XX:+IgnoreUnrecognizedVMOptions -XX:+UnlockExperimentalVMOptions -Dfile.encoding=UTF-8 -Djava.awt.headless=true -XX:+AlwaysPreTouch -XX:+DisableExplicitGC -XX:MaxDirectMemorySize=1024G -XX:+UseZGC -XX:-ZProactive -XX:ZUncommitDelay=10 -XX:ZFragmentationLimit=5.0"
-    # 根据加载器确定附加参数
-    additional_args = "nogui"
-    if loader == "neoforge" or loader == "forge":
-        additional_args = "--installServer"
-    
-    # Windows 批处理脚本
-    if loader == "neoforge" or loader == "forge":
+# Aikar 的 G1 参数 (https://mcflags.emc.gs),适用于中小堆
+AIKAR_G1_FLAGS = [
+    "-XX:+UseG1GC",
+    "-XX:+ParallelRefProcEnabled",
+    "-XX:MaxGCPauseMillis=200",
+    "-XX:+UnlockExperimentalVMOptions",
+    "-XX:+DisableExplicitGC",
+    "-XX:+AlwaysPreTouch",
+    "-XX:G1HeapWastePercent=5",
+    "-XX:G1MixedGCCountTarget=4",
+    "-XX:G1MixedGCLiveThresholdPercent=90",
+    "-XX:G1RSetUpdatingPauseTimePercent=5",
+    "-XX:SurvivorRatio=32",
+    "-XX:+PerfDisableSharedMem",
+    "-XX:MaxTenuringThreshold=1",
+    "-Dusing.aikars.flags=https://mcflags.emc.gs",
+    "-Daikars.new.flags=true",
+]
+# Aikar 针对小于/大于 12GB 堆给出的两组新生代参数
+AIKAR_G1_SMALL_HEAP_FLAGS = [
+    "-XX:G1NewSizePercent=30",
+    "-XX:G1MaxNewSizePercent=40",
+    "-XX:G1HeapRegionSize=8M",
+    "-XX:G1ReservePercent=20",
+    "-XX:InitiatingHeapOccupancyPercent=15",
+]
+AIKAR_G1_LARGE_HEAP_FLAGS = [
+    "-XX:G1NewSizePercent=40",
+    "-XX:G1MaxNewSizePercent=50",
+    "-XX:G1HeapRegionSize=16M",
+    "-XX:G1ReservePercent=15",
+    "-XX:InitiatingHeapOccupancyPercent=20",
+]
+GENERATIONAL_ZGC_FLAGS = [
+    "-XX:+UseZGC",
+    "-XX:+ZGenerational",
+    "-XX:+AlwaysPreTouch",
+    "-XX:+DisableExplicitGC",
+    "-XX:+PerfDisableSharedMem",
+]
+COMMON_JVM_FLAGS = [
+    "-XX:+IgnoreUnrecognizedVMOptions",
+    "-Dfile.encoding=UTF-8",
+    "-Djava.awt.headless=true",
+]
+# 堆达到此大小 (MB) 时使用 Aikar 的大堆参数,Java 21+ 下改用分代 ZGC
+LARGE_HEAP_THRESHOLD_MB = 12 * 1024
+# 未指定目标内存时使用的堆大小。不读取打包机器的硬件,保证不同机器上的输出一致
+DEFAULT_HEAP_MB = 4096
+
+
+def parse_memory_size(value) -> int:
+    """将 '8G'、'6144M'、'6144' 等格式的内存大小解析为 MB。"""
+    text = str(value).strip().upper().rstrip("B")
+    units = {"K": 1 / 1024, "M": 1, "G": 1024, "T": 1024 * 1024}
+    multiplier = 1
+    if text and text[-1] in units:
+        multiplier = units[text[-1]]
+        text = text[:-1]
+    try:
+        size_mb = int(float(text) * multiplier)
+    except ValueError:
+        raise ValueError(f"无效的内存大小: {value}")
+    if size_mb <= 0:
+        raise ValueError(f"无效的内存大小: {value}")
+    return size_mb
+
+
+def parse_game_version(game_version: str) -> Optional[Tuple[int, int, int]]:
+    """将 '1.20.1' 等正式版本号解析为三元组,快照等非正式版本号返回 None。"""
+    try:
+        parts = [int(p) for p in game_version.split("-")[0].split(".")[:3]]
+    except ValueError:
+        return None
+    parts += [0] * (3 - len(parts))
+    return tuple(parts)
+
+
+def get_required_java_version(game_version: str) -> int:
+    """根据 Minecraft 版本返回所需的 Java 版本。"""
+    version = parse_game_version(game_version)
+    if version is None:
+        # 快照等非正式版本号,按最新要求处理
+        return 21
+    if version >= (1, 20, 5):
+        return 21
+    if version >= (1, 18, 0):
+        return 17
+    if version >= (1, 17, 0):
+        return 16
+    return 8
+
+
+def build_jvm_profile(game_version: str, memory=None, java_version: Optional[int] = None,
+                      cpus: Optional[int] = None, large_pages: bool = False) -> Dict[str, Any]:
+    """
+    根据目标硬件生成 JVM 启动参数配置,结果只取决于参数,与打包机器无关。
+    堆大小取自 memory,未指定时为 DEFAULT_HEAP_MB; 未指定 cpus 时不设置 GC 线程数,由 JVM 在目标机器上启动时决定。
+    Java 21+ 且大堆时使用分代 ZGC,否则使用 Aikar 的 G1 参数。
+    返回字典包含 'java_version'、'heap_mb'、'gc'、'args' (通用参数) 和 'linux_args' (仅 Linux 使用的参数)。
+    """
+    java_version = java_version or get_required_java_version(game_version)
+    heap_mb = parse_memory_size(memory) if memory else DEFAULT_HEAP_MB
+
+    args = [f"-Xms{heap_mb}M", f"-Xmx{heap_mb}M"] + COMMON_JVM_FLAGS
+    linux_args = []
+    if java_version >= 21 and heap_mb >= LARGE_HEAP_THRESHOLD_MB:
+        gc = "zgc"
+        args += GENERATIONAL_ZGC_FLAGS
+        if cpus:
+            args.append(f"-XX:ConcGCThreads={max(1, cpus // 4)}")
+        if large_pages:
+            args.append("-XX:+UseLargePages")
+        else:
+            # ZGC 在 Linux 上可直接使用透明大页,无需预先配置 hugetlbfs
+            linux_args.append("-XX:+UseTransparentHugePages")
+    else:
+        gc = "g1"
+        args += AIKAR_G1_FLAGS
+        args += AIKAR_G1_LARGE_HEAP_FLAGS if heap_mb >= LARGE_HEAP_THRESHOLD_MB else AIKAR_G1_SMALL_HEAP_FLAGS
+        if cpus:
+            args.append(f"-XX:ParallelGCThreads={cpus}")
+            args.append(f"-XX:ConcGCThreads={max(1, (cpus + 2) // 4)}")
+        if large_pages:
+            args.append("-XX:+UseLargePages")
+            args.append("-XX:LargePageSizeInBytes=2M")
+
+    return {
+        "java_version": java_version,
+        "heap_mb": heap_mb,
+        "gc": gc,
+        "args": args,
+        "linux_args": linux_args,
+    }
+
+
+# 运行 Forge/NeoForge 安装程序时的参数,安装程序不需要服务器调优参数
+INSTALLER_JVM_ARGS = ["-Dfile.encoding=UTF-8", "-Djava.awt.headless=true"]
+# 从此版本起 Forge 安装程序生成 run.sh/run.bat 并从 user_jvm_args.txt 读取 JVM 参数
+FORGE_RUN_SCRIPT_VERSION = (1, 17, 0)
+
+
+def uses_run_script(loader: str, game_version: str) -> bool:
+    """安装后的服务器是否由安装程序生成的 run.sh/run.bat 启动。1.17 之前的 Forge 需要直接运行服务器 JAR。"""
+    if loader == "neoforge":
+        return True
+    version = parse_game_version(game_version)
+    return loader == "forge" and (version is None or version >= FORGE_RUN_SCRIPT_VERSION)
+
+
+def create_start_script(output_dir, server_jar_name, loader, jvm_profile=None, game_version="", installed=False):
+    """
+    为 Windows 和 Linux 创建启动脚本。
+    Forge 1.17+ 和 NeoForge 的启动脚本只负责运行安装程序,服务器参数写入 user_jvm_args.txt 供安装后的 run 脚本使用;
+    整合包的覆盖文件中已有 user_jvm_args.txt 时保留整合包作者的参数,不再生成。
+    1.17 之前的 Forge 没有 run 脚本,启动脚本在需要时先运行安装程序,再使用 JVM 参数直接启动服务器 JAR;
+    installed 为 True 时表示安装程序已经运行过,只生成启动部分。
+    """
+    jvm_profile = jvm_profile or build_jvm_profile(game_version)
+    java_args = " ".join(jvm_profile["args"])
+    linux_java_args = " ".join(jvm_profile["args"] + jvm_profile["linux_args"])
+    logger.info("JVM 配置: Java %s, 堆 %sM, GC %s", jvm_profile['java_version'], jvm_profile['heap_mb'], jvm_profile['gc'])
+    installer_args = " ".join(INSTALLER_JVM_ARGS)
+
+    if loader == "forge" and not uses_run_script(loader, game_version):
+        # 安装程序生成的服务器 JAR 名称因版本而异 (forge-<版本>.jar 或 forge-<版本>-universal.jar),启动时查找
+        bat_install = "" if installed else f"""if exist {server_jar_name} (
+    java {installer_args} -jar {server_jar_name} --installServer
+    if errorlevel 1 exit /b 1
+    del /f /q {server_jar_name}
+    del /f /q "{server_jar_name}.log" 2>nul
+    del /f /q "installer.log" 2>nul
+)
+"""
+        sh_install = "" if installed else f"""if [ -f {server_jar_name} ]; then
+    java {installer_args} -jar {server_jar_name} --installServer || exit 1
+    rm -f {server_jar_name} "{server_jar_name}.log" "installer.log"
+fi
+"""
         bat_content = f"""@echo off
-java {java_args} -jar {server_jar_name} {additional_args}
+{bat_install}for %%f in (forge-*.jar) do (
+    echo %%f | findstr /i /c:"-installer.jar" >nul || set SERVER_JAR=%%f
+)
+java {java_args} -jar %SERVER_JAR% nogui
+pause
+"""
+        sh_content = f"""#!/bin/bash
+{sh_install}SERVER_JAR=$(ls forge-*.jar 2>/dev/null | grep -v -- "-installer.jar" | head -n 1)
+exec java {linux_java_args} -jar "$SERVER_JAR" nogui
+"""
+    elif loader == "neoforge" or loader == "forge":
+        user_jvm_args_path = os.path.join(output_dir, "user_jvm_args.txt")
+        if os.path.exists(user_jvm_args_path):
+            logger.info("整合包已包含 user_jvm_args.txt,保留其中的 JVM 参数")
+        else:
+            # run.sh 和 run.bat 共用此文件; 参数中包含 -XX:+IgnoreUnrecognizedVMOptions,Windows 会忽略仅 Linux 使用的参数
+            with open(user_jvm_args_path, "w", encoding="utf-8") as f:
+                f.write("# 由 modrinth_server_packer 根据目标硬件生成\n")
+                f.write("\n".join(jvm_profile["args"] + jvm_profile["linux_args"]) + "\n")
+
+        bat_content = f"""@echo off
+java {installer_args} -jar {server_jar_name} --installServer
 if %ERRORLEVEL% == 0 (
     del /f /q {server_jar_name}
     del /f /q "%~f0"
@@ -646,37 +1456,642 @@ if %ERRORLEVEL% == 0 (
     del /f /q "start.sh" 2>nul
 )
 """
-    else:
-        bat_content = f"""@echo off
-java {java_args} -jar {server_jar_name} {additional_args}
-pause
-"""
-    
-    bat_path = os.path.join(output_dir, "start.bat")
-    with open(bat_path, "w", encoding="utf-8") as f:
-        f.write(bat_content)
-
-    # Linux Shell 脚本
-    if loader == "neoforge" or loader == "forge":
         sh_content = f"""#!/bin/bash
-java {java_args} -jar {server_jar_name} {additional_args}
+java {installer_args} -jar {server_jar_name} --installServer
 if [ $? -eq 0 ]; then
     rm -f {server_jar_name}
     rm -f "$0"
-    del /f /q "installer.log"
+    rm -f "installer.log"
     rm -f "start.bat" 2>/dev/null
 fi
 """
     else:
+        bat_content = f"""@echo off
+java {java_args} -jar {server_jar_name} nogui
+pause
+"""
         sh_content = f"""#!/bin/bash
-java {java_args} -jar {server_jar_name} {additional_args}
+java {linux_java_args} -jar {server_jar_name} nogui
 """
-    
+
+    # Windows 批处理脚本
+    bat_path = os.path.join(output_dir, "start.bat")
+    with open(bat_path, "w", encoding="utf-8") as f:
+        f.write(bat_content)
+
+    # Linux Shell 脚本
     sh_path = os.path.join(output_dir, "start.sh")
     with open(sh_path, "w", encoding="utf-8") as f:
         f.write(sh_content)
     os.chmod(sh_path, 0o755)
 
 
+# ---------------------------------------------------------------------------
+# OCI 镜像导出
+#
+# 服务器文件按变化频率分为 加载器/库、模组、配置/覆盖文件 三层。
+# 层的 tar 内容按路径排序并清除时间戳和属主,相同的文件集合总是产生相同的摘要,
+# 因此共享同一布局目录 (或推送到同一仓库) 的整合包可以复用相同的层。
+# ---------------------------------------------------------------------------
+
+OCI_LAYER_MEDIA_TYPE = "application/vnd.oci.image.layer.v1.tar+gzip"
+OCI_CONFIG_MEDIA_TYPE = "application/vnd.oci.image.config.v1+json"
+OCI_MANIFEST_MEDIA_TYPE = "application/vnd.oci.image.manifest.v1+json"
+OCI_INDEX_MEDIA_TYPE = "application/vnd.oci.image.index.v1+json"
+# 容器内的服务器目录
+OCI_SERVER_ROOT = "server"
+# 层的顺序即镜像中的叠加顺序,越靠后变化越频繁
+OCI_LAYERS = ["loader", "mods", "config"]
+OCI_LOADER_FILES = {"start.sh", "start.bat", "run.sh", "run.bat", "user_jvm_args.txt"}
+# 可以导出 OCI 镜像的加载器。Quilt 的安装程序需要手动运行,没有可直接启动的服务器
+OCI_SUPPORTED_LOADERS = {"fabric", "forge", "neoforge"}
+
+_oci_index_lock = threading.Lock()
+# 布局目录中的锁文件,--parallel 的子进程和同一台机器上的工作节点可能同时更新同一个 index.json
+OCI_INDEX_LOCK_FILENAME = "index.json.lock"
+
+
+@contextlib.contextmanager
+def _oci_layout_lock(layout_dir: str):
+    """独占 OCI 布局的 index.json: 线程锁用于同一进程中的线程,锁文件用于多个进程。"""
+    with _oci_index_lock, open(os.path.join(layout_dir, OCI_INDEX_LOCK_FILENAME), "a+b") as lock_file:
+        if os.name == "nt":
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK 重试约 10 秒后放弃,继续等待其他进程释放
+                    continue
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def check_oci_support(loader: str) -> None:
+    """检查该加载器的服务器能否导出为可直接启动的 OCI 镜像,不能时抛出 ValueError。"""
+    if loader not in OCI_SUPPORTED_LOADERS:
+        raise ValueError(f"不支持为 {loader} 整合包导出 OCI 镜像: 该加载器的服务器需要手动运行安装程序")
+    if loader in ("forge", "neoforge") and shutil.which("java") is None:
+        raise ValueError(f"为 {loader} 整合包导出 OCI 镜像需要在打包时运行安装程序,请先安装 Java 并将其加入 PATH")
+
+
+def run_server_installer(output_dir: str, installer_name: str, run_script: bool = True) -> None:
+    """
+    在打包时运行 Forge/NeoForge 安装程序,使 libraries/ 和 run.sh 写入服务器目录。
+    安装完成后删除安装程序和只负责安装的启动脚本,服务器改用安装程序生成的 run.sh/run.bat 启动。
+    run_script 为 False 时 (1.17 之前的 Forge) 安装程序不生成 run 脚本,只检查服务器 JAR,启动脚本由调用方重新生成。
+    """
+    logger.info("正在运行服务器安装程序: %s", installer_name)
+    result = subprocess.run(["java"] + INSTALLER_JVM_ARGS + ["-jar", installer_name, "--installServer"],
+                            cwd=output_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, errors="replace")
+    logger.debug("安装程序输出:\n%s", result.stdout)
+    if result.returncode != 0:
+        raise RuntimeError(f"服务器安装程序运行失败 (退出码 {result.returncode})")
+    for name in (installer_name, installer_name + ".log", "installer.log", "start.sh", "start.bat"):
+        path = os.path.join(output_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    if not run_script:
+        if not any(name.startswith("forge-") and name.endswith(".jar") for name in os.listdir(output_dir)):
+            raise RuntimeError("安装程序没有生成服务器 JAR,该版本的服务器无法导出为 OCI 镜像")
+    elif not os.path.exists(os.path.join(output_dir, "run.sh")):
+        raise RuntimeError("安装程序没有生成 run.sh,该版本的服务器无法导出为 OCI 镜像")
+
+
+def _oci_command(output_dir: str) -> List[str]:
+    """返回镜像的默认命令: 已安装的 Forge/NeoForge 使用 run.sh,其他加载器使用 start.sh。"""
+    if os.path.exists(os.path.join(output_dir, "run.sh")):
+        return ["sh", "run.sh", "nogui"]
+    start_script = os.path.join(output_dir, "start.sh")
+    if os.path.exists(start_script):
+        with open(start_script, "r", encoding="utf-8") as f:
+            if "--installServer" not in f.read():
+                return ["sh", "start.sh"]
+    raise ValueError("服务器目录中没有可直接启动服务器的脚本 (服务器尚未安装),无法导出 OCI 镜像")
+
+
+def _classify_oci_layer(rel_path: str) -> str:
+    """根据服务器内的相对路径返回文件所属的层。"""
+    top = rel_path.split("/", 1)[0]
+    if top == "mods":
+        return "mods"
+    if top == "libraries" or rel_path in OCI_LOADER_FILES or ("/" not in rel_path and rel_path.endswith(".jar")):
+        return "loader"
+    return "config"
+
+
+class _HashingWriter:
+    """写入底层文件的同时计算 sha256 和字节数。"""
+
+    def __init__(self, fileobj=None):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        if self.fileobj is not None:
+            self.fileobj.write(data)
+        return len(data)
+
+    def flush(self):
+        if self.fileobj is not None:
+            self.fileobj.flush()
+
+
+def _write_oci_blob(layout_dir: str, data: bytes) -> Dict[str, Any]:
+    """将数据写入内容寻址的 blob,返回 {'digest', 'size'}。"""
+    digest = "sha256:" + hashlib.sha256(data).hexdigest()
+    blob_path = os.path.join(layout_dir, "blobs", "sha256", digest.split(":", 1)[1])
+    if not os.path.exists(blob_path):
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        tmp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, blob_path)
+    return {"digest": digest, "size": len(data)}
+
+
+def _write_oci_layer(layout_dir: str, source_dir: str, rel_paths: List[str]) -> Dict[str, Any]:
+    """
+    将文件写成可复现的 tar+gzip 层 blob。
+    返回 {'digest', 'size', 'diff_id'},diff_id 为未压缩 tar 的摘要。
+    """
+    blobs_dir = os.path.join(layout_dir, "blobs", "sha256")
+    os.makedirs(blobs_dir, exist_ok=True)
+    tmp_path = os.path.join(blobs_dir, f"layer.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    # 父目录条目也需要写入 tar,以保证目录权限确定
+    entries = set()
+    for rel_path in rel_paths:
+        entries.add(rel_path)
+        parent = os.path.dirname(rel_path)
+        while parent:
+            entries.add(parent + "/")
+            parent = os.path.dirname(parent)
+
+    with open(tmp_path, "wb") as raw:
+        compressed = _HashingWriter(raw)
+        with gzip.GzipFile(filename="", mode="wb", fileobj=compressed, mtime=0) as gz:
+            uncompressed = _HashingWriter(gz)
+            with tarfile.open(fileobj=uncompressed, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+                for entry in sorted(entries):
+                    is_dir = entry.endswith("/")
+                    rel_path = entry.rstrip("/")
+                    info = tarfile.TarInfo(f"{OCI_SERVER_ROOT}/{rel_path}")
+                    info.mtime = 0
+                    info.uid = info.gid = 0
+                    info.uname = info.gname = ""
+                    if is_dir:
+                        info.type = tarfile.DIRTYPE
+                        info.mode = 0o755
+                        tar.addfile(info)
+                        continue
+                    full_path = os.path.join(source_dir, rel_path)
+                    info.size = os.path.getsize(full_path)
+                    info.mode = 0o755 if os.access(full_path, os.X_OK) else 0o644
+                    with open(full_path, "rb") as f:
+                        tar.addfile(info, f)
+
+    digest = "sha256:" + compressed.sha256.hexdigest()
+    blob_path = os.path.join(blobs_dir, digest.split(":", 1)[1])
+    if os.path.exists(blob_path):
+        # 相同内容的层已存在,直接复用
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, blob_path)
+    return {"digest": digest, "size": compressed.size, "diff_id": "sha256:" + uncompressed.sha256.hexdigest()}
+
+
+def _read_oci_blob(layout_dir: str, digest: str) -> bytes:
+    with open(os.path.join(layout_dir, "blobs", "sha256", digest.split(":", 1)[1]), "rb") as f:
+        return f.read()
+
+
+def _load_oci_base(base_layout: str, layout_dir: str):
+    """读取基础镜像的清单和配置,并将其层复制到目标布局。返回 (layers, config)。"""
+    with open(os.path.join(base_layout, "index.json"), "r", encoding="utf-8") as f:
+        descriptor = json.load(f)["manifests"][0]
+    manifest = json.loads(_read_oci_blob(base_layout, descriptor["digest"]))
+    # 多平台索引: 选择 linux/amd64,否则取第一个
+    if manifest.get("mediaType") == OCI_INDEX_MEDIA_TYPE or "manifests" in manifest:
+        candidates = manifest["manifests"]
+        descriptor = next((m for m in candidates
+                           if m.get("platform", {}).get("os") == "linux"
+                           and m.get("platform", {}).get("architecture") == "amd64"), candidates[0])
+        manifest = json.loads(_read_oci_blob(base_layout, descriptor["digest"]))
+    config = json.loads(_read_oci_blob(base_layout, manifest["config"]["digest"]))
+
+    if os.path.abspath(base_layout) != os.path.abspath(layout_dir):
+        for layer in manifest["layers"]:
+            src = os.path.join(base_layout, "blobs", "sha256", layer["digest"].split(":", 1)[1])
+            dest = os.path.join(layout_dir, "blobs", "sha256", layer["digest"].split(":", 1)[1])
+            if not os.path.exists(dest):
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                shutil.copyfile(src, dest + ".tmp")
+                os.replace(dest + ".tmp", dest)
+    return list(manifest["layers"]), config
+
+
+def export_oci_image(output_dir: str, layout_dir: str, image_name: str, base_layout: Optional[str] = None) -> str:
+    """
+    将服务器目录导出为 OCI 镜像布局,镜像以 image_name 作为引用名写入 index.json。
+    base_layout 为可选的基础镜像布局 (例如 Java 运行时)。返回清单摘要。
+    服务器必须可以直接启动 (Forge/NeoForge 已在打包时安装),否则抛出 ValueError。
+    """
+    command = _oci_command(output_dir)
+    os.makedirs(layout_dir, exist_ok=True)
+    with open(os.path.join(layout_dir, "oci-layout"), "w", encoding="utf-8") as f:
+        json.dump({"imageLayoutVersion": "1.0.0"}, f)
+
+    layer_files: Dict[str, List[str]] = {name: [] for name in OCI_LAYERS}
+    for root, dirs, files in os.walk(output_dir):
+        for file in files:
+            rel_path = os.path.relpath(os.path.join(root, file), output_dir).replace(os.sep, "/")
+            layer_files[_classify_oci_layer(rel_path)].append(rel_path)
+
+    if base_layout:
+        layers, config = _load_oci_base(base_layout, layout_dir)
+    else:
+        layers, config = [], {"architecture": "amd64", "os": "linux", "config": {}, "rootfs": {"type": "layers", "diff_ids": []}}
+    config.setdefault("config", {})
+    config.setdefault("rootfs", {"type": "layers", "diff_ids": []})
+    config.setdefault("history", [])
+
+    for name in OCI_LAYERS:
+        if not layer_files[name]:
+            continue
+        layer = _write_oci_layer(layout_dir, output_dir, layer_files[name])
+        layers.append({"mediaType": OCI_LAYER_MEDIA_TYPE, "digest": layer["digest"], "size": layer["size"]})
+        config["rootfs"]["diff_ids"].append(layer["diff_id"])
+        config["history"].append({"created_by": f"modrinth_server_packer: {name} layer"})
+        logger.info("OCI 层 %s: %s 个文件, %s", name, len(layer_files[name]), layer['digest'])
+
+    config["config"]["WorkingDir"] = f"/{OCI_SERVER_ROOT}"
+    config["config"]["Cmd"] = command
+    config["config"].pop("Entrypoint", None)
+    labels = dict(config["config"].get("Labels") or {})
+    labels["org.opencontainers.image.title"] = image_name
+    config["config"]["Labels"] = labels
+    config_descriptor = _write_oci_blob(layout_dir, json.dumps(config, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+
+    manifest = {
+        "schemaVersion": 2,
+        "mediaType": OCI_MANIFEST_MEDIA_TYPE,
+        "config": {"mediaType": OCI_CONFIG_MEDIA_TYPE, **config_descriptor},
+        "layers": layers,
+    }
+    manifest_descriptor = _write_oci_blob(layout_dir, json.dumps(manifest, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+
+    # 更新 index.json: 同名镜像替换为新清单
+    with _oci_layout_lock(layout_dir):
+        index_path = os.path.join(layout_dir, "index.json")
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        else:
+            index = {"schemaVersion": 2, "mediaType": OCI_INDEX_MEDIA_TYPE, "manifests": []}
+        index["manifests"] = [m for m in index["manifests"]
+                              if m.get("annotations", {}).get("org.opencontainers.image.ref.name") != image_name]
+        index["manifests"].append({
+            "mediaType": OCI_MANIFEST_MEDIA_TYPE,
+            **manifest_descriptor,
+            "annotations": {"org.opencontainers.image.ref.name": image_name},
+        })
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(index_path + ".tmp", index_path)
+
+    return manifest_descriptor["digest"]
+
+
+# ---------------------------------------------------------------------------
+# 分布式打包: 协调器 / 工作节点
+#
+# 协议 (JSON over HTTP):
+#   POST /job                 领取任务。200 返回任务, 204 暂无可分配任务, 410 全部完成
+#   POST /result              回报任务结果与指标
+#   GET  /jobs/<id>/modpack   下载任务对应的 .mrpack 文件
+#   GET  /status              查看所有任务状态
+# ---------------------------------------------------------------------------
+
+class PackJobCoordinator:
+    """
+    维护整合包任务队列,向工作节点分发任务并收集结果。失败的任务优先重新分配给其他存活的工作节点。
+    工作节点在 worker_timeout 秒内领取过任务或正在执行任务时视为存活。
+    """
+
+    def __init__(self, modpack_files, max_attempts=3, job_timeout=3600, worker_timeout=60):
+        self.max_attempts = max_attempts
+        self.job_timeout = job_timeout
+        self.worker_timeout = worker_timeout
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        for i, modpack_file in enumerate(modpack_files, start=1):
+            job_id = str(i)
+            self.jobs[job_id] = {
+                "id": job_id,
+                "modpack_file": modpack_file,
+                "name": os.path.splitext(os.path.basename(modpack_file))[0],
+                "status": "pending",
+                "attempts": 0,
+                "worker": None,
+                "leased_at": None,
+                "failed_workers": [],
+                "error": None,
+                "metrics": None,
+            }
+        # 工作节点ID -> 最近一次领取任务的时间
+        self.workers: Dict[str, float] = {}
+        self.finished = threading.Event()
+        self._lock = threading.Lock()
+        if not self.jobs:
+            self.finished.set()
+
+    def acquire_job(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """为工作节点分配一个任务。全部完成时返回 {"done": True},暂无可分配任务时返回 None。"""
+        with self._lock:
+            self.workers[worker_id] = time.monotonic()
+            self._requeue_expired_jobs()
+            if self.finished.is_set():
+                return {"done": True}
+
+            pending = [job for job in self.jobs.values() if job["status"] == "pending"]
+            # 优先选择该节点未失败过的任务; 没有其他存活节点可以执行时才允许同一节点重试,
+            # 已停止的节点和重启前的旧ID不会让任务一直等待
+            candidates = [job for job in pending if worker_id not in job["failed_workers"]]
+            if not candidates:
+                others = self._live_workers() - {worker_id}
+                candidates = [job for job in pending if others <= set(job["failed_workers"])]
+            if not candidates:
+                return None
+
+            job = candidates[0]
+            job["status"] = "running"
+            job["attempts"] += 1
+            job["worker"] = worker_id
+            job["leased_at"] = time.monotonic()
+            logger.info("任务 %s (%s) 已分配给 %s (第 %s 次尝试)", job['id'], job['name'], worker_id, job['attempts'])
+            return {"id": job["id"], "name": job["name"], "attempt": job["attempts"]}
+
+    def report_result(self, job_id: str, worker_id: str, success: bool,
+                      error: Optional[str] = None, metrics: Optional[Dict[str, Any]] = None) -> bool:
+        """记录任务结果。过期的回报 (任务已超时并被重新分配) 会被忽略并返回 False。"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job or job["status"] != "running" or job["worker"] != worker_id:
+                logger.warning("忽略来自 %s 的过期任务结果: %s", worker_id, job_id)
+                return False
+            if success:
+                job["status"] = "done"
+                job["error"] = None
+                job["metrics"] = metrics
+                logger.info("任务 %s (%s) 由 %s 完成", job_id, job['name'], worker_id)
+            else:
+                self._fail_job(job, error or "未知错误")
+            self._check_finished()
+            return True
+
+    def get_modpack_path(self, job_id: str) -> Optional[str]:
+        job = self.jobs.get(job_id)
+        return job["modpack_file"] if job else None
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            jobs = [
+                {key: job[key] for key in ("id", "modpack_file", "status", "attempts", "worker", "failed_workers", "error", "metrics")}
+                for job in self.jobs.values()
+            ]
+            live_workers = self._live_workers()
+        return {
+            "total": len(jobs),
+            "done": sum(1 for job in jobs if job["status"] == "done"),
+            "failed": sum(1 for job in jobs if job["status"] == "failed"),
+            "workers": sorted(self.workers),
+            "live_workers": sorted(live_workers),
+            "jobs": jobs,
+        }
+
+    def _live_workers(self) -> set:
+        """返回存活的工作节点: 最近领取过任务或正在执行任务。"""
+        now = time.monotonic()
+        live = {worker for worker, last_seen in self.workers.items() if now - last_seen <= self.worker_timeout}
+        live.update(job["worker"] for job in self.jobs.values() if job["status"] == "running")
+        return live
+
+    def _fail_job(self, job: Dict[str, Any], error: str) -> None:
+        job["failed_workers"].append(job["worker"])
+        job["error"] = error
+        job["leased_at"] = None
+        if job["attempts"] >= self.max_attempts:
+            job["status"] = "failed"
+            logger.error("任务 %s (%s) 在 %s 次尝试后最终失败: %s", job['id'], job['name'], job['attempts'], error)
+        else:
+            job["status"] = "pending"
+            logger.warning("任务 %s (%s) 在 %s 上失败,将重新分配: %s", job['id'], job['name'], job['worker'], error)
+
+    def _requeue_expired_jobs(self) -> None:
+        now = time.monotonic()
+        for job in self.jobs.values():
+            if job["status"] == "running" and now - job["leased_at"] > self.job_timeout:
+                self._fail_job(job, f"任务超时 ({self.job_timeout} 秒)")
+        self._check_finished()
+
+    def _check_finished(self) -> None:
+        if all(job["status"] in ("done", "failed") for job in self.jobs.values()):
+            self.finished.set()
+
+
+def _make_coordinator_handler(coordinator: PackJobCoordinator):
+    """创建绑定到指定协调器的 HTTP 请求处理类。"""
+
+    class CoordinatorHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug("协调器请求: " + format, *args)
+
+        def _send_json(self, status, payload=None):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_POST(self):
+            try:
+                payload = self._read_json()
+            except ValueError:
+                self._send_json(400, {"error": "invalid json"})
+                return
+            worker_id = payload.get("worker")
+            if not worker_id:
+                self._send_json(400, {"error": "missing worker"})
+                return
+
+            if self.path == "/job":
+                job = coordinator.acquire_job(worker_id)
+                if job is None:
+                    self._send_json(204)
+                elif job.get("done"):
+                    self._send_json(410, {"done": True})
+                else:
+                    self._send_json(200, job)
+            elif self.path == "/result":
+                accepted = coordinator.report_result(
+                    str(payload.get("id")), worker_id, bool(payload.get("success")),
+                    payload.get("error"), payload.get("metrics"))
+                self._send_json(200 if accepted else 409, {"accepted": accepted})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_GET(self):
+            if self.path == "/status":
+                self._send_json(200, coordinator.summary())
+                return
+            parts = self.path.strip("/").split("/")
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "modpack":
+                modpack_path = coordinator.get_modpack_path(parts[1])
+                if not modpack_path or not os.path.isfile(modpack_path):
+                    self._send_json(404, {"error": "modpack not found"})
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/zip")
+                self.send_header("Content-Length", str(os.path.getsize(modpack_path)))
+                self.end_headers()
+                with open(modpack_path, "rb") as f:
+                    shutil.copyfileobj(f, self.wfile)
+                return
+            self._send_json(404, {"error": "not found"})
+
+    return CoordinatorHandler
+
+
+def start_coordinator(coordinator: PackJobCoordinator, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """在后台线程中启动协调器 HTTP 服务,返回服务器对象 (port 为 0 时自动选择端口)。"""
+    server = ThreadingHTTPServer((host, port), _make_coordinator_handler(coordinator))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_coordinator(coordinator: PackJobCoordinator, host: str, port: int) -> None:
+    """启动协调器并阻塞,直到所有任务完成或最终失败。"""
+    server = start_coordinator(coordinator, host, port)
+    bound_host, bound_port = server.server_address[:2]
+    print(f"协调器已启动: http://{bound_host}:{bound_port} ,共 {len(coordinator.jobs)} 个任务,等待工作节点连接...")
+    try:
+        # 定期唤醒以便检查超时任务
+        while not coordinator.finished.wait(timeout=5):
+            with coordinator._lock:
+                coordinator._requeue_expired_jobs()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_worker(coordinator_url: str, output_base: Optional[str] = None, worker_id: Optional[str] = None,
+               poll_interval: float = 2.0, max_connection_failures: int = 3, process_func=None) -> int:
+    """
+    以工作节点身份循环领取并执行打包任务,直到协调器报告全部完成或无法连接。
+    返回本节点成功完成的任务数。
+    """
+    coordinator_url = coordinator_url.rstrip("/")
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+    process_func = process_func or process_modpack
+    session = requests.Session()
+    completed = 0
+    connection_failures = 0
+    logger.info("工作节点 %s 已启动,协调器: %s", worker_id, coordinator_url)
+
+    while True:
+        try:
+            response = session.post(f"{coordinator_url}/job", json={"worker": worker_id}, timeout=30)
+        except requests.exceptions.RequestException as e:
+            connection_failures += 1
+            if connection_failures >= max_connection_failures:
+                logger.info("无法连接协调器,工作节点退出: %s", e)
+                break
+            time.sleep(poll_interval)
+            continue
+        connection_failures = 0
+
+        if response.status_code == 410:
+            logger.info("协调器报告所有任务已完成,工作节点退出。")
+            break
+        if response.status_code == 204:
+            time.sleep(poll_interval)
+            continue
+        response.raise_for_status()
+
+        job = response.json()
+        result = _run_worker_job(session, coordinator_url, job, output_base, process_func)
+        result["worker"] = worker_id
+        for attempt in range(max_connection_failures):
+            try:
+                session.post(f"{coordinator_url}/result", json=result, timeout=30)
+                break
+            except requests.exceptions.RequestException as e:
+                logger.warning("回报任务 %s 结果失败 (第 %s 次): %s", job['id'], attempt + 1, e)
+                time.sleep(poll_interval)
+        if result["success"]:
+            completed += 1
+
+    session.close()
+    return completed
+
+
+def _run_worker_job(session, coordinator_url, job, output_base, process_func) -> Dict[str, Any]:
+    """下载任务的 .mrpack 文件并在本地打包,返回结果和指标。"""
+    output_dir = get_output_dir(job["name"] + ".mrpack", output_base)
+    start = time.monotonic()
+    logger.info("开始任务 %s: %s -> %s", job['id'], job['name'], output_dir)
+    try:
+        with tempfile.TemporaryDirectory(prefix="mrpack_job_") as tmp_dir:
+            modpack_file = os.path.join(tmp_dir, job["name"] + ".mrpack")
+            with session.get(f"{coordinator_url}/jobs/{job['id']}/modpack", stream=True, timeout=60) as response:
+                response.raise_for_status()
+                with open(modpack_file, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=65536):
+                        f.write(chunk)
+            process_func(modpack_file, output_dir)
+        return {"id": job["id"], "success": True, "metrics": _collect_output_metrics(output_dir, time.monotonic() - start)}
+    except Exception as e:
+        logger.error("任务 %s (%s) 失败: %s", job['id'], job['name'], e)
+        return {"id": job["id"], "success": False, "error": str(e),
+                "metrics": {"duration_seconds": round(time.monotonic() - start, 3)}}
+
+
+def _collect_output_metrics(output_dir, duration) -> Dict[str, Any]:
+    """统计输出目录的文件数、模组数和总大小。"""
+    file_count = 0
+    total_bytes = 0
+    for root, dirs, files in os.walk(output_dir):
+        for file in files:
+            file_count += 1
+            total_bytes += os.path.getsize(os.path.join(root, file))
+    mods_dir = os.path.join(output_dir, "mods")
+    mod_count = len(os.listdir(mods_dir)) if os.path.isdir(mods_dir) else 0
+    return {
+        "duration_seconds": round(duration, 3),
+        "file_count": file_count,
+        "mod_count": mod_count,
+        "output_bytes": total_bytes,
+    }
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,275 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import modrinth_server_packer as packer
+
+
+def _make_modpacks(directory, count):
+    """创建 count 个占位 .mrpack 文件 (内容不会被解析)。"""
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"pack{i}.mrpack")
+        with open(path, "wb") as f:
+            f.write(b"PK" + bytes([i]) * 1024)
+        paths.append(path)
+    return paths
+
+
+class _FileHandler(BaseHTTPRequestHandler):
+    payload = os.urandom(3 * 1024 * 1024 + 123)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.payload)))
+        self.end_headers()
+        self.wfile.write(self.payload)
+
+
+class AsyncHttpEngineTest(unittest.TestCase):
+    def test_download_many_writes_complete_files(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _FileHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        engine = packer.AsyncHttpEngine()
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                url = "http://127.0.0.1:%s/file" % server.server_address[1]
+                tasks = [(url, os.path.join(tmp_dir, "mods", f"{i}.jar"), f"{i}.jar") for i in range(4)]
+                results = []
+                engine.run(engine.download_many(tasks, 4, lambda task, success: results.append(success)))
+                self.assertEqual(results, [True] * 4)
+                for _, dest, _ in tasks:
+                    with open(dest, "rb") as f:
+                        self.assertEqual(f.read(), _FileHandler.payload)
+        finally:
+            engine.close()
+            server.shutdown()
+            server.server_close()
+
+
+class JvmProfileTest(unittest.TestCase):
+    def test_default_profile_does_not_depend_on_host(self):
+        profile = packer.build_jvm_profile("1.20.1")
+        self.assertEqual(profile["heap_mb"], packer.DEFAULT_HEAP_MB)
+        self.assertIn(f"-Xmx{packer.DEFAULT_HEAP_MB}M", profile["args"])
+        self.assertFalse([arg for arg in profile["args"] if "GCThreads" in arg])
+
+    def test_target_cpus_set_gc_threads(self):
+        profile = packer.build_jvm_profile("1.20.1", memory="8G", cpus=8)
+        self.assertIn("-Xmx8192M", profile["args"])
+        self.assertIn("-XX:ParallelGCThreads=8", profile["args"])
+
+    def test_pack_user_jvm_args_kept(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "user_jvm_args.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("-Xmx10G\n")
+            packer.create_start_script(tmp_dir, "forge-installer.jar", "forge", packer.build_jvm_profile("1.20.1"))
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), "-Xmx10G\n")
+
+    def test_user_jvm_args_generated(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            packer.create_start_script(tmp_dir, "forge-installer.jar", "forge", packer.build_jvm_profile("1.20.1"))
+            with open(os.path.join(tmp_dir, "user_jvm_args.txt"), encoding="utf-8") as f:
+                self.assertIn(f"-Xmx{packer.DEFAULT_HEAP_MB}M", f.read())
+
+    def test_linux_args_written_to_user_jvm_args(self):
+        profile = packer.build_jvm_profile("1.21.1", memory="16G")
+        self.assertTrue(profile["linux_args"])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            packer.create_start_script(tmp_dir, "neoforge-installer.jar", "neoforge", profile, "1.21.1")
+            with open(os.path.join(tmp_dir, "user_jvm_args.txt"), encoding="utf-8") as f:
+                args = f.read().split()
+            for arg in profile["linux_args"]:
+                self.assertIn(arg, args)
+
+    def test_legacy_forge_launches_server_jar_with_profile(self):
+        self.assertFalse(packer.uses_run_script("forge", "1.16.5"))
+        self.assertTrue(packer.uses_run_script("forge", "1.17.1"))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profile = packer.build_jvm_profile("1.12.2", memory="6G", cpus=4)
+            packer.create_start_script(tmp_dir, "forge-1.12.2-installer.jar", "forge", profile, "1.12.2")
+            self.assertFalse(os.path.exists(os.path.join(tmp_dir, "user_jvm_args.txt")))
+            for name in ("start.sh", "start.bat"):
+                with open(os.path.join(tmp_dir, name), encoding="utf-8") as f:
+                    script = f.read()
+                self.assertIn("--installServer", script)
+                self.assertIn("-Xmx6144M", script)
+                self.assertIn("-XX:ParallelGCThreads=4", script)
+
+            packer.create_start_script(tmp_dir, "forge-1.12.2-installer.jar", "forge", profile, "1.12.2", installed=True)
+            self.assertEqual(packer._oci_command(tmp_dir), ["sh", "start.sh"])
+
+
+def _export_images(layout_dir, server_dir, names):
+    """在子进程中把同一个服务器目录以多个名称导出到共享的布局目录。"""
+    for name in names:
+        packer.export_oci_image(server_dir, layout_dir, name)
+
+
+class OciExportTest(unittest.TestCase):
+    def _read_image_config(self, layout_dir, manifest_digest):
+        manifest = json.loads(packer._read_oci_blob(layout_dir, manifest_digest))
+        return json.loads(packer._read_oci_blob(layout_dir, manifest["config"]["digest"]))
+
+    def test_fabric_server_uses_start_script(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            server_dir = os.path.join(tmp_dir, "server")
+            os.makedirs(os.path.join(server_dir, "mods"))
+            with open(os.path.join(server_dir, "mods", "a.jar"), "wb") as f:
+                f.write(b"mod")
+            with open(os.path.join(server_dir, "fabric-server.jar"), "wb") as f:
+                f.write(b"jar")
+            packer.create_start_script(server_dir, "fabric-server.jar", "fabric", packer.build_jvm_profile("1.20.1"))
+            layout_dir = os.path.join(tmp_dir, "oci")
+            digest = packer.export_oci_image(server_dir, layout_dir, "pack")
+            self.assertEqual(self._read_image_config(layout_dir, digest)["config"]["Cmd"], ["sh", "start.sh"])
+
+    def test_installed_forge_server_uses_run_script(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            server_dir = os.path.join(tmp_dir, "server")
+            os.makedirs(os.path.join(server_dir, "libraries"))
+            with open(os.path.join(server_dir, "run.sh"), "w", encoding="utf-8") as f:
+                f.write("java @user_jvm_args.txt \"$@\"\n")
+            layout_dir = os.path.join(tmp_dir, "oci")
+            digest = packer.export_oci_image(server_dir, layout_dir, "pack")
+            self.assertEqual(self._read_image_config(layout_dir, digest)["config"]["Cmd"], ["sh", "run.sh", "nogui"])
+
+    def test_uninstalled_forge_server_refused(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            server_dir = os.path.join(tmp_dir, "server")
+            os.makedirs(server_dir)
+            packer.create_start_script(server_dir, "forge-installer.jar", "forge", packer.build_jvm_profile("1.20.1"))
+            with self.assertRaises(ValueError):
+                packer.export_oci_image(server_dir, os.path.join(tmp_dir, "oci"), "pack")
+            self.assertFalse(os.path.exists(os.path.join(tmp_dir, "oci")))
+
+    def test_parallel_processes_keep_all_index_entries(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            server_dir = os.path.join(tmp_dir, "server")
+            os.makedirs(os.path.join(server_dir, "mods"))
+            with open(os.path.join(server_dir, "fabric-server.jar"), "wb") as f:
+                f.write(b"jar")
+            packer.create_start_script(server_dir, "fabric-server.jar", "fabric", packer.build_jvm_profile("1.20.1"))
+            layout_dir = os.path.join(tmp_dir, "oci")
+            names = [[f"pack{p}-{i}" for i in range(5)] for p in range(4)]
+            with ProcessPoolExecutor(max_workers=4) as executor:
+                for future in [executor.submit(_export_images, layout_dir, server_dir, n) for n in names]:
+                    future.result()
+            with open(os.path.join(layout_dir, "index.json"), encoding="utf-8") as f:
+                index = json.load(f)
+            refs = sorted(m["annotations"]["org.opencontainers.image.ref.name"] for m in index["manifests"])
+            self.assertEqual(refs, sorted(name for group in names for name in group))
+
+    def test_quilt_refused(self):
+        with self.assertRaises(ValueError):
+            packer.check_oci_support("quilt")
+        packer.check_oci_support("fabric")
+
+
+class PackJobCoordinatorTest(unittest.TestCase):
+    def test_failed_job_retried_after_other_worker_stops(self):
+        coordinator = packer.PackJobCoordinator(["a.mrpack", "b.mrpack"], worker_timeout=0.2)
+        job_a = coordinator.acquire_job("A")
+        job_b = coordinator.acquire_job("B")
+        self.assertTrue(coordinator.report_result(job_a["id"], "A", False, "boom"))
+        self.assertTrue(coordinator.report_result(job_b["id"], "B", True))
+
+        # B 仍然存活时失败的任务留给 B
+        self.assertIsNone(coordinator.acquire_job("A"))
+
+        # B 停止领取任务后由 A 重试
+        time.sleep(0.3)
+        retry = coordinator.acquire_job("A")
+        self.assertEqual(retry["id"], job_a["id"])
+        self.assertEqual(retry["attempt"], 2)
+        coordinator.report_result(retry["id"], "A", True)
+        self.assertTrue(coordinator.finished.is_set())
+
+    def test_busy_worker_counts_as_live(self):
+        coordinator = packer.PackJobCoordinator(["a.mrpack", "b.mrpack"], worker_timeout=0.1)
+        job_a = coordinator.acquire_job("A")
+        coordinator.acquire_job("B")
+        coordinator.report_result(job_a["id"], "A", False, "boom")
+        time.sleep(0.2)
+        # B 长时间未领取任务但仍在执行任务,失败的任务等待 B
+        self.assertIsNone(coordinator.acquire_job("A"))
+
+    def test_final_failure_after_max_attempts(self):
+        coordinator = packer.PackJobCoordinator(["a.mrpack"], max_attempts=2)
+        for _ in range(2):
+            job = coordinator.acquire_job("A")
+            coordinator.report_result(job["id"], "A", False, "boom")
+        self.assertTrue(coordinator.finished.is_set())
+        self.assertEqual(coordinator.summary()["failed"], 1)
+        self.assertEqual(coordinator.acquire_job("A"), {"done": True})
+
+
+class LocalhostWorkersTest(unittest.TestCase):
+    """在本机启动协调器和多个工作节点,走完整的 HTTP 流程。"""
+
+    def test_multiple_workers_complete_all_jobs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            modpacks = _make_modpacks(tmp_dir, 6)
+            output_base = os.path.join(tmp_dir, "out")
+            coordinator = packer.PackJobCoordinator(modpacks, worker_timeout=5)
+            server = packer.start_coordinator(coordinator)
+            url = "http://127.0.0.1:%s" % server.server_address[1]
+            failed_once = set()
+            lock = threading.Lock()
+
+            def process(modpack_file, output_dir):
+                # pack0 第一次执行时失败,之后由其他节点重试
+                name = os.path.splitext(os.path.basename(modpack_file))[0]
+                with lock:
+                    if name == "pack0" and name not in failed_once:
+                        failed_once.add(name)
+                        raise RuntimeError("模拟打包失败")
+                os.makedirs(os.path.join(output_dir, "mods"), exist_ok=True)
+                with open(modpack_file, "rb") as src, open(os.path.join(output_dir, "mods", "mod.jar"), "wb") as dst:
+                    dst.write(src.read())
+                time.sleep(0.05)
+
+            results = {}
+
+            def worker(worker_id):
+                results[worker_id] = packer.run_worker(
+                    url, output_base, worker_id=worker_id, poll_interval=0.05, process_func=process)
+
+            threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(3)]
+            try:
+                for thread in threads:
+                    thread.start()
+                self.assertTrue(coordinator.finished.wait(timeout=30))
+                for thread in threads:
+                    thread.join(timeout=30)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+            summary = coordinator.summary()
+            self.assertEqual(summary["done"], 6)
+            self.assertEqual(sum(results.values()), 6)
+            pack0 = next(job for job in summary["jobs"] if job["id"] == "1")
+            self.assertEqual(pack0["attempts"], 2)
+            self.assertNotIn(pack0["worker"], pack0["failed_workers"])
+            for job in summary["jobs"]:
+                self.assertEqual(job["metrics"]["mod_count"], 1)
+            for i in range(6):
+                self.assertTrue(os.path.isfile(os.path.join(output_base, f"pack{i}", "mods", "mod.jar")))
+
+
+if __name__ == "__main__":
+    unittest.main()
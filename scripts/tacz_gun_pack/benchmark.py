@@ -0,0 +1,406 @@
+"""
+TaCZ 枪包列表生成流程的性能测试。
+
+在本地启动一个模拟 CurseForge API 的服务器，生成 N 个带有真实大小描述的虚拟项目，
+依次计时 fetch_all_projects、fetch_all_project_details、sanitize_description 和 generate_html，
+记录每个阶段的耗时、请求数和每秒请求数、峰值内存和输出大小，结果保存为 JSON 以便比较不同版本。
+
+用法:
+    python benchmark.py --sizes 100 1000 5000
+    python benchmark.py --sizes 1000 --latency 0.05 --images
+    python benchmark.py --sizes 1000 --baseline benchmarks/results-20250101-000000.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，不记录峰值内存
+    resource = None
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR)
+import main as tacz  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "benchmarks")
+
+WORDS = ("gun pack rifle pistol sniper shotgun attachment scope magazine reload recoil texture model "
+         "animation sound config server client forge neoforge update fix balance damage ammo").split()
+MOD_LOADER_TYPES = [1, 4, 5, 6]
+GAME_VERSIONS = ["1.20.1", "1.21.1"]
+CJK_TEXT = "枪械包含步枪手枪狙击枪霰弹枪配件瞄准镜弹匣换弹后坐力贴图模型动画音效配置服务器客户端更新修复平衡伤害弹药"
+
+
+def make_png(width, height, color):
+    """生成纯色 PNG 图片，不依赖 Pillow"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+    row = b"\x00" + bytes(color) * width
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(row * height, 6))
+            + chunk(b"IEND", b""))
+
+
+class SyntheticCatalog:
+    """确定性生成的虚拟项目和描述，描述大小服从对数正态分布（中位数约 6KB）"""
+
+    def __init__(self, count, seed, base_url):
+        self.count = count
+        self.seed = seed
+        self.base_url = base_url
+        self.filter_cache = {}
+
+    def filtered(self, mod_loader_type=None, game_version=None):
+        """按搜索条件筛选的项目序号，每个项目属于一个模组加载器和一个游戏版本"""
+        key = (mod_loader_type, game_version)
+        if key not in self.filter_cache:
+            self.filter_cache[key] = [
+                i for i in range(self.count)
+                if (mod_loader_type is None or MOD_LOADER_TYPES[i % len(MOD_LOADER_TYPES)] == mod_loader_type)
+                and (game_version is None or GAME_VERSIONS[i % len(GAME_VERSIONS)] == game_version)
+            ]
+        return self.filter_cache[key]
+
+    def project(self, i):
+        rng = random.Random(self.seed * 1000003 + i)
+        project_id = 100000 + i
+        return {
+            "id": project_id,
+            "name": f"Pack {i} {rng.choice(WORDS).title()} {CJK_TEXT[rng.randrange(len(CJK_TEXT) - 4):][:4]}",
+            "summary": " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 24))),
+            "links": {"websiteUrl": f"https://www.curseforge.com/minecraft/customization/pack-{project_id}"},
+            "dateModified": datetime.fromtimestamp(1700000000 + i * 3607, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
+            "downloadCount": rng.randint(0, 500000),
+            "logo": {"url": f"{self.base_url}/img/logo-{project_id}.png"},
+            "screenshots": [
+                {"url": f"{self.base_url}/img/shot-{project_id}-{n}.png", "title": f"screenshot {n}"}
+                for n in range(rng.randint(0, 6))
+            ],
+            "latestFiles": [{
+                "id": 9000000 + i,
+                "fileName": f"pack-{project_id}.zip",
+                "fileDate": "2025-01-01T00:00:00Z",
+                "downloadUrl": f"https://edge.forgecdn.net/files/{project_id}/pack-{project_id}.zip"
+            }]
+        }
+
+    def description(self, project_id):
+        i = project_id - 100000
+        rng = random.Random(self.seed * 7919 + i)
+        target = min(200000, int(rng.lognormvariate(8.7, 0.9)))
+        parts = []
+        size = 0
+        while size < target:
+            kind = rng.random()
+            if kind < 0.55:
+                text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80)))
+                part = f'<p style="color:#{rng.randrange(0x1000000):06x}">{text} <strong>{rng.choice(WORDS)}</strong></p>'
+            elif kind < 0.75:
+                start = rng.randrange(len(CJK_TEXT) - 10)
+                part = f"<p>{CJK_TEXT[start:] * rng.randint(1, 4)}</p>"
+            elif kind < 0.85:
+                part = f'<h2>{rng.choice(WORDS).title()}</h2><ul>' + "".join(f"<li>{rng.choice(WORDS)}</li>" for _ in range(5)) + "</ul>"
+            elif kind < 0.95:
+                part = f'<p><img src="{self.base_url}/img/desc-{project_id}-{size}.png" width="{rng.choice([400, 800])}"></p>'
+            elif kind < 0.98:
+                part = '<iframe width="560" height="315" src="https://www.youtube.com/embed/dQw4w9WgXcQ"></iframe>'
+            else:
+                part = '<script>console.log("x")</script><div onclick="alert(1)" style="' + "a" * 500 + '">tracking</div>'
+            parts.append(part)
+            size += len(part)
+        return "".join(parts)
+
+
+class StandInServer:
+    """在后台线程中运行的模拟 CurseForge API，统计请求数和响应字节数"""
+
+    def __init__(self, count, seed, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.images = {}
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send_body(self, body, content_type="application/json", status=200):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with stand_in.lock:
+                    stand_in.requests += 1
+                    stand_in.bytes_sent += len(body)
+
+            def send_json(self, data, status=200):
+                self.send_body(json.dumps(data).encode("utf-8"), status=status)
+
+            def do_GET(self):
+                if stand_in.latency:
+                    time.sleep(stand_in.latency)
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                parts = url.path.strip("/").split("/")
+                catalog = stand_in.catalog
+                if url.path.startswith("/img/"):
+                    self.send_body(stand_in.image(url.path), content_type="image/png")
+                elif url.path == "/v1/mods/search":
+                    index = int(query.get("index", [0])[0])
+                    page_size = int(query.get("pageSize", [50])[0])
+                    if index + page_size > tacz.SEARCH_WINDOW:
+                        self.send_json({"error": "index + pageSize must be <= 10000"}, status=400)
+                        return
+                    mod_loader_type = int(query["modLoaderType"][0]) if "modLoaderType" in query else None
+                    matches = catalog.filtered(mod_loader_type, query.get("gameVersion", [None])[0])
+                    if query.get("sortOrder", ["desc"])[0] == "asc":
+                        matches = matches[::-1]
+                    data = [catalog.project(i) for i in matches[index:index + page_size]]
+                    self.send_json({"data": data, "pagination": {"index": index, "pageSize": page_size,
+                                                                 "resultCount": len(data), "totalCount": len(matches)}})
+                elif url.path == "/v1/minecraft/version":
+                    self.send_json({"data": [{"versionString": version} for version in GAME_VERSIONS]})
+                elif len(parts) == 4 and parts[:2] == ["v1", "mods"] and parts[3] == "description":
+                    self.send_json({"data": catalog.description(int(parts[2]))})
+                elif len(parts) == 3 and parts[:2] == ["v1", "mods"]:
+                    self.send_json({"data": catalog.project(int(parts[2]) - 100000)})
+                else:
+                    self.send_json({}, status=404)
+
+            def do_POST(self):
+                if stand_in.latency:
+                    time.sleep(stand_in.latency)
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if self.path == "/v1/mods":
+                    self.send_json({"data": [stand_in.catalog.project(mod_id - 100000) for mod_id in body["modIds"]]})
+                else:
+                    self.send_json({}, status=404)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.catalog = SyntheticCatalog(count, seed, self.base_url)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def image(self, path):
+        """截图 640x480，logo 和描述中的图片 400x400，颜色由路径决定"""
+        if path not in self.images:
+            color = zlib.crc32(path.encode()).to_bytes(4, "big")[:3]
+            size = (640, 480) if "/shot-" in path else (400, 400)
+            self.images[path] = make_png(size[0], size[1], color)
+        return self.images[path]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def peak_rss_mb():
+    """进程的峰值常驻内存（MB），不支持的平台返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 的单位是字节，Linux 是 KB
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def directory_size(path, compressed=False):
+    """目录中文件的总字节数，compressed 为 False 时不计入 .gz/.br 副本"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            if compressed or not name.endswith(tacz.COMPRESSED_SUFFIXES):
+                total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def run_one(count, seed, latency, images, result_path):
+    """在当前进程中运行一次完整流程并把结果写入 result_path，所有输出写入临时目录"""
+    with tempfile.TemporaryDirectory(prefix="tacz-benchmark-") as work_dir:
+        result = run_in_directory(count, seed, latency, images, work_dir)
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+
+
+def run_in_directory(count, seed, latency, images, work_dir):
+    """使用 work_dir 作为配置、缓存和输出目录运行一次完整流程，返回结果"""
+    tacz.CONFIG_FILE = os.path.join(work_dir, "config.json")
+    config = tacz.load_config()
+    output_dir = os.path.join(work_dir, "docs")
+
+    stages = []
+    with StandInServer(count, seed, latency) as server:
+        config["api"] = {"key": "benchmark", "base_url": f"{server.base_url}/v1"}
+        config["output"]["filename"] = f"benchmark-{count}.html"
+        config["cache"]["dir"] = os.path.join(work_dir, "cache")
+        config["fetch"]["rate_limit"] = 0
+        config["images"]["enabled"] = images
+
+        def stage(name, func):
+            requests_before, bytes_before = server.requests, server.bytes_sent
+            start = time.perf_counter()
+            value = func()
+            elapsed = time.perf_counter() - start
+            requests_made = server.requests - requests_before
+            stages.append({
+                "stage": name,
+                "seconds": round(elapsed, 4),
+                "requests": requests_made,
+                "requests_per_second": round(requests_made / elapsed, 1) if elapsed and requests_made else None,
+                "bytes_fetched": server.bytes_sent - bytes_before,
+                "peak_rss_mb": peak_rss_mb()
+            })
+            print(f"[{count}] {name}: {elapsed:.2f}s, {requests_made} 个请求", file=sys.stderr)
+            return value
+
+        projects = stage("fetch_all_projects", lambda: tacz.fetch_all_projects(config))
+        cache = {}
+        stage("fetch_all_project_details", lambda: [
+            None for _ in tacz.fetch_all_project_details(config, projects, cache)
+        ])
+
+        # 单独计时描述清理，输入为原始描述
+        raw_descriptions = [server.catalog.description(project["id"]) for project in projects]
+        raw_bytes = sum(len(description.encode("utf-8")) for description in raw_descriptions)
+        sanitized = stage("sanitize_description", lambda: [
+            tacz.sanitize_description(description) for description in raw_descriptions
+        ])
+        stages[-1]["input_bytes"] = raw_bytes
+        stages[-1]["output_bytes"] = sum(len(description.encode("utf-8")) for description in sanitized)
+        stages[-1]["mb_per_second"] = round(raw_bytes / 1048576 / stages[-1]["seconds"], 2) if stages[-1]["seconds"] else None
+        del raw_descriptions, sanitized
+
+        # 描述已经缓存，这一阶段只包含缩略图和渲染
+        output_path = stage("generate_html", lambda: tacz.generate_html(config, projects, cache, output_dir))
+        output = {
+            "page_bytes": os.path.getsize(output_path),
+            "assets_bytes": directory_size(tacz.get_fragments_dir(output_path)),
+            "total_bytes_with_compressed": os.path.getsize(output_path) + directory_size(
+                tacz.get_fragments_dir(output_path), compressed=True)
+        }
+
+    return {
+        "projects": count,
+        "projects_found": len(projects),
+        "stages": stages,
+        "total_seconds": round(sum(s["seconds"] for s in stages), 4),
+        "peak_rss_mb": peak_rss_mb(),
+        "output": output
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARK_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results, baseline=None):
+    """打印每个规模各阶段的耗时，有基准结果时同时显示变化比例"""
+    baseline_times = {}
+    if baseline:
+        for run in baseline["runs"]:
+            for s in run["stages"]:
+                baseline_times[(run["projects"], s["stage"])] = s["seconds"]
+
+    header = f"{'项目数':>8}  {'阶段':<28}{'耗时(s)':>10}{'请求':>8}{'请求/s':>10}{'峰值内存MB':>12}"
+    if baseline:
+        header += f"{'对比基准':>10}"
+    print(header)
+    print("-" * 90)
+    for run in results["runs"]:
+        for s in run["stages"]:
+            line = (f"{run['projects']:>8}  {s['stage']:<28}{s['seconds']:>10.3f}{s['requests']:>8}"
+                    f"{s['requests_per_second'] or '-':>10}{s['peak_rss_mb'] or '-':>12}")
+            previous = baseline_times.get((run["projects"], s["stage"]))
+            if previous:
+                line += f"{(s['seconds'] / previous - 1) * 100:>+9.1f}%"
+            print(line)
+        output = run["output"]
+        print(f"{'':>8}  页面 {output['page_bytes']:,} 字节，片段和资源 {output['assets_bytes']:,} 字节，"
+              f"含预压缩副本共 {output['total_bytes_with_compressed']:,} 字节")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TaCZ 枪包列表生成流程的性能测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="虚拟项目数量，每个数量单独运行")
+    parser.add_argument("--seed", type=int, default=1, help="生成虚拟项目的随机种子")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟API每个请求的延迟（秒）")
+    parser.add_argument("--images", action="store_true", help="包含缩略图生成（需要 Pillow）")
+    parser.add_argument("--output", help="结果文件路径，默认为 benchmarks/results-<时间>.json")
+    parser.add_argument("--baseline", help="与之前的结果文件比较")
+    parser.add_argument("--run-one", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one is not None:
+        run_one(args.run_one, args.seed, args.latency, args.images, args.result_path)
+        return
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {"seed": args.seed, "latency": args.latency, "images": args.images},
+        "runs": []
+    }
+    # 每个规模在独立的进程中运行，峰值内存互不影响
+    for count in args.sizes:
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            result_path = f.name
+        try:
+            command = [sys.executable, os.path.abspath(__file__), "--run-one", str(count), "--seed", str(args.seed),
+                       "--latency", str(args.latency), "--result-path", result_path]
+            if args.images:
+                command.append("--images")
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            with open(result_path, "r", encoding="utf-8") as f:
+                results["runs"].append(json.load(f))
+        finally:
+            os.remove(result_path)
+
+    output_path = args.output or os.path.join(
+        RESULTS_DIR, f"results-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+    print(f"结果已保存: {os.path.abspath(output_path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import requests
-from datetime import datetime
+from datetime import datetime, timezone
 import json
 import os
 import sys
@@ -8,6 +8,34 @@ import re
 from tqdm import tqdm
 import argparse
 import configparser
+import time
+import random
+import email.utils
+import hashlib
+import io
+import gzip
+import xml.etree.ElementTree as ET
+import threading
+import contextlib
+import copy
+import urllib.parse
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from html.parser import HTMLParser
+
+# brotli 为可选依赖，未安装时只生成 .gz 预压缩文件
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Pillow 为可选依赖，未安装时页面直接引用 CurseForge 的原图
+try:
+    from PIL import Image, ImageOps, features as pil_features
+except ImportError:
+    Image = None
 
 # 资源路径修正 - 针对 Nuitka 打包后路径处理
 def get_base_dir():
@@ -38,7 +66,44 @@ def load_config():
         },
         "output": {
             "filename": "tacz_gun_pack.html",
-            "title": "永恒枪械工坊：零 (TaCZ) 枪包列表"
+            "title": "永恒枪械工坊：零 (TaCZ) 枪包列表",
+            "precompress": True,  # 为输出文件生成 .gz/.br 预压缩副本
+            "site_url": ""  # 页面所在站点的地址，用于订阅源中的链接，如 https://<用户名>.github.io/<仓库名>/
+        },
+        "feed": {
+            "max_entries": 50  # 订阅源中最近更新的项目数量
+        },
+        "report": {
+            "dir": "reports"  # 运行报告目录，相对于脚本目录
+        },
+        "fetch": {
+            "max_workers": 8,  # 并发获取项目详情的最大线程数
+            "page_workers": 4,  # 并发请求搜索页面的最大线程数
+            "rate_limit": 10,  # 每秒最多请求数，按API密钥的配额设置，0 表示不限制
+            "rate_burst": 10,  # 允许的突发请求数
+            "max_retries": 5,  # 失败请求的最大重试次数
+            "timeout": 30  # 单个请求的超时秒数
+        },
+        "cache": {
+            "dir": "cache"  # 项目详情缓存目录，相对于脚本目录
+        },
+        "description": {
+            "max_length": 100000  # 处理后描述的最大长度（字符），超过时截断
+        },
+        "images": {
+            "enabled": True,  # 生成本地缩略图，需要安装 Pillow
+            "formats": ["avif", "webp"],  # 缩略图格式，最后一个作为 <img> 的回退格式
+            "logo_widths": [150, 300],  # logo 缩略图宽度（正方形）
+            "screenshot_widths": [220, 440],  # 画廊缩略图宽度（4:3）
+            "quality": 75,
+            "workers": 8  # 并发下载和生成缩略图的线程数
+        },
+        "mirror": {
+            "enabled": False,  # 下载每个项目的最新文件到本地镜像，下载按钮指向镜像
+            "dir": "mirror",  # 镜像目录，相对于脚本目录
+            "base_url": "",  # 镜像目录的访问地址；为空时镜像目录需要位于 docs 目录中，使用相对链接
+            "max_size_mb": 95,  # 超过该大小的文件不镜像；没有 base_url 时必须小于 GitHub 的 100MB 限制
+            "workers": 4  # 并发下载文件的线程数
         }
     }
     
@@ -64,28 +129,393 @@ def load_config():
         return default_config
 
 
-def fetch_projects_via_api(config, index=0):
-    """从CurseForge API获取项目数据，支持分页"""
-    url = f"{config['api']['base_url']}/mods/search"
-    headers = {
-        'x-api-key': config['api']['key'],
-        'Accept': 'application/json'
-    }
-    
+# 缓存格式版本，格式变化时递增以丢弃旧缓存
+CACHE_VERSION = 3
+# 卡片模板版本，修改 render_project_card 时递增以重新渲染缓存的卡片
+CARD_TEMPLATE_VERSION = 5
+# 卡片中渲染的项目字段，缓存的卡片以这些字段为键；下载量几乎每次运行都会变化，不参与缓存，输出时再填入
+CARD_FIELDS = ('id', 'title', 'link', 'updated', 'iso_date', 'description', 'logo_url', 'mirror_url')
+CARD_DOWNLOADS_MARK = '\x00downloads\x00'
+CARD_DOWNLOADS_DISPLAY_MARK = '\x00downloads_display\x00'
+# CurseForge 文件哈希的 algo 对应的算法
+FILE_HASH_ALGOS = {1: 'sha1', 2: 'md5'}
+
+# CurseForge 搜索接口要求 index + pageSize <= 10000
+SEARCH_WINDOW = 10000
+# 按模组加载器分片时使用的 modLoaderType: Forge、Fabric、Quilt、NeoForge
+DEFAULT_SHARD_MOD_LOADER_TYPES = [1, 4, 5, 6]
+
+# 需要重试的HTTP状态码
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# 所有请求共享同一个客户端（连接池和限流器）
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_max_workers(config):
+    """返回并发请求的最大线程数"""
+    return max(1, int(config.get('fetch', {}).get('max_workers', 8)))
+
+
+class CurseForgeError(Exception):
+    """CurseForge API 请求在重试后仍然失败"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TokenBucket:
+    """线程安全的令牌桶限流器，rate 为每秒令牌数，capacity 为允许的突发请求数"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """等待直到获得一个令牌"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def block_for(self, seconds):
+        """服务器要求等待时（429 Retry-After），暂停所有线程的请求"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 响应头（秒数或HTTP日期），返回等待秒数"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Cassette:
+    """
+    API 响应的录制/回放记录，每个请求保存为目录中的一个 JSON 文件，文件名为请求的哈希。
+    record 模式在请求成功后保存响应；replay 模式直接从文件返回响应，不访问网络，
+    可以用 latency 模拟每个请求的延迟（秒）。
+    """
+
+    def __init__(self, mode, directory, latency=0.0):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"未知的录制模式: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.latency = latency
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, method, path, params=None, json_body=None):
+        key = json.dumps([method, path, sorted((params or {}).items()), json_body], sort_keys=True, default=str)
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + '.json')
+
+    def replay(self, method, path, params=None, json_body=None):
+        """返回录制的响应，没有录制时抛出 CurseForgeError"""
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            with open(self.path_for(method, path, params, json_body), 'r', encoding='utf-8') as f:
+                return json.load(f)['response']
+        except FileNotFoundError:
+            raise CurseForgeError(f"{method} {path} 没有录制的响应", 404)
+
+    def record(self, method, path, response, params=None, json_body=None):
+        """保存一次成功请求的响应"""
+        file_path = self.path_for(method, path, params, json_body)
+        entry = {'method': method, 'path': path, 'params': params, 'json': json_body, 'response': response}
+        tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
+
+
+def get_cassette(config):
+    """根据 config['fetch']['cassette'] 创建录制/回放记录，未配置时返回 None"""
+    options = config.get('fetch', {}).get('cassette')
+    if not options or not options.get('mode'):
+        return None
+    directory = options.get('dir', 'cassette')
+    if not os.path.isabs(directory):
+        directory = os.path.join(BASE_DIR, directory)
+    return Cassette(options['mode'], directory, float(options.get('latency', 0)))
+
+
+class CurseForgeClient:
+    """
+    共享的 CurseForge API 客户端。
+    所有请求使用同一个连接池并经过令牌桶限流；连接错误、429 和 5xx 响应会以带抖动的指数退避重试，
+    服务器返回 Retry-After 时按其要求等待。重试耗尽后抛出 CurseForgeError。
+    """
+
+    def __init__(self, config):
+        fetch = config.get('fetch', {})
+        self.base_url = config['api']['base_url'].rstrip('/')
+        self.headers = {
+            'x-api-key': config['api']['key'],
+            'Accept': 'application/json'
+        }
+        self.timeout = float(fetch.get('timeout', 30))
+        self.max_retries = int(fetch.get('max_retries', 5))
+        self.backoff_base = float(fetch.get('backoff_base', 1.0))
+        self.backoff_max = float(fetch.get('backoff_max', 60.0))
+
+        self.cassette = get_cassette(config)
+        if self.cassette is not None:
+            print(f"API响应{'录制到' if self.cassette.mode == 'record' else '回放自'}: {self.cassette.directory}")
+
+        rate = float(fetch.get('rate_limit', 10))
+        self.rate_limiter = TokenBucket(rate, float(fetch.get('rate_burst', rate))) if rate > 0 else None
+
+        # 连接池大小与并发数一致
+        pool_size = max(get_max_workers(config), get_page_workers(config))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, path, params=None):
+        return self.request('GET', path, params=params)
+
+    def post(self, path, json_body):
+        return self.request('POST', path, json=json_body)
+
+    def request(self, method, path, **kwargs):
+        """发送请求并返回解析后的JSON；回放模式下直接返回录制的响应，不经过限流和重试"""
+        endpoint = metrics.endpoint_name(method, path)
+        if self.cassette is not None and self.cassette.mode == 'replay':
+            start = time.perf_counter()
+            try:
+                data = self.cassette.replay(method, path, kwargs.get('params'), kwargs.get('json'))
+            except CurseForgeError:
+                metrics.record_request(endpoint, time.perf_counter() - start, 404)
+                metrics.record_error(endpoint)
+                raise
+            metrics.record_request(endpoint, time.perf_counter() - start, 200)
+            return data
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            retry_after = None
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, headers=self.headers, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                metrics.record_request(endpoint, time.perf_counter() - start)
+                error = CurseForgeError(f"{method} {path} 请求失败: {e}")
+            else:
+                metrics.record_request(endpoint, time.perf_counter() - start, response.status_code, len(response.content))
+                if response.status_code < 400:
+                    try:
+                        data = response.json()
+                    except ValueError as e:
+                        raise CurseForgeError(f"{method} {path} 返回了无效的JSON: {e}", response.status_code)
+                    if self.cassette is not None:
+                        self.cassette.record(method, path, data, kwargs.get('params'), kwargs.get('json'))
+                    return data
+                error = CurseForgeError(f"{method} {path} 返回 HTTP {response.status_code}", response.status_code)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    metrics.record_error(endpoint)
+                    raise error
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+            if attempt == self.max_retries:
+                metrics.record_error(endpoint)
+                raise error
+            metrics.record_retry(endpoint)
+            if retry_after is not None:
+                delay = retry_after
+                if self.rate_limiter is not None:
+                    self.rate_limiter.block_for(delay)
+            else:
+                # 全抖动指数退避
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            print(f"{error}，{delay:.1f} 秒后重试 ({attempt + 1}/{self.max_retries})")
+            time.sleep(delay)
+
+
+class RunMetrics:
+    """
+    运行过程中的统计数据，线程安全:
+    每个接口的请求延迟分布、状态码、重试和失败次数、下载字节数，各类缓存的命中率，以及各阶段耗时。
+    """
+
+    # 延迟直方图的桶上限（毫秒）
+    LATENCY_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = datetime.now(timezone.utc)
+        self.endpoints = {}
+        self.caches = {}
+        self.stages = []
+
+    @staticmethod
+    def endpoint_name(method, path):
+        """将路径中的ID替换为占位符，同一接口的请求合并统计"""
+        return f"{method} {re.sub(r'/[0-9]+(?=/|$)', '/{id}', path)}"
+
+    def endpoint(self, name):
+        if name not in self.endpoints:
+            self.endpoints[name] = {'latencies': [], 'status': {}, 'retries': 0, 'errors': 0, 'bytes': 0}
+        return self.endpoints[name]
+
+    def record_request(self, name, seconds, status=None, size=0):
+        """记录一次HTTP请求，status 为 None 表示连接失败"""
+        with self.lock:
+            stats = self.endpoint(name)
+            stats['latencies'].append(seconds)
+            key = str(status) if status is not None else 'connection_error'
+            stats['status'][key] = stats['status'].get(key, 0) + 1
+            stats['bytes'] += size
+
+    def record_retry(self, name):
+        with self.lock:
+            self.endpoint(name)['retries'] += 1
+
+    def record_error(self, name):
+        """记录重试后仍然失败的请求"""
+        with self.lock:
+            self.endpoint(name)['errors'] += 1
+
+    def record_cache(self, name, hit, count=1):
+        with self.lock:
+            stats = self.caches.setdefault(name, {'hits': 0, 'misses': 0})
+            stats['hits' if hit else 'misses'] += count
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """统计一个阶段的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append({'stage': name, 'seconds': round(time.perf_counter() - start, 3)})
+
+    def endpoint_summary(self, stats):
+        latencies = sorted(stats['latencies'])
+        histogram = {}
+        for bound in self.LATENCY_BUCKETS_MS + [None]:
+            label = f"<={bound}ms" if bound is not None else f">{self.LATENCY_BUCKETS_MS[-1]}ms"
+            histogram[label] = 0
+        for latency in latencies:
+            ms = latency * 1000
+            bound = next((b for b in self.LATENCY_BUCKETS_MS if ms <= b), None)
+            histogram[f"<={bound}ms" if bound is not None else f">{self.LATENCY_BUCKETS_MS[-1]}ms"] += 1
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1)
+
+        return {
+            'requests': len(latencies),
+            'status': stats['status'],
+            'retries': stats['retries'],
+            'errors': stats['errors'],
+            'bytes': stats['bytes'],
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': round(latencies[-1] * 1000, 1) if latencies else None,
+                'histogram': histogram
+            }
+        }
+
+    def report(self, status):
+        """生成运行报告"""
+        with self.lock:
+            endpoints = {name: self.endpoint_summary(stats) for name, stats in sorted(self.endpoints.items())}
+            caches = {
+                name: {**stats, 'hit_ratio': round(stats['hits'] / (stats['hits'] + stats['misses']), 3)
+                       if stats['hits'] + stats['misses'] else None}
+                for name, stats in sorted(self.caches.items())
+            }
+        return {
+            'status': status,
+            'started_at': self.started_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'wall_seconds': round((datetime.now(timezone.utc) - self.started_at).total_seconds(), 3),
+            'stages': self.stages,
+            'endpoints': endpoints,
+            'caches': caches,
+            'bytes_fetched': sum(e['bytes'] for e in endpoints.values())
+        }
+
+    def write_report(self, path, status):
+        """写入JSON运行报告并打印汇总表"""
+        report = self.report(status)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        print("=" * 50)
+        print(f"运行报告 ({report['status']}，共 {report['wall_seconds']:.1f} 秒)")
+        for stage in report['stages']:
+            print(f"  {stage['stage']:<24}{stage['seconds']:>10.1f} 秒")
+        if report['endpoints']:
+            print(f"  {'接口':<32}{'请求':>6}{'重试':>6}{'失败':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'KB':>10}")
+            for name, stats in report['endpoints'].items():
+                latency = stats['latency_ms']
+                print(f"  {name:<34}{stats['requests']:>6}{stats['retries']:>6}{stats['errors']:>6}"
+                      f"{latency['p50'] if latency['p50'] is not None else '-':>10}"
+                      f"{latency['p95'] if latency['p95'] is not None else '-':>10}{stats['bytes'] // 1024:>10}")
+        for name, stats in report['caches'].items():
+            ratio = f"{stats['hit_ratio']:.0%}" if stats['hit_ratio'] is not None else '-'
+            print(f"  缓存 {name}: 命中 {stats['hits']}，未命中 {stats['misses']}，命中率 {ratio}")
+        print(f"  共下载 {report['bytes_fetched'] / 1048576:.1f} MB，报告已写入: {os.path.abspath(path)}")
+
+
+# 本次运行的统计数据
+metrics = RunMetrics()
+
+
+def get_client(config):
+    """返回共享的 CurseForge 客户端"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = CurseForgeClient(config)
+        return _client
+
+
+def fetch_projects_via_api(config, index=0, overrides=None):
+    """从CurseForge API获取项目数据，支持分页。overrides 用于覆盖配置中的搜索参数（分片抓取）"""
     # 从配置文件中获取搜索参数
     params = config['search'].copy()
+    params.update(overrides or {})
     params['index'] = index
     
     try:
         print(f"正在请求第{index//params['pageSize'] + 1}页数据...")
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-    except Exception as e:
+        data = get_client(config).get('/mods/search', params=params)
+    except CurseForgeError as e:
+        # 重试后仍然失败时中止，避免生成缺少整页项目的页面
         print(f"API请求失败: {e}")
-        if hasattr(response, 'status_code') and response.status_code == 403:
+        if e.status_code == 403:
             print("请检查API密钥是否正确")
-        return [], 0
+        raise
 
     projects = []
     for item in data.get('data', []):
@@ -106,6 +536,9 @@ def fetch_projects_via_api(config, index=0):
             if item.get('logo'):
                 logo_url = item['logo'].get('url', '')
 
+            # 搜索结果已包含截图和最新文件，无需再单独请求
+            screenshots, latest_file = extract_media(item)
+
             projects.append({
                 'title': item['name'],
                 'link': item['links']['websiteUrl'],
@@ -115,7 +548,11 @@ def fetch_projects_via_api(config, index=0):
                 'downloads_display': f"{item['downloadCount']:,}",
                 'description': item.get('summary', ''),
                 'logo_url': logo_url,
-                'id': item['id']
+                'id': item['id'],
+                'screenshots': screenshots,
+                'download_url': latest_file['download_url'] if latest_file else None,
+                'latest_file': latest_file,
+                'has_media': 'screenshots' in item and 'latestFiles' in item
             })
         except KeyError as e:
             print(f"缺少必要字段: {e}")
@@ -125,98 +562,1610 @@ def fetch_projects_via_api(config, index=0):
     return projects, total_count
 
 
-def fetch_project_details(config, project_id):
-    """获取单个项目的详细信息，包括描述和图片画廊"""
-    description_url = f"{config['api']['base_url']}/mods/{project_id}/description"
-    headers = {
-        'x-api-key': config['api']['key'],
-        'Accept': 'application/json'
+def extract_media(item):
+    """从搜索结果或项目数据中提取截图列表和最新文件（ID、文件名、大小、哈希和下载链接），没有文件时为 None"""
+    screenshots = []
+    for screenshot in item.get('screenshots') or []:
+        screenshots.append({
+            'url': screenshot.get('url', ''),
+            'title': screenshot.get('title', '')
+        })
+
+    # 取最新的文件，部分作者禁止第三方分发时 downloadUrl 为空
+    latest_file = None
+    latest_files = item.get('latestFiles') or []
+    if latest_files:
+        file = max(latest_files, key=lambda f: (f.get('fileDate', ''), f.get('id', 0)))
+        latest_file = {
+            'id': file.get('id'),
+            'file_name': file.get('fileName') or '',
+            'length': file.get('fileLength'),
+            'hashes': {
+                FILE_HASH_ALGOS[h['algo']]: h['value'].lower()
+                for h in file.get('hashes') or [] if h.get('algo') in FILE_HASH_ALGOS and h.get('value')
+            },
+            'download_url': file.get('downloadUrl')
+        }
+
+    return screenshots, latest_file
+
+
+def fill_missing_media(config, projects, chunk_size=100):
+    """对搜索结果中缺少截图或文件信息的项目，使用批量接口 POST /mods 补全"""
+    missing = {project['id']: project for project in projects if not project.get('has_media', True)}
+    if not missing:
+        return
+
+    ids = list(missing)
+    print(f"批量补全 {len(ids)} 个项目的截图和文件信息...")
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        try:
+            data = get_client(config).post('/mods', {'modIds': chunk})
+            for item in data.get('data', []):
+                project = missing.get(item.get('id'))
+                if project is not None:
+                    project['screenshots'], project['latest_file'] = extract_media(item)
+                    project['download_url'] = project['latest_file']['download_url'] if project['latest_file'] else None
+                    project['has_media'] = True
+        except CurseForgeError as e:
+            print(f"批量获取项目信息失败: {e}")
+
+
+def fetch_project_details(config, project, previous=None):
+    """
+    获取单个项目的详细信息。只有描述需要单独请求，截图和下载链接来自搜索结果。
+    描述的哈希与 previous（旧的缓存条目）相同时直接使用缓存中处理过的描述。
+    """
+    project_id = project['id']
+    details = {
+        'description': '',
+        'description_hash': None,
+        'screenshots': project.get('screenshots', []),
+        'download_url': project.get('download_url'),
+        'complete': False
     }
 
     try:
         # 获取描述
-        response = requests.get(description_url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        description = data.get('data', '')
-        
-        # 处理HTML中的图片和视频尺寸
-        description = process_media_sizes(description)
-        
-        # 获取截图和文件下载信息
-        project_url = f"{config['api']['base_url']}/mods/{project_id}"
-        project_response = requests.get(project_url, headers=headers)
-        project_response.raise_for_status()
-        project_data = project_response.json().get('data', {})
-        
-        screenshots = []
-        if 'screenshots' in project_data:
-            for screenshot in project_data['screenshots']:
-                screenshots.append({
-                    'url': screenshot.get('url', ''),
-                    'title': screenshot.get('title', '')
-                })
-        
-        # 获取最新文件下载信息 - 修复下载链接问题
-        download_url = None
-        
-        # 获取项目的文件列表
-        files_url = f"{config['api']['base_url']}/mods/{project_id}/files"
-        files_response = requests.get(files_url, headers=headers)
-        files_response.raise_for_status()
-        files_data = files_response.json()
-        
-        # 检查是否有文件
-        if files_data.get('data') and len(files_data['data']) > 0:
-            # 获取最新的文件
-            latest_file = files_data['data'][0]
-            download_url = latest_file.get('downloadUrl')
-        
-        return {
-            'description': description,
-            'screenshots': screenshots,
-            'download_url': download_url
+        data = get_client(config).get(f'/mods/{project_id}/description')
+        description = data.get('data', '') or ''
+        max_length = int(config.get('description', {}).get('max_length', DEFAULT_DESCRIPTION_MAX_LENGTH))
+        description_hash = hashlib.sha256(f"{SANITIZER_VERSION}:{max_length}:{description}".encode('utf-8')).hexdigest()
+
+        if previous and previous.get('description_hash') == description_hash:
+            metrics.record_cache('sanitized_descriptions', hit=True)
+            details['description'] = previous['description']
+        else:
+            metrics.record_cache('sanitized_descriptions', hit=False)
+            details['description'] = sanitize_description(description, max_length)
+        details['description_hash'] = description_hash
+        details['complete'] = True
+    except CurseForgeError as e:
+        print(f"获取项目详情失败 (ID: {project_id}): {e}")
+
+    return details
+
+
+def fetch_all_project_details(config, projects, cache=None):
+    """
+    并发获取所有项目的详细信息，结果顺序与 projects 一致。
+    cache 中 dateModified 未变化的项目直接使用缓存的描述，不再请求。
+    调用方提前停止时应关闭生成器，尚未开始的请求会被取消。
+    """
+    cache = cache if cache is not None else {}
+    stale = []
+    for project in projects:
+        entry = cache.get(str(project['id']))
+        if entry is None or entry.get('date_modified') != project['iso_date']:
+            stale.append(project)
+    if projects:
+        print(f"{len(projects) - len(stale)} 个项目未变化，{len(stale)} 个项目需要获取详情")
+    metrics.record_cache('details', hit=True, count=len(projects) - len(stale))
+    metrics.record_cache('details', hit=False, count=len(stale))
+
+    fill_missing_media(config, stale)
+    max_workers = min(get_max_workers(config), max(1, len(stale)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # 按提交顺序返回结果
+        futures = [
+            executor.submit(fetch_project_details, config, project, cache.get(str(project['id'])))
+            for project in stale
+        ]
+        results = iter(futures)
+        progress = tqdm(total=len(stale), desc="获取项目详情", unit="项目")
+        stale_ids = {id(project) for project in stale}
+        try:
+            for project in projects:
+                pid = str(project['id'])
+                if id(project) in stale_ids:
+                    details = next(results).result()
+                    progress.update(1)
+                    description_hash = details.pop('description_hash')
+                    if details.pop('complete'):
+                        cache[pid] = {
+                            'date_modified': project['iso_date'],
+                            'description': details['description'],
+                            'description_hash': description_hash
+                        }
+                    elif pid in cache:
+                        # 获取失败时保留旧的描述，旧缓存仍标记为过期，下次运行时重试
+                        details['description'] = cache[pid]['description']
+                else:
+                    details = {
+                        'description': cache[pid]['description'],
+                        'screenshots': project.get('screenshots', []),
+                        'download_url': project.get('download_url')
+                    }
+                yield details
+        finally:
+            # 生成器被关闭或出错时取消尚未开始的请求，线程池只等待正在进行的请求
+            for future in futures:
+                future.cancel()
+            progress.close()
+
+
+def load_project_cache(config):
+    """加载项目详情缓存 {项目ID: {'date_modified', 'description', 'description_hash', 'cards': {片段URL: [卡片键, 卡片HTML]}}}"""
+    cache_path = get_cache_path(config)
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') != CACHE_VERSION:
+            print("缓存版本不匹配，将重新获取所有项目")
+            return {}
+        print(f"已加载 {len(cache['projects'])} 个项目的缓存: {cache_path}")
+        return cache['projects']
+    except Exception as e:
+        print(f"加载缓存失败，将重新获取所有项目: {e}")
+        return {}
+
+
+def save_project_cache(config, projects_cache):
+    """原子地写入项目详情缓存"""
+    cache_path = get_cache_path(config)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'projects': projects_cache}, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+def get_cache_dir(config):
+    """返回缓存目录，相对于脚本目录"""
+    return os.path.join(BASE_DIR, config.get('cache', {}).get('dir', 'cache'))
+
+
+def get_cache_path(config):
+    """返回项目详情缓存文件路径，所有列表共用同一个缓存"""
+    return os.path.join(get_cache_dir(config), 'projects.cache.json')
+
+
+# 缩略图种类: (宽高比, 配置中的宽度列表键, 默认宽度, sizes 属性)
+THUMBNAIL_KINDS = {
+    'logo': (1.0, 'logo_widths', [150, 300], '(max-width: 768px) 100vw, 150px'),
+    'screenshot': (0.75, 'screenshot_widths', [220, 440], '220px')
+}
+# 单张源图片的最大字节数
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+
+class ImageStage:
+    """
+    下载 logo 和截图并生成缩略图，写入 docs/<页面名>/img/。
+    缩略图以源图片内容的哈希命名，缓存中记录 URL 到哈希的映射：
+    URL 未变化且缩略图都存在时不再下载，源图片内容未变化时不重新生成。
+    Pillow 未安装或下载失败时回退为直接引用原图。
+    """
+
+    # 本次运行中已经生成的缩略图 {(URL, 种类): (源图片哈希, 缩略图目录)}，多个列表共用同一图片时直接复制
+    processed = {}
+
+    def __init__(self, config, output_path):
+        options = config.get('images', {})
+        self.config = config
+        self.quality = int(options.get('quality', 75))
+        self.workers = max(1, int(options.get('workers', 8)))
+        self.widths = {
+            kind: [int(w) for w in options.get(key, default)]
+            for kind, (_, key, default, _) in THUMBNAIL_KINDS.items()
         }
+        self.enabled = options.get('enabled', True) and Image is not None
+        self.formats = [fmt for fmt in options.get('formats', ['avif', 'webp']) if Image is not None and pil_features.check(fmt)]
+        if options.get('enabled', True) and not self.enabled:
+            print("未安装 Pillow，跳过缩略图生成，页面将直接引用原图")
+        elif self.enabled and not self.formats:
+            print("Pillow 不支持配置的缩略图格式，跳过缩略图生成")
+            self.enabled = False
+
+        self.image_dir = os.path.join(get_fragments_dir(output_path), 'img')
+        self.image_url = os.path.basename(get_fragments_dir(output_path)) + '/img'
+        self.index_path = os.path.join(get_cache_dir(config), os.path.splitext(config['output']['filename'])[0] + '.images.json')
+        self.index = {}
+        self.session = None
+        self.executor = None
+        # 本次提交的图片 {(URL, 种类): Future[[(格式, 宽度, 文件名)] 或 None]}
+        self.futures = {}
+
+    def load_index(self):
+        """加载 URL 到源图片哈希的映射"""
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except Exception as e:
+            print(f"加载缩略图缓存失败，将重新下载所有图片: {e}")
+
+    def save_index(self, thumbnails):
+        """写入本次使用的映射并删除不再引用的缩略图"""
+        used_urls = {url for url, _ in thumbnails}
+        self.index = {url: digest for url, digest in self.index.items() if url in used_urls}
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+        used_files = {name for files in thumbnails.values() for _, _, name in files}
+        removed = 0
+        for name in os.listdir(self.image_dir):
+            if name not in used_files:
+                os.remove(os.path.join(self.image_dir, name))
+                removed += 1
+        print(f"缩略图: {len(used_files)} 个文件，删除 {removed} 个不再使用的文件")
+
+    def file_names(self, digest, kind):
+        return [(fmt, width, f"{digest[:16]}-{kind}-{width}.{fmt}")
+                for fmt in self.formats for width in self.widths[kind]]
+
+    def start(self):
+        """加载缓存并启动下载线程池"""
+        if not self.enabled:
+            return
+        os.makedirs(self.image_dir, exist_ok=True)
+        self.load_index()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def submit(self, jobs):
+        """提交 [(URL, 种类)] 到线程池，返回对应的 Future 列表，同一图片只处理一次"""
+        if not self.enabled:
+            return []
+        futures = []
+        for job in jobs:
+            if not job[0]:
+                continue
+            if job not in self.futures:
+                self.futures[job] = self.executor.submit(self.process_one, job)
+            futures.append(self.futures[job])
+        return futures
+
+    def finish(self, success=True):
+        """等待所有图片处理完成，写入缓存并清理不再使用的缩略图；生成失败时只停止线程池"""
+        if not self.enabled:
+            return
+        self.executor.shutdown(wait=True, cancel_futures=not success)
+        if not success:
+            return
+        thumbnails = {job: future.result() for job, future in self.futures.items() if future.result()}
+        self.save_index(thumbnails)
+
+    def process_one(self, job):
+        """返回一张图片的缩略图列表，失败时返回 None"""
+        url, kind = job
+        digest = self.index.get(url)
+        if digest and all(os.path.exists(os.path.join(self.image_dir, name)) for _, _, name in self.file_names(digest, kind)):
+            metrics.record_cache('thumbnails', hit=True)
+            ImageStage.processed[job] = (digest, self.image_dir)
+            return self.file_names(digest, kind)
+        if job in ImageStage.processed:
+            digest, image_dir = ImageStage.processed[job]
+            files = self.file_names(digest, kind)
+            if all(os.path.exists(os.path.join(image_dir, name)) for _, _, name in files):
+                for _, _, name in files:
+                    shutil.copyfile(os.path.join(image_dir, name), os.path.join(self.image_dir, name))
+                self.index[url] = digest
+                metrics.record_cache('thumbnails', hit=True)
+                return files
+        metrics.record_cache('thumbnails', hit=False)
+
+        start = time.perf_counter()
+        status = None
+        size = 0
+        try:
+            response = self.session.get(url, timeout=30, stream=True)
+            status = response.status_code
+            response.raise_for_status()
+            buffer = io.BytesIO()
+            for chunk in response.iter_content(64 * 1024):
+                buffer.write(chunk)
+                if buffer.tell() > MAX_IMAGE_BYTES:
+                    raise ValueError("图片过大")
+            data = buffer.getvalue()
+            size = len(data)
+            metrics.record_request('GET image', time.perf_counter() - start, status, size)
+            start = None
+            digest = hashlib.sha256(data).hexdigest()
+            self.index[url] = digest
+            files = self.file_names(digest, kind)
+            missing = [item for item in files if not os.path.exists(os.path.join(self.image_dir, item[2]))]
+            if missing:
+                self.render(data, kind, missing)
+            ImageStage.processed[job] = (digest, self.image_dir)
+            return files
+        except Exception as e:
+            if start is not None:
+                metrics.record_request('GET image', time.perf_counter() - start, status, size)
+            metrics.record_error('GET image')
+            print(f"生成缩略图失败 ({url}): {e}")
+            return None
+
+    def render(self, data, kind, files):
+        """将源图片裁剪为缩略图的宽高比并按各尺寸编码"""
+        ratio = THUMBNAIL_KINDS[kind][0]
+        with Image.open(io.BytesIO(data)) as source:
+            source = ImageOps.exif_transpose(source)
+            source = source.convert('RGBA' if source.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            for fmt, width, name in files:
+                size = (width, max(1, round(width * ratio)))
+                thumbnail = ImageOps.fit(source, size, Image.LANCZOS)
+                path = os.path.join(self.image_dir, name)
+                thumbnail.save(path + '.tmp', format=fmt.upper(), quality=self.quality)
+                os.replace(path + '.tmp', path)
+
+    def picture(self, url, kind, attributes):
+        """返回图片HTML，有缩略图时使用 <picture> 和 srcset"""
+        future = self.futures.get((url, kind))
+        files = future.result() if future is not None else None
+        if not files:
+            return f'<img loading="lazy" src="{url}" {attributes}>'
+
+        sizes = THUMBNAIL_KINDS[kind][3]
+        srcsets = {}
+        for fmt, width, name in files:
+            srcsets.setdefault(fmt, []).append(f"{self.image_url}/{name} {width}w")
+        fallback_fmt = self.formats[-1]
+        fallback = next(name for fmt, _, name in files if fmt == fallback_fmt)
+        sources = "".join(
+            f'<source type="image/{fmt}" srcset="{", ".join(srcset)}" sizes="{sizes}">'
+            for fmt, srcset in srcsets.items() if fmt != fallback_fmt
+        )
+        return (f'<picture>{sources}<img loading="lazy" src="{self.image_url}/{fallback}" '
+                f'srcset="{", ".join(srcsets[fallback_fmt])}" sizes="{sizes}" {attributes}></picture>')
+
+
+# 默认的镜像文件大小上限 (MB)，低于 GitHub 的单个文件限制
+DEFAULT_MIRROR_MAX_SIZE_MB = 95
+# GitHub 拒绝推送达到此大小 (MB) 的文件，镜像目录位于 docs 目录中时生效
+GITHUB_MAX_FILE_SIZE_MB = 100
+
+
+def get_mirror_dir(config):
+    """返回文件镜像目录，相对于脚本目录"""
+    return os.path.normpath(os.path.join(BASE_DIR, config.get('mirror', {}).get('dir', 'mirror')))
+
+
+def get_mirror_index_path(config):
+    """返回镜像索引文件路径，所有列表共用同一个镜像"""
+    return os.path.join(get_cache_dir(config), 'mirror.json')
+
+
+def load_mirror_index(config):
+    """加载镜像索引 {项目ID: {'file_id', 'sha1', 'path'}}，path 相对于镜像目录"""
+    index_path = get_mirror_index_path(config)
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
     except Exception as e:
-        print(f"获取项目详情失败 (ID: {project_id}): {e}")
-        return {'description': '', 'screenshots': [], 'download_url': None}
+        print(f"加载镜像索引失败，将重新下载所有文件: {e}")
+        return {}
 
 
-def process_media_sizes(html_content):
-    """处理HTML内容中图片和视频的尺寸，防止它们过大"""
-    # 处理图片
-    img_pattern = re.compile(r'<img(.*?)>')
-    img_with_size_pattern = re.compile(r'<img(.*?)(width|height)\s*=\s*["\'](\d+)["\'].*?>')
-    
-    # 限制图片最大宽度
-    def img_replace(match):
-        img_tag = match.group(0)
-        if 'width=' not in img_tag.lower() and 'height=' not in img_tag.lower():
-            return img_tag.replace('<img', '<img style="max-width:100%; height:auto;"')
-        return img_tag
-    
-    html_content = img_pattern.sub(img_replace, html_content)
-    
-    # 处理视频嵌入
-    iframe_pattern = re.compile(r'<iframe(.*?)>')
-    
-    def iframe_replace(match):
-        iframe_tag = match.group(0)
-        if 'width=' in iframe_tag.lower() or 'height=' in iframe_tag.lower():
-            # 替换掉现有的宽高属性
-            iframe_tag = re.sub(r'(width|height)\s*=\s*["\'](\d+)["\']', '', iframe_tag)
-        # 添加响应式样式
-        return iframe_tag.replace('<iframe', '<iframe style="max-width:100%; width:560px; height:315px;"')
+def save_mirror_index(config, index):
+    """原子地写入镜像索引"""
+    index_path = get_mirror_index_path(config)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, index_path)
+
+
+def get_mirror_base_url(config):
+    """
+    返回镜像文件链接的前缀。配置了 base_url 时使用它，否则使用相对于 docs 目录的路径；
+    镜像目录不在 docs 目录中又没有配置 base_url 时返回 None，下载按钮仍指向 CurseForge。
+    """
+    base_url = config.get('mirror', {}).get('base_url', '')
+    if base_url:
+        return base_url.rstrip('/') + '/'
+    docs_dir = os.path.normpath(os.path.join(BASE_DIR, "../../docs"))
+    relative = os.path.relpath(get_mirror_dir(config), docs_dir)
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        return None
+    return relative.replace(os.sep, '/') + '/'
+
+
+def download_mirror_file(session, latest_file, mirror_dir, max_bytes, timeout):
+    """
+    下载并校验一个文件，按内容的 SHA-1 存放为 <哈希前两位>/<哈希>/<文件名>，返回 (SHA-1, 相对路径)。
+    文件大小和 latestFiles 中给出的哈希都必须一致，校验失败时删除临时文件并抛出异常。
+    """
+    length = latest_file.get('length')
+    if length and length > max_bytes:
+        raise ValueError(f"文件过大 ({length} 字节)")
+
+    os.makedirs(mirror_dir, exist_ok=True)
+    tmp_path = os.path.join(mirror_dir, f".{latest_file['id']}.tmp")
+    digests = {'sha1': hashlib.sha1(), 'md5': hashlib.md5()}
+    size = 0
+    start = time.perf_counter()
+    status = None
+    try:
+        with session.get(latest_file['download_url'], timeout=timeout, stream=True) as response:
+            status = response.status_code
+            response.raise_for_status()
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(1024 * 1024):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError("文件过大")
+                    f.write(chunk)
+                    for digest in digests.values():
+                        digest.update(chunk)
+        metrics.record_request('GET file', time.perf_counter() - start, status, size)
+        start = None
+
+        if length is not None and size != length:
+            raise ValueError(f"文件大小不一致: 应为 {length} 字节，实际 {size} 字节")
+        for algo, expected in latest_file.get('hashes', {}).items():
+            if digests[algo].hexdigest() != expected:
+                raise ValueError(f"{algo} 校验失败")
+
+        sha1 = digests['sha1'].hexdigest()
+        # 文件名来自API，只保留最后一段，避免写到镜像目录之外
+        file_name = os.path.basename(latest_file.get('file_name', '').replace('\\', '/')) or str(latest_file['id'])
+        relative_path = f"{sha1[:2]}/{sha1}/{file_name}"
+        target = os.path.join(mirror_dir, *relative_path.split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(tmp_path, target)
+        return sha1, relative_path
+    except Exception:
+        if start is not None:
+            metrics.record_request('GET file', time.perf_counter() - start, status, size)
+        metrics.record_error('GET file')
+        raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def mirror_files(config, projects, index):
+    """
+    将每个项目的最新文件下载到镜像目录，并为已镜像的项目设置 project['mirror_url']，返回已镜像的项目ID。
+    index 为镜像索引，会被更新但不会写入文件。文件ID与上次相同且文件仍存在时不再下载；
+    作者禁止第三方分发（downloadUrl 为空）的文件不会镜像，下载失败的项目仍链接到 CurseForge，下次运行时重试。
+    """
+    options = config.get('mirror', {})
+    if not options.get('enabled', False):
+        return set()
+    base_url = get_mirror_base_url(config)
+    if base_url is None:
+        print("镜像目录不在 docs 目录中且没有配置 mirror.base_url，跳过文件镜像")
+        return set()
+
+    # 搜索结果中缺少文件信息的项目先批量补全
+    fill_missing_media(config, projects)
+    mirror_dir = get_mirror_dir(config)
+    max_size_mb = float(options.get('max_size_mb', DEFAULT_MIRROR_MAX_SIZE_MB))
+    if not options.get('base_url') and max_size_mb >= GITHUB_MAX_FILE_SIZE_MB:
+        # 镜像随 docs 目录推送到 GitHub，达到限制的文件会导致推送失败
+        print(f"镜像目录随 docs 目录推送到 GitHub，单个文件必须小于 {GITHUB_MAX_FILE_SIZE_MB}MB，"
+              f"max_size_mb 改为 {DEFAULT_MIRROR_MAX_SIZE_MB}")
+        max_size_mb = DEFAULT_MIRROR_MAX_SIZE_MB
+    max_bytes = int(max_size_mb * 1024 * 1024)
+    timeout = int(config.get('fetch', {}).get('timeout', 30))
+
+    candidates = []
+    pending = []
+    for project in projects:
+        latest_file = project.get('latest_file')
+        if not latest_file or not latest_file.get('download_url'):
+            continue
+        candidates.append(project)
+        entry = index.get(str(project['id']))
+        if entry and entry['file_id'] == latest_file['id'] and os.path.exists(os.path.join(mirror_dir, *entry['path'].split('/'))):
+            metrics.record_cache('mirror', hit=True)
+        else:
+            metrics.record_cache('mirror', hit=False)
+            pending.append(project)
+    print(f"文件镜像: {len(candidates) - len(pending)} 个文件未变化，{len(pending)} 个文件需要下载")
+
+    if pending:
+        workers = max(1, int(options.get('workers', 4)))
+        with requests.Session() as session, ThreadPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            futures = [
+                (project, executor.submit(download_mirror_file, session, project['latest_file'], mirror_dir, max_bytes, timeout))
+                for project in pending
+            ]
+            for project, future in tqdm(futures, desc="镜像文件", unit="文件"):
+                pid = str(project['id'])
+                try:
+                    sha1, relative_path = future.result()
+                    index[pid] = {'file_id': project['latest_file']['id'], 'sha1': sha1, 'path': relative_path}
+                except Exception as e:
+                    print(f"镜像文件失败 (ID: {project['id']}): {e}")
+                    # 不再链接到旧版本的文件
+                    index.pop(pid, None)
+
+    mirrored = set()
+    for project in candidates:
+        entry = index.get(str(project['id']))
+        if entry and entry['file_id'] == project['latest_file']['id']:
+            project['mirror_url'] = base_url + '/'.join(urllib.parse.quote(part) for part in entry['path'].split('/'))
+            mirrored.add(str(project['id']))
+    return mirrored
+
+
+def prune_mirror(config, index):
+    """删除镜像目录中不再被索引引用的文件"""
+    mirror_dir = get_mirror_dir(config)
+    if not os.path.isdir(mirror_dir):
+        return
+    used = {entry['path'] for entry in index.values()}
+    removed = 0
+    for root, dirs, files in os.walk(mirror_dir, topdown=False):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.relpath(path, mirror_dir).replace(os.sep, '/') not in used:
+                os.remove(path)
+                removed += 1
+        if root != mirror_dir and not os.listdir(root):
+            os.rmdir(root)
+    print(f"文件镜像: {len(used)} 个文件，删除 {removed} 个不再使用的文件")
+
+
+# 描述中保留的标签，其余标签去掉但保留其中的文字
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'center', 'code', 'div', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'iframe', 'img', 'li', 'ol', 'p', 'pre',
+    's', 'span', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'u', 'ul'
+}
+# 连同内容一起去掉的标签
+DROPPED_TAGS = {
+    'script', 'style', 'noscript', 'object', 'embed', 'form', 'button', 'textarea', 'select',
+    'svg', 'math', 'template', 'head', 'title', 'frameset', 'frame', 'applet'
+}
+# 没有结束标签的元素
+VOID_TAGS = {
+    'br', 'hr', 'img', 'input', 'meta', 'link', 'base', 'area', 'col', 'source', 'wbr',
+    'embed', 'frame', 'param', 'track', 'keygen'
+}
+# 各标签允许的属性，style 对所有保留的标签有效
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'iframe': {'src', 'title', 'allowfullscreen'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'}
+}
+# 允许嵌入的视频网站
+ALLOWED_IFRAME_HOSTS = ('youtube.com', 'youtube-nocookie.com', 'player.bilibili.com')
+# 单个 style 属性的最大长度，超过时丢弃
+MAX_STYLE_LENGTH = 300
+# 内联样式中允许的属性，其余属性（如 position、z-index）去掉，避免覆盖整个页面
+ALLOWED_STYLE_PROPERTIES = {
+    'color', 'background-color', 'font-size', 'font-style', 'font-weight', 'font-family',
+    'text-align', 'text-decoration', 'text-indent', 'line-height', 'letter-spacing',
+    'vertical-align', 'white-space', 'list-style-type',
+    'margin', 'margin-top', 'margin-right', 'margin-bottom', 'margin-left',
+    'padding', 'padding-top', 'padding-right', 'padding-bottom', 'padding-left',
+    'border', 'border-color', 'border-style', 'border-width', 'border-radius', 'border-collapse',
+    'width', 'height', 'max-width', 'max-height'
+}
+# 描述处理规则版本，修改 DescriptionSanitizer 时递增以重新处理描述
+SANITIZER_VERSION = 3
+# 处理后描述的默认最大长度（字符）
+DEFAULT_DESCRIPTION_MAX_LENGTH = 100000
+
+
+def clean_url(url, allow_mailto=False):
+    """只允许 http(s) 和相对地址，协议相对地址补全为 https，其余返回 None"""
+    url = url.strip()
+    if url.startswith('//'):
+        return 'https:' + url
+    scheme = url.split(':', 1)[0].lower() if ':' in url.split('/', 1)[0] else ''
+    if scheme in ('', 'http', 'https') or (allow_mailto and scheme == 'mailto'):
+        return url
+    return None
+
+
+def is_allowed_iframe_src(src):
+    """嵌入地址必须是 https，主机名在 ALLOWED_IFRAME_HOSTS 中，且不含反斜杠、控制字符和用户信息"""
+    if '\\' in src or any(ord(c) < 0x20 or ord(c) == 0x7f for c in src):
+        return False
+    try:
+        parts = urllib.parse.urlsplit(src)
+        host = parts.hostname
+    except ValueError:
+        return False
+    if parts.scheme != 'https' or not host or '@' in parts.netloc:
+        return False
+    return any(host == h or host.endswith('.' + h) for h in ALLOWED_IFRAME_HOSTS)
+
+
+def clean_style(style):
+    """只保留白名单中的样式属性，去掉含 url()、expression、转义字符和负外边距的值，没有可保留的属性时返回 None"""
+    if len(style) > MAX_STYLE_LENGTH:
+        return None
+    declarations = []
+    for declaration in style.split(';'):
+        name, _, value = declaration.partition(':')
+        name = name.strip().lower()
+        value = value.strip()
+        lowered = value.lower()
+        if name not in ALLOWED_STYLE_PROPERTIES or not value:
+            continue
+        if 'url(' in lowered or 'expression' in lowered or '\\' in value or '<' in value:
+            continue
+        if name.startswith('margin') and re.search(r'(^|\s)-', value):
+            continue
+        declarations.append(f'{name}:{value}')
+    return '; '.join(declarations) or None
+
+
+class DescriptionSanitizer(HTMLParser):
+    """
+    单次遍历处理 CurseForge 项目描述:
+    去掉脚本、事件属性和过长的内联样式，只保留白名单中的标签、属性和样式属性；
+    为图片和视频嵌入添加 loading="lazy" 并限制尺寸；补全未闭合的标签；
+    输出超过 max_length 时截断。
+    """
+
+    def __init__(self, max_length=DEFAULT_DESCRIPTION_MAX_LENGTH):
+        super().__init__(convert_charrefs=True)
+        self.max_length = max_length
+        self.parts = []
+        self.length = 0
+        self.open_tags = []
+        # 正在连同内容一起跳过的标签
+        self.skipping = []
+        self.truncated = False
+
+    def emit(self, text):
+        """输出一段HTML，超出长度限制时标记为已截断并返回 False"""
+        if self.length + len(text) > self.max_length:
+            self.truncated = True
+            return False
+        self.parts.append(text)
+        self.length += len(text)
+        return True
+
+    def handle_starttag(self, tag, attrs):
+        if self.truncated:
+            return
+        if self.skipping or tag in DROPPED_TAGS:
+            # 跳过的内容中只跟踪可能嵌套的同类标签
+            if (tag in DROPPED_TAGS or tag == 'iframe') and tag not in VOID_TAGS:
+                self.skipping.append(tag)
+            return
+        if tag not in ALLOWED_TAGS:
+            return
+
+        kept = {}
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        for name, value in attrs:
+            value = value or ''
+            if name == 'style':
+                style = clean_style(value)
+                if style:
+                    kept['style'] = style
+            elif name in allowed:
+                if name in ('href', 'src'):
+                    value = clean_url(value, allow_mailto=(name == 'href'))
+                    if value is None:
+                        continue
+                kept[name] = value
+
+        if tag == 'img':
+            if 'src' not in kept:
+                return
+            if 'width' not in kept and 'height' not in kept:
+                kept['style'] = 'max-width:100%; height:auto;'
+            kept['loading'] = 'lazy'
+        elif tag == 'iframe':
+            if not is_allowed_iframe_src(kept.get('src', '')):
+                # 不允许的嵌入连同内容一起去掉
+                self.skipping.append(tag)
+                return
+            kept['style'] = 'max-width:100%; width:560px; height:315px;'
+            kept['loading'] = 'lazy'
+        elif tag == 'a' and 'href' in kept:
+            kept['target'] = '_blank'
+            kept['rel'] = 'noopener noreferrer nofollow'
+
+        attributes = "".join(f' {name}="{html.escape(value)}"' for name, value in kept.items())
+        if self.emit(f'<{tag}{attributes}>') and tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.truncated:
+            return
+        if self.skipping:
+            if tag == self.skipping[-1]:
+                self.skipping.pop()
+            return
+        if tag not in self.open_tags:
+            return
+        # 关闭中间未闭合的标签
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f'</{open_tag}>')
+            self.length += len(open_tag) + 3
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.truncated or self.skipping:
+            return
+        text = html.escape(data, quote=False)
+        if not self.emit(text):
+            # 输出能容纳的部分文字
+            remaining = self.max_length - self.length
+            self.parts.append(html.escape(data[:max(0, remaining)], quote=False))
+
+    def result(self):
+        """结束解析，补全未闭合的标签并返回处理后的HTML"""
+        self.close()
+        # 结束标签和截断提示不计入长度限制
+        while self.open_tags:
+            self.parts.append(f'</{self.open_tags.pop()}>')
+        if self.truncated:
+            self.parts.append('<p><em>描述过长，已截断，完整内容请访问项目页面</em></p>')
+        return "".join(self.parts)
+
+
+def sanitize_description(description, max_length=DEFAULT_DESCRIPTION_MAX_LENGTH):
+    """清理项目描述HTML，见 DescriptionSanitizer"""
+    sanitizer = DescriptionSanitizer(max_length)
+    sanitizer.feed(description)
+    return sanitizer.result()
+
+
+def render_project_fragment(project, details, images):
+    """生成项目详情片段，展开"详细描述"或"画廊"时由页面按需加载"""
+    gallery_html = ""
+    if details['screenshots']:
+        for img in details['screenshots']:
+            gallery_html += images.picture(img['url'], 'screenshot', f'alt="{img["title"]}" title="{img["title"]}"')
+    else:
+        gallery_html = "<p>暂无图片</p>"
+
+    return {
+        'description': details['description'],
+        'gallery': gallery_html
+    }
+
+
+def get_fragments_dir(output_path):
+    """详情片段目录，与输出页面同名（不含扩展名）"""
+    return os.path.splitext(output_path)[0]
+
+
+def write_compressed(path, precompress=True):
+    """
+    为文件写入预压缩的 .gz 和 .br（需要安装 brotli）副本，供支持的服务器直接返回。
+    precompress 为 False 时删除已有的副本。
+    """
+    siblings = {'.gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        siblings['.br'] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+    if not precompress:
+        for suffix in COMPRESSED_SUFFIXES:
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        return
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    for suffix, compress in siblings.items():
+        with open(path + suffix + '.tmp', 'wb') as f:
+            f.write(compress(data))
+        os.replace(path + suffix + '.tmp', path + suffix)
+
+
+def write_if_changed(path, content, precompress=False):
+    """内容与现有文件不同时才写入，避免无意义的文件变动，同时更新预压缩副本。返回是否写入"""
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            unchanged = f.read() == content
+        if unchanged:
+            if precompress and not os.path.exists(path + '.gz'):
+                write_compressed(path)
+            return False
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    write_compressed(path, precompress)
+    return True
+
+
+def write_fragment(output_path, pid, fragment, precompress=False):
+    """写入单个项目的详情片段，内容未变化时不重写。返回是否写入"""
+    path = os.path.join(get_fragments_dir(output_path), f"{pid}.json")
+    return write_if_changed(path, json.dumps(fragment, ensure_ascii=False), precompress)
+
+
+def remove_stale_fragments(output_path, current_ids):
+    """删除已经不在列表中的项目的详情片段，返回删除的数量"""
+    fragments_dir = get_fragments_dir(output_path)
+    removed = 0
+    for name in os.listdir(fragments_dir):
+        base = name
+        for suffix in COMPRESSED_SUFFIXES:
+            if base.endswith(suffix):
+                base = base[:-len(suffix)]
+        stem = base[:-len('.json')]
+        if base.endswith('.json') and stem.isdigit() and stem not in current_ids:
+            os.remove(os.path.join(fragments_dir, name))
+            if base == name:
+                removed += 1
+    return removed
+
+
+def minify_html(content):
+    """去掉标签之间的换行缩进并合并连续空白，保留行内元素之间的单个空格"""
+    content = HTML_INDENT_PATTERN.sub('><', content)
+    return WHITESPACE_PATTERN.sub(' ', content)
+
+
+def minify_css(content):
+    """去掉注释和多余的空白"""
+    content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
+    content = re.sub(r'\s+', ' ', content)
+    return re.sub(r'\s*([{};:,>])\s*', r'\1', content).replace(';}', '}').strip()
+
+
+def minify_js(content):
+    """去掉整行注释、缩进和空行（不改写代码本身）"""
+    lines = (line.strip() for line in content.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith('//'))
+
+
+def write_asset(output_path, name, content, precompress=False):
+    """
+    将静态资源写入 docs/<页面名>/assets/<名称>.<内容哈希>.<扩展名>，返回相对于页面的URL。
+    文件名随内容变化，浏览器可以长期缓存；旧版本在新页面替换成功后由 prune_assets 删除。
+    """
+    assets_dir = os.path.join(get_fragments_dir(output_path), 'assets')
+    os.makedirs(assets_dir, exist_ok=True)
+    stem, ext = os.path.splitext(name)
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]
+    filename = f"{stem}.{digest}{ext}"
+    write_if_changed(os.path.join(assets_dir, filename), content, precompress)
+    return f"{os.path.basename(get_fragments_dir(output_path))}/assets/{filename}"
+
+
+def prune_assets(output_path, current):
+    """
+    页面替换成功后删除旧版本的静态资源。
+    保留本次和上一代的资源，仍在使用旧页面的浏览器和 CDN 缓存可以继续加载；各代记录在 assets/assets.json 中。
+    """
+    assets_dir = os.path.join(get_fragments_dir(output_path), 'assets')
+    manifest_path = os.path.join(assets_dir, ASSET_MANIFEST_FILENAME)
+    generations = {'current': [], 'previous': []}
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                generations = json.load(f)
+        except Exception as e:
+            print(f"读取资源记录失败: {e}")
+    current = sorted(current)
+    if current != generations.get('current'):
+        generations = {'current': current, 'previous': generations.get('current', [])}
+    keep = set(generations['current']) | set(generations['previous']) | {ASSET_MANIFEST_FILENAME}
+
+    for existing in os.listdir(assets_dir):
+        base = existing
+        for suffix in COMPRESSED_SUFFIXES:
+            if base.endswith(suffix):
+                base = base[:-len(suffix)]
+        if base not in keep:
+            os.remove(os.path.join(assets_dir, existing))
+    write_if_changed(manifest_path, json.dumps(generations, ensure_ascii=False), False)
+
+
+# 机器可读的数据集、变更和订阅源文件名，与详情片段放在同一目录
+DATASET_FILENAME = 'projects.json'
+CHANGES_FILENAME = 'changes.json'
+FEED_FILENAME = 'feed.xml'
+ATOM_NAMESPACE = 'http://www.w3.org/2005/Atom'
+
+# 预压缩副本的扩展名
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+# 记录本次和上一代静态资源文件名，与资源放在同一目录
+ASSET_MANIFEST_FILENAME = 'assets.json'
+# brotli 压缩级别，11 比 9 只小几个百分点但慢数倍，每次运行都要压缩上千个片段
+BROTLI_QUALITY = 9
+# 标签之间包含换行的空白（模板缩进）
+HTML_INDENT_PATTERN = re.compile(r'>\s*\n\s*<')
+WHITESPACE_PATTERN = re.compile(r'\s{2,}')
+
+# 搜索索引文件名，与详情片段放在同一目录
+SEARCH_INDEX_FILENAME = 'search-index.json'
+# 搜索分词: 拉丁字母和数字组成的单词，或连续的中日韩文字
+TOKEN_PATTERN = re.compile(r'[0-9a-z\u00c0-\u024f]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+')
+HTML_TAG_PATTERN = re.compile(r'<(script|style)\b.*?</\1\s*>|<[^>]+>', re.IGNORECASE | re.DOTALL)
+
+
+def tokenize(text):
+    """将文本拆分为搜索词。中日韩文字没有空格分词，拆为单字和相邻两字"""
+    tokens = []
+    for run in TOKEN_PATTERN.findall(text.lower()):
+        if run[0] < '\u3040':
+            tokens.append(run)
+        else:
+            tokens += list(run)
+            tokens += [run[i:i + 2] for i in range(len(run) - 1)]
+    return tokens
+
+
+def add_to_search_index(postings, position, project, details):
+    """
+    将项目加入倒排索引 {搜索词: [卡片序号]}，覆盖标题、简介和详细描述，
+    卡片序号为项目在页面中的初始顺序。
+    """
+    description = html.unescape(HTML_TAG_PATTERN.sub(' ', details['description']))
+    text = " ".join([html.unescape(project['title']), html.unescape(project['description']), description])
+    for token in set(tokenize(text)):
+        postings.setdefault(token, []).append(position)
+
+
+def build_orderings(projects):
+    """预先计算每种排序方式下的卡片序号，页面排序时直接按序号重排"""
+    positions = range(len(projects))
+    return {
+        'updated': sorted(positions, key=lambda i: projects[i]['iso_date'], reverse=True),
+        'downloads': sorted(positions, key=lambda i: projects[i]['downloads'], reverse=True)
+    }
+
+
+def render_project_card(project, details, fragment_url, logo_html):
+    """
+    生成单个项目卡片的HTML，详细描述和画廊在展开时从 fragment_url 加载。
+    下载量位置为占位符，由 fill_download_counts 填入，卡片缓存不受下载量变化影响。
+    """
     
-    html_content = iframe_pattern.sub(iframe_replace, html_content)
+    # 下载按钮HTML - 确保总是显示下载按钮
+    download_button = ""
+    # 有本地镜像时优先使用镜像
+    download_url = project.get('mirror_url') or details['download_url']
+    if download_url:
+        download_button = f'<a href="{html.escape(download_url)}" class="btn btn-cta download-cta" target="_blank">立即下载</a>'
+    else:
+        # 提供默认的项目页面作为备选
+        download_button = f'<a href="{project["link"]}" class="btn btn-cta download-cta" target="_blank">查看下载</a>'
     
-    return html_content
+    card = f"""
+    <div class="project-card" data-updated="{project['iso_date']}" data-downloads="{CARD_DOWNLOADS_MARK}">
+        {logo_html}
+        <div class="project-info">
+            <h2>{project['title']}</h2>
+            <p><strong>更新时间:</strong> <span class="badge badge-info">{project['updated']}</span></p>
+            <p><strong>下载量:</strong> <span class="badge badge-success">{CARD_DOWNLOADS_DISPLAY_MARK}</span></p>
+            <p><strong>简要描述:</strong> {project['description']}</p>
+            <div>
+                <a href="{project['link']}" class="btn btn-cta" target="_blank">访问项目页面</a>
+                {download_button}
+            </div>
+            
+            <button class="collapsible" data-fragment="{fragment_url}" data-part="description">详细描述</button>
+            <div class="content">
+                <div class="description"></div>
+            </div>
+            
+            <button class="collapsible" data-fragment="{fragment_url}" data-part="gallery">画廊</button>
+            <div class="content">
+                <div class="gallery"></div>
+            </div>
+        </div>
+    </div>
+    """
+    return card
+
+
+def fill_download_counts(card, project):
+    """将卡片中的下载量占位符替换为项目当前的下载量"""
+    return (card.replace(CARD_DOWNLOADS_MARK, str(project['downloads']))
+            .replace(CARD_DOWNLOADS_DISPLAY_MARK, project['downloads_display']))
+
+
+def get_project_card(project, details, cache, fragment_url, images):
+    """返回项目卡片HTML，卡片中渲染的字段未变化时复用缓存中的卡片"""
+    # 如果没有logo，使用默认图片
+    logo_url = project['logo_url'] if project['logo_url'] else "/api/placeholder/150/150"
+    logo_html = images.picture(logo_url, 'logo', f'class="project-logo" alt="{project["title"]} Logo"')
+    card_key = hashlib.sha256(json.dumps(
+        [CARD_TEMPLATE_VERSION, [project.get(field) for field in CARD_FIELDS], details['download_url'], fragment_url, logo_html],
+        ensure_ascii=False, default=str
+    ).encode('utf-8')).hexdigest()
+    entry = cache.get(str(project['id']))
+    # 同一项目在不同列表中的卡片分别缓存
+    cached = entry.get('cards', {}).get(fragment_url) if entry is not None else None
+    if cached is not None and cached[0] == card_key:
+        metrics.record_cache('cards', hit=True)
+        return fill_download_counts(cached[1], project)
+
+    metrics.record_cache('cards', hit=False)
+    card = render_project_card(project, details, fragment_url, logo_html)
+    if entry is not None:
+        entry.setdefault('cards', {})[fragment_url] = [card_key, card]
+    return fill_download_counts(card, project)
+
+
+# 页面样式，生成时写入带内容哈希的 .css 文件
+PAGE_CSS = """
+/* 基础样式 */
+body { 
+    font-family: 'Segoe UI', Arial, sans-serif; 
+    line-height: 1.6;
+    margin: 0;
+    padding: 0;
+    background-color: #f8f9fa;
+    color: #212529;
+}
+.container {
+    max-width: 1200px;
+    margin: 0 auto;
+    background-color: white;
+    padding: 25px;
+    border-radius: 8px;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+    margin-top: 20px;
+    margin-bottom: 20px;
+}
+h1 { 
+    text-align: center; 
+    color: #343a40;
+    margin-bottom: 30px;
+    font-weight: 600;
+    padding-bottom: 15px;
+    border-bottom: 2px solid #e9ecef;
+}
+h2 {
+    color: #343a40;
+    margin-top: 0;
+    margin-bottom: 15px;
+    font-weight: 600;
+}
+
+/* 表格样式 */
+table { 
+    width: 100%; 
+    border-collapse: collapse; 
+    margin-top: 20px; 
+    box-shadow: 0 2px 3px rgba(0,0,0,0.1);
+}
+th, td { 
+    padding: 12px 15px; 
+    text-align: left; 
+    border-bottom: 1px solid #dee2e6; 
+}
+th { 
+    background-color: #e9ecef; 
+    cursor: pointer; 
+    font-weight: 600;
+}
+tr:hover { 
+    background-color: #f8f9fa; 
+}
+
+/* 按钮样式 */
+.button-group {
+    display: flex;
+    justify-content: center;
+    margin-bottom: 25px;
+    flex-wrap: wrap;
+}
+.btn { 
+    padding: 10px 20px; 
+    margin: 8px;
+    background-color: #007bff;
+    color: white;
+    border: none;
+    border-radius: 4px;
+    cursor: pointer;
+    transition: all 0.3s ease;
+    font-weight: 500;
+    text-align: center;
+    text-decoration: none;
+    display: inline-block;
+    box-shadow: 0 2px 3px rgba(0,0,0,0.1);
+}
+.btn:hover { 
+    background-color: #0069d9; 
+    box-shadow: 0 4px 8px rgba(0,0,0,0.15);
+}
+.btn-success {
+    background-color: #28a745;
+}
+.btn-success:hover {
+    background-color: #218838;
+}
+.btn-secondary {
+    background-color: #6c757d;
+}
+.btn-secondary:hover {
+    background-color: #5a6268;
+}
+.btn-danger {
+    background-color: #dc3545;
+}
+.btn-danger:hover {
+    background-color: #c82333;
+}
+.btn-warning {
+    background-color: #ffc107;
+    color: #212529;
+}
+.btn-warning:hover {
+    background-color: #e0a800;
+}
+.btn-info {
+    background-color: #17a2b8;
+}
+.btn-info:hover {
+    background-color: #138496;
+}
+.btn-cta {
+    background-color: #28a745;
+    padding: 8px 16px;
+    font-size: 0.9rem;
+    margin-top: 10px;
+    margin-right: 10px;
+    display: inline-block;
+}
+.btn-cta:hover {
+    background-color: #218838;
+}
+.download-cta {
+    background-color: #dc3545;
+}
+.download-cta:hover {
+    background-color: #c82333;
+}
+
+/* 项目卡片样式 */
+.project-card {
+    display: flex;
+    border: 1px solid #dee2e6;
+    margin-bottom: 25px;
+    border-radius: 8px;
+    overflow: hidden;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+    transition: transform 0.3s ease, box-shadow 0.3s ease;
+    background-color: white;
+}
+.project-card:hover {
+    transform: translateY(-5px);
+    box-shadow: 0 10px 15px rgba(0,0,0,0.1);
+}
+.project-logo {
+    width: 150px;
+    height: 150px;
+    object-fit: cover;
+    border-right: 1px solid #e9ecef;
+}
+.project-card picture {
+    display: flex;
+    flex-shrink: 0;
+}
+.project-info {
+    padding: 20px;
+    flex-grow: 1;
+}
+.badge {
+    display: inline-block;
+    padding: 4px 8px;
+    background-color: #6c757d;
+    color: white;
+    border-radius: 4px;
+    font-size: 0.75rem;
+    margin-right: 5px;
+}
+.badge-info {
+    background-color: #17a2b8;
+}
+.badge-success {
+    background-color: #28a745;
+}
+
+/* 可折叠内容样式 */
+.collapsible {
+    background-color: #f8f9fa;
+    color: #343a40;
+    cursor: pointer;
+    padding: 12px 15px;
+    width: 100%;
+    border: 1px solid #dee2e6;
+    text-align: left;
+    outline: none;
+    font-size: 16px;
+    border-radius: 4px;
+    margin-top: 15px;
+    transition: background-color 0.3s ease;
+    font-weight: 500;
+}
+.active, .collapsible:hover {
+    background-color: #e9ecef;
+}
+.content {
+    padding: 0;
+    max-height: 0;
+    overflow: hidden;
+    transition: max-height 0.3s ease-out;
+    background-color: #f8f9fa;
+    border: 1px solid #dee2e6;
+    border-top: none;
+    border-radius: 0 0 4px 4px;
+}
+
+/* 画廊样式 */
+.gallery {
+    display: flex;
+    flex-wrap: wrap;
+    gap: 15px;
+    padding: 20px;
+    justify-content: center;
+}
+.gallery img {
+    width: 220px;
+    height: 165px;
+    object-fit: cover;
+    border-radius: 4px;
+    box-shadow: 0 2px 5px rgba(0,0,0,0.2);
+    transition: transform 0.3s ease;
+}
+.gallery img:hover {
+    transform: scale(1.05);
+}
+
+/* 排序选项样式 */
+.sorting-options {
+    text-align: center;
+    margin-bottom: 25px;
+    padding: 15px;
+    background-color: #f8f9fa;
+    border-radius: 8px;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.05);
+}
+
+/* 搜索框样式 */
+.search-input {
+    width: 100%;
+    max-width: 500px;
+    padding: 10px 15px;
+    font-size: 16px;
+    border: 1px solid #ced4da;
+    border-radius: 4px;
+    box-sizing: border-box;
+}
+.search-status {
+    color: #6c757d;
+    font-size: 0.9rem;
+    margin: 8px 0 0;
+    min-height: 1.2em;
+}
+
+/* 描述样式 */
+.description {
+    padding: 20px;
+    max-width: 100%;
+    overflow-x: auto;
+    background-color: white;
+    border-radius: 4px;
+}
+.description img {
+    max-width: 100%;
+    height: auto;
+    border-radius: 4px;
+    margin: 10px 0;
+}
+.description iframe {
+    max-width: 100%;
+    border-radius: 4px;
+    margin: 10px 0;
+}
+
+/* 返回顶部按钮 */
+.back-to-top {
+    position: fixed;
+    bottom: 30px;
+    right: 30px;
+    background-color: #007bff;
+    color: white;
+    width: 50px;
+    height: 50px;
+    border-radius: 50%;
+    display: flex;
+    justify-content: center;
+    align-items: center;
+    text-decoration: none;
+    box-shadow: 0 4px 10px rgba(0,0,0,0.2);
+    opacity: 0;
+    visibility: hidden;
+    transition: opacity 0.3s ease, visibility 0.3s ease;
+    z-index: 1000;
+}
+.back-to-top.visible {
+    opacity: 1;
+    visibility: visible;
+}
+.back-to-top:hover {
+    background-color: #0069d9;
+}
+
+/* Credit 样式 */
+.credits {
+    text-align: center;
+    margin-top: 30px;
+    padding-top: 20px;
+    border-top: 1px solid #dee2e6;
+    color: #6c757d;
+    font-size: 0.9rem;
+}
+
+/* 响应式调整 */
+@media (max-width: 768px) {
+    .project-card {
+        flex-direction: column;
+    }
+    .project-logo {
+        width: 100%;
+        height: 200px;
+        border-right: none;
+        border-bottom: 1px solid #e9ecef;
+    }
+    .btn {
+        width: 100%;
+        margin: 5px 0;
+    }
+    .button-group {
+        flex-direction: column;
+    }
+}
+"""
+
+# 页面脚本，生成时写入带内容哈希的 .js 文件；页面相关的数据通过 pageData 传入
+PAGE_JS = """
+// 等待文档加载完成后初始化
+document.addEventListener('DOMContentLoaded', function() {
+    // 初始化所有可折叠元素
+    initCollapsibles();
+
+    // 初始化返回顶部按钮
+    initBackToTop();
+});
+
+// 详情片段按URL缓存，同一项目的描述和画廊只请求一次
+var fragmentRequests = {};
+
+function loadFragment(url) {
+    if (!fragmentRequests[url]) {
+        fragmentRequests[url] = fetch(url).then(function(response) {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            return response.json();
+        }).catch(function(error) {
+            delete fragmentRequests[url];
+            throw error;
+        });
+    }
+    return fragmentRequests[url];
+}
+
+// 展开时按内容重新计算高度，图片加载完成后再更新一次
+function updateHeight(content) {
+    if (content.style.maxHeight) {
+        content.style.maxHeight = content.scrollHeight + "px";
+    }
+}
+
+// 首次展开时加载详情片段
+function fillContent(button, content) {
+    var target = content.firstElementChild;
+    if (!button.dataset.fragment || button.dataset.loaded) {
+        return;
+    }
+    button.dataset.loaded = "1";
+    target.innerHTML = "<p>加载中...</p>";
+    loadFragment(button.dataset.fragment).then(function(fragment) {
+        target.innerHTML = fragment[button.dataset.part];
+        var images = target.getElementsByTagName("img");
+        for (var j = 0; j < images.length; j++) {
+            images[j].addEventListener("load", function() { updateHeight(content); });
+        }
+        updateHeight(content);
+    }).catch(function() {
+        delete button.dataset.loaded;
+        target.innerHTML = "<p>加载失败，请稍后重试</p>";
+        updateHeight(content);
+    });
+}
+
+// 初始化所有可折叠元素
+function initCollapsibles() {
+    var coll = document.getElementsByClassName("collapsible");
+    for (var i = 0; i < coll.length; i++) {
+        coll[i].addEventListener("click", function() {
+            this.classList.toggle("active");
+            var content = this.nextElementSibling;
+            if (content.style.maxHeight) {
+                content.style.maxHeight = null;
+            } else {
+                fillContent(this, content);
+                content.style.maxHeight = content.scrollHeight + "px";
+            }
+        });
+    }
+}
+
+// 初始化返回顶部按钮
+function initBackToTop() {
+    var backToTopButton = document.getElementById("backToTop");
+
+    // 当页面滚动超过300px时显示按钮
+    window.addEventListener('scroll', function() {
+        if (window.pageYOffset > 300) {
+            backToTopButton.classList.add('visible');
+        } else {
+            backToTopButton.classList.remove('visible');
+        }
+    });
+
+    // 点击按钮时平滑滚动到顶部
+    backToTopButton.addEventListener('click', function(e) {
+        e.preventDefault();
+        window.scrollTo({ top: 0, behavior: 'smooth' });
+    });
+}
+
+// 预先计算的排序（卡片序号数组），搜索索引在首次搜索时加载
+var orderings = pageData.orderings;
+var searchIndexUrl = pageData.searchIndexUrl;
+var tokenPattern = new RegExp(pageData.tokenPattern, "g");
+var cards = null;
+var currentOrder = null;
+var currentMatches = null;
+var searchIndex = null;
+var searchIndexRequest = null;
+
+document.addEventListener('DOMContentLoaded', function() {
+    cards = Array.from(document.getElementById('projectsContainer').getElementsByClassName('project-card'));
+    var input = document.getElementById('searchInput');
+    input.addEventListener('focus', loadSearchIndex);
+    input.addEventListener('input', function() { search(input.value); });
+});
+
+function loadSearchIndex() {
+    if (!searchIndexRequest) {
+        searchIndexRequest = fetch(searchIndexUrl).then(function(response) {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            return response.json();
+        }).then(function(index) {
+            searchIndex = index;
+            return index;
+        }).catch(function(error) {
+            searchIndexRequest = null;
+            document.getElementById('searchStatus').textContent = "搜索索引加载失败";
+            throw error;
+        });
+    }
+    return searchIndexRequest;
+}
+
+// 与生成器相同的分词方式: 中日韩文字按单字（只有一个字时）或相邻两字查找
+function tokenize(text) {
+    var tokens = [];
+    var runs = text.toLowerCase().match(tokenPattern) || [];
+    runs.forEach(function(run) {
+        if (run[0] < "\u3040") {
+            tokens.push({ term: run, prefix: false });
+        } else if (run.length === 1) {
+            tokens.push({ term: run, prefix: false });
+        } else {
+            for (var i = 0; i < run.length - 1; i++) {
+                tokens.push({ term: run.substr(i, 2), prefix: false });
+            }
+        }
+    });
+    // 正在输入的最后一个单词按前缀匹配
+    if (tokens.length && /[0-9a-z\u00c0-\u024f]$/.test(text.toLowerCase())) {
+        tokens[tokens.length - 1].prefix = true;
+    }
+    return tokens;
+}
+
+function lookup(token) {
+    if (!token.prefix) {
+        return new Set(searchIndex[token.term] || []);
+    }
+    var result = new Set();
+    for (var term in searchIndex) {
+        if (term.startsWith(token.term)) {
+            searchIndex[term].forEach(function(position) { result.add(position); });
+        }
+    }
+    return result;
+}
+
+function search(query) {
+    var tokens = tokenize(query);
+    if (!tokens.length) {
+        currentMatches = null;
+        render();
+        return;
+    }
+    loadSearchIndex().then(function() {
+        var matches = null;
+        tokens.forEach(function(token) {
+            var found = lookup(token);
+            matches = matches === null ? found : new Set(Array.from(matches).filter(function(position) { return found.has(position); }));
+        });
+        currentMatches = matches;
+        render();
+    });
+}
+
+// 按当前排序重排卡片并隐藏不匹配的项目，只移动节点不重建HTML
+function render() {
+    var container = document.getElementById('projectsContainer');
+    var order = currentOrder || cards.map(function(card, position) { return position; });
+    var fragment = document.createDocumentFragment();
+    order.forEach(function(position) {
+        var card = cards[position];
+        card.style.display = currentMatches && !currentMatches.has(position) ? "none" : "";
+        fragment.appendChild(card);
+    });
+    container.appendChild(fragment);
+    document.getElementById('searchStatus').textContent =
+        currentMatches ? "找到 " + currentMatches.size + " 个项目" : "";
+}
+
+// 排序功能
+function sortTable(criteria) {
+    currentOrder = orderings[criteria];
+    render();
+}
+"""
 
 
-def generate_html(config, projects):
-    """生成HTML文件展示项目信息"""
+def generate_html(config, projects, cache=None, output_dir=None):
+    """
+    生成HTML文件展示项目信息。
+    cache 为项目详情缓存，会被更新但不会写入文件，多个列表共用同一个缓存时同一项目只获取一次。
+    output_dir 为输出目录，默认为仓库的 docs 目录。
+    """
     # 创建docs目录如果不存在
-    docs_dir = os.path.join(BASE_DIR, "../../docs")
+    docs_dir = output_dir or os.path.join(BASE_DIR, "../../docs")
     os.makedirs(docs_dir, exist_ok=True)
     
     output_path = os.path.join(docs_dir, config['output']['filename'])
@@ -231,322 +2180,16 @@ def generate_html(config, projects):
     <title>{title}</title>
     <meta charset="utf-8">
     <meta name="viewport" content="width=device-width, initial-scale=1">
-    <style>
-        /* 基础样式 */
-        body {{ 
-            font-family: 'Segoe UI', Arial, sans-serif; 
-            line-height: 1.6;
-            margin: 0;
-            padding: 0;
-            background-color: #f8f9fa;
-            color: #212529;
-        }}
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-            background-color: white;
-            padding: 25px;
-            border-radius: 8px;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-            margin-top: 20px;
-            margin-bottom: 20px;
-        }}
-        h1 {{ 
-            text-align: center; 
-            color: #343a40;
-            margin-bottom: 30px;
-            font-weight: 600;
-            padding-bottom: 15px;
-            border-bottom: 2px solid #e9ecef;
-        }}
-        h2 {{
-            color: #343a40;
-            margin-top: 0;
-            margin-bottom: 15px;
-            font-weight: 600;
-        }}
-        
-        /* 表格样式 */
-        table {{ 
-            width: 100%; 
-            border-collapse: collapse; 
-            margin-top: 20px; 
-            box-shadow: 0 2px 3px rgba(0,0,0,0.1);
-        }}
-        th, td {{ 
-            padding: 12px 15px; 
-            text-align: left; 
-            border-bottom: 1px solid #dee2e6; 
-        }}
-        th {{ 
-            background-color: #e9ecef; 
-            cursor: pointer; 
-            font-weight: 600;
-        }}
-        tr:hover {{ 
-            background-color: #f8f9fa; 
-        }}
-        
-        /* 按钮样式 */
-        .button-group {{
-            display: flex;
-            justify-content: center;
-            margin-bottom: 25px;
-            flex-wrap: wrap;
-        }}
-        .btn {{ 
-            padding: 10px 20px; 
-            margin: 8px;
-            background-color: #007bff;
-            color: white;
-            border: none;
-            border-radius: 4px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            font-weight: 500;
-            text-align: center;
-            text-decoration: none;
-            display: inline-block;
-            box-shadow: 0 2px 3px rgba(0,0,0,0.1);
-        }}
-        .btn:hover {{ 
-            background-color: #0069d9; 
-            box-shadow: 0 4px 8px rgba(0,0,0,0.15);
-        }}
-        .btn-success {{
-            background-color: #28a745;
-        }}
-        .btn-success:hover {{
-            background-color: #218838;
-        }}
-        .btn-secondary {{
-            background-color: #6c757d;
-        }}
-        .btn-secondary:hover {{
-            background-color: #5a6268;
-        }}
-        .btn-danger {{
-            background-color: #dc3545;
-        }}
-        .btn-danger:hover {{
-            background-color: #c82333;
-        }}
-        .btn-warning {{
-            background-color: #ffc107;
-            color: #212529;
-        }}
-        .btn-warning:hover {{
-            background-color: #e0a800;
-        }}
-        .btn-info {{
-            background-color: #17a2b8;
-        }}
-        .btn-info:hover {{
-            background-color: #138496;
-        }}
-        .btn-cta {{
-            background-color: #28a745;
-            padding: 8px 16px;
-            font-size: 0.9rem;
-            margin-top: 10px;
-            margin-right: 10px;
-            display: inline-block;
-        }}
-        .btn-cta:hover {{
-            background-color: #218838;
-        }}
-        .download-cta {{
-            background-color: #dc3545;
-        }}
-        .download-cta:hover {{
-            background-color: #c82333;
-        }}
-        
-        /* 项目卡片样式 */
-        .project-card {{
-            display: flex;
-            border: 1px solid #dee2e6;
-            margin-bottom: 25px;
-            border-radius: 8px;
-            overflow: hidden;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-            background-color: white;
-        }}
-        .project-card:hover {{
-            transform: translateY(-5px);
-            box-shadow: 0 10px 15px rgba(0,0,0,0.1);
-        }}
-        .project-logo {{
-            width: 150px;
-            height: 150px;
-            object-fit: cover;
-            border-right: 1px solid #e9ecef;
-        }}
-        .project-info {{
-            padding: 20px;
-            flex-grow: 1;
-        }}
-        .badge {{
-            display: inline-block;
-            padding: 4px 8px;
-            background-color: #6c757d;
-            color: white;
-            border-radius: 4px;
-            font-size: 0.75rem;
-            margin-right: 5px;
-        }}
-        .badge-info {{
-            background-color: #17a2b8;
-        }}
-        .badge-success {{
-            background-color: #28a745;
-        }}
-        
-        /* 可折叠内容样式 */
-        .collapsible {{
-            background-color: #f8f9fa;
-            color: #343a40;
-            cursor: pointer;
-            padding: 12px 15px;
-            width: 100%;
-            border: 1px solid #dee2e6;
-            text-align: left;
-            outline: none;
-            font-size: 16px;
-            border-radius: 4px;
-            margin-top: 15px;
-            transition: background-color 0.3s ease;
-            font-weight: 500;
-        }}
-        .active, .collapsible:hover {{
-            background-color: #e9ecef;
-        }}
-        .content {{
-            padding: 0;
-            max-height: 0;
-            overflow: hidden;
-            transition: max-height 0.3s ease-out;
-            background-color: #f8f9fa;
-            border: 1px solid #dee2e6;
-            border-top: none;
-            border-radius: 0 0 4px 4px;
-        }}
-        
-        /* 画廊样式 */
-        .gallery {{
-            display: flex;
-            flex-wrap: wrap;
-            gap: 15px;
-            padding: 20px;
-            justify-content: center;
-        }}
-        .gallery img {{
-            width: 220px;
-            height: 165px;
-            object-fit: cover;
-            border-radius: 4px;
-            box-shadow: 0 2px 5px rgba(0,0,0,0.2);
-            transition: transform 0.3s ease;
-        }}
-        .gallery img:hover {{
-            transform: scale(1.05);
-        }}
-        
-        /* 排序选项样式 */
-        .sorting-options {{
-            text-align: center;
-            margin-bottom: 25px;
-            padding: 15px;
-            background-color: #f8f9fa;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-        }}
-        
-        /* 描述样式 */
-        .description {{
-            padding: 20px;
-            max-width: 100%;
-            overflow-x: auto;
-            background-color: white;
-            border-radius: 4px;
-        }}
-        .description img {{
-            max-width: 100%;
-            height: auto;
-            border-radius: 4px;
-            margin: 10px 0;
-        }}
-        .description iframe {{
-            max-width: 100%;
-            border-radius: 4px;
-            margin: 10px 0;
-        }}
-        
-        /* 返回顶部按钮 */
-        .back-to-top {{
-            position: fixed;
-            bottom: 30px;
-            right: 30px;
-            background-color: #007bff;
-            color: white;
-            width: 50px;
-            height: 50px;
-            border-radius: 50%;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            text-decoration: none;
-            box-shadow: 0 4px 10px rgba(0,0,0,0.2);
-            opacity: 0;
-            visibility: hidden;
-            transition: opacity 0.3s ease, visibility 0.3s ease;
-            z-index: 1000;
-        }}
-        .back-to-top.visible {{
-            opacity: 1;
-            visibility: visible;
-        }}
-        .back-to-top:hover {{
-            background-color: #0069d9;
-        }}
-        
-        /* Credit 样式 */
-        .credits {{
-            text-align: center;
-            margin-top: 30px;
-            padding-top: 20px;
-            border-top: 1px solid #dee2e6;
-            color: #6c757d;
-            font-size: 0.9rem;
-        }}
-        
-        /* 响应式调整 */
-        @media (max-width: 768px) {{
-            .project-card {{
-                flex-direction: column;
-            }}
-            .project-logo {{
-                width: 100%;
-                height: 200px;
-                border-right: none;
-                border-bottom: 1px solid #e9ecef;
-            }}
-            .btn {{
-                width: 100%;
-                margin: 5px 0;
-            }}
-            .button-group {{
-                flex-direction: column;
-            }}
-        }}
-    </style>
+    <link rel="stylesheet" href="{css_url}">
+    <link rel="alternate" type="application/atom+xml" title="{title}" href="{feed_url}">
 </head>
 <body>
     <div class="container">
         <h1>{title}</h1>
         
         <div class="sorting-options">
+            <input type="search" id="searchInput" class="search-input" placeholder="搜索枪包名称、简介或描述">
+            <p id="searchStatus" class="search-status"></p>
             <div class="button-group">
                 <button class="btn" onclick="sortTable('updated')">按更新时间排序</button>
                 <button class="btn" onclick="sortTable('downloads')">按下载量排序</button>
@@ -566,181 +2209,387 @@ def generate_html(config, projects):
     
     <a href="#" class="back-to-top" id="backToTop" title="返回顶部">↑</a>
 
-    <script>
-        // 等待文档加载完成后初始化
-        document.addEventListener('DOMContentLoaded', function() {{
-            // 初始化所有可折叠元素
-            initCollapsibles();
-            
-            // 初始化返回顶部按钮
-            initBackToTop();
-        }});
-
-        // 初始化所有可折叠元素
-        function initCollapsibles() {{
-            var coll = document.getElementsByClassName("collapsible");
-            for (var i = 0; i < coll.length; i++) {{
-                coll[i].addEventListener("click", function() {{
-                    this.classList.toggle("active");
-                    var content = this.nextElementSibling;
-                    if (content.style.maxHeight) {{
-                        content.style.maxHeight = null;
-                    }} else {{
-                        content.style.maxHeight = content.scrollHeight + "px";
-                    }}
-                }});
-            }}
-        }}
-        
-        // 初始化返回顶部按钮
-        function initBackToTop() {{
-            var backToTopButton = document.getElementById("backToTop");
-            
-            // 当页面滚动超过300px时显示按钮
-            window.addEventListener('scroll', function() {{
-                if (window.pageYOffset > 300) {{
-                    backToTopButton.classList.add('visible');
-                }} else {{
-                    backToTopButton.classList.remove('visible');
-                }}
-            }});
-            
-            // 点击按钮时平滑滚动到顶部
-            backToTopButton.addEventListener('click', function(e) {{
-                e.preventDefault();
-                window.scrollTo({{ top: 0, behavior: 'smooth' }});
-            }});
-        }}
-
-        // 排序功能
-        function sortTable(criteria) {{
-            const container = document.getElementById('projectsContainer');
-            const cards = Array.from(container.getElementsByClassName('project-card'));
-            
-            cards.sort((a, b) => {{
-                if(criteria === 'updated') {{
-                    return b.dataset.updated.localeCompare(a.dataset.updated);
-                }} else if(criteria === 'downloads') {{
-                    return parseInt(b.dataset.downloads) - parseInt(a.dataset.downloads);
-                }}
-                return 0;
-            }});
-
-            container.innerHTML = '';
-            cards.forEach(card => container.appendChild(card));
-        }}
-    </script>
+    <script>var pageData = {page_data};</script>
+    <script src="{js_url}"></script>
 </body>
 </html>
     """
 
-    project_cards = []
-    # 使用tqdm创建进度条
-    for project in tqdm(projects, desc="生成项目卡片", unit="项目"):
-        # 获取项目的详细信息
-        details = fetch_project_details(config, project['id'])
-        
-        # 准备画廊HTML
-        gallery_html = ""
-        if details['screenshots']:
-            for img in details['screenshots']:
-                gallery_html += f'<img src="{img["url"]}" alt="{img["title"]}" title="{img["title"]}">'
-        else:
-            gallery_html = "<p>暂无图片</p>"
+    # 模板在卡片处拆分为页头和页尾，卡片逐个写入
+    fragments_url = os.path.basename(get_fragments_dir(output_path))
+    header_template, footer_template = html_template.split('{project_cards}')
+    precompress = config['output'].get('precompress', True)
+    # 样式和脚本写入带内容哈希的文件，页面相关的数据内联在页面中
+    page_data = {
+        'orderings': build_orderings(projects),
+        'searchIndexUrl': f"{fragments_url}/{SEARCH_INDEX_FILENAME}",
+        'tokenPattern': TOKEN_PATTERN.pattern
+    }
+    css_url = write_asset(output_path, 'style.css', minify_css(PAGE_CSS), precompress)
+    js_url = write_asset(output_path, 'app.js', minify_js(PAGE_JS), precompress)
+    header = minify_html(header_template.format(
+        title=config['output']['title'],
+        feed_url=f"{fragments_url}/{FEED_FILENAME}",
+        css_url=css_url
+    )).strip()
+    footer = minify_html(footer_template.format(
+        update_time=current_time,
+        page_data=json.dumps(page_data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/'),
+        js_url=js_url
+    )).strip()
 
-        # 如果没有logo，使用默认图片
-        logo_url = project['logo_url'] if project['logo_url'] else "/api/placeholder/150/150"
-        
-        # 下载按钮HTML - 确保总是显示下载按钮
-        download_button = ""
-        if details['download_url']:
-            download_button = f'<a href="{details["download_url"]}" class="btn btn-cta download-cta" target="_blank">立即下载</a>'
-        else:
-            # 提供默认的项目页面作为备选
-            download_button = f'<a href="{project["link"]}" class="btn btn-cta download-cta" target="_blank">查看下载</a>'
-        
-        card = f"""
-        <div class="project-card" data-updated="{project['iso_date']}" data-downloads="{project['downloads']}">
-            <img class="project-logo" src="{logo_url}" alt="{project['title']} Logo">
-            <div class="project-info">
-                <h2>{project['title']}</h2>
-                <p><strong>更新时间:</strong> <span class="badge badge-info">{project['updated']}</span></p>
-                <p><strong>下载量:</strong> <span class="badge badge-success">{project['downloads_display']}</span></p>
-                <p><strong>简要描述:</strong> {project['description']}</p>
-                <div>
-                    <a href="{project['link']}" class="btn btn-cta" target="_blank">访问项目页面</a>
-                    {download_button}
-                </div>
-                
-                <button class="collapsible">详细描述</button>
-                <div class="content">
-                    <div class="description">
-                        {details['description']}
-                    </div>
-                </div>
-                
-                <button class="collapsible">画廊</button>
-                <div class="content">
-                    <div class="gallery">
-                        {gallery_html}
-                    </div>
-                </div>
-            </div>
-        </div>
-        """
-        project_cards.append(card)
+    cache = cache if cache is not None else {}
+    images = ImageStage(config, output_path)
+    postings = {}
+    fragments_written = 0
+    os.makedirs(get_fragments_dir(output_path), exist_ok=True)
+
+    def write_card(f, position, project, details, image_futures):
+        nonlocal fragments_written
+        # 等待该项目的缩略图生成完成
+        for future in image_futures:
+            future.result()
+        pid = str(project['id'])
+        if write_fragment(output_path, pid, render_project_fragment(project, details, images), precompress):
+            fragments_written += 1
+        add_to_search_index(postings, position, project, details)
+        f.write(minify_html(get_project_card(project, details, cache, f"{fragments_url}/{pid}.json", images)).strip())
+
+    # 写入临时文件，完成后原子地替换，中途失败不会留下不完整的页面
+    tmp_path = output_path + '.tmp'
+    images.start()
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(header)
+            # 并发获取详细信息和缩略图，按原顺序逐个写入卡片；未变化的项目直接使用缓存
+            pending = deque()
+            # 渲染中途出错时关闭生成器，取消尚未开始的详情请求
+            with contextlib.closing(fetch_all_project_details(config, projects, cache)) as details_iter:
+                for position, (project, details) in enumerate(zip(projects, details_iter)):
+                    image_jobs = [(project['logo_url'], 'logo')] + [(img['url'], 'screenshot') for img in details['screenshots']]
+                    pending.append((position, project, details, images.submit(image_jobs)))
+                    # 只保留少量等待缩略图的项目，内存占用不随项目数量增长
+                    while pending and (len(pending) > images.workers * 2 or all(future.done() for future in pending[0][3])):
+                        write_card(f, *pending.popleft())
+            while pending:
+                write_card(f, *pending.popleft())
+            f.write(footer)
+        os.replace(tmp_path, output_path)
+        write_compressed(output_path, precompress)
+    except BaseException:
+        images.finish(success=False)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    images.finish()
+    # 新页面已经替换，旧页面引用的资源保留一代
+    prune_assets(output_path, [os.path.basename(css_url), os.path.basename(js_url)])
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(html_template.format(
-            project_cards="".join(project_cards),
-            title=config['output']['title'],
-            update_time=current_time
-        ))
+    removed = remove_stale_fragments(output_path, {str(project['id']) for project in projects})
+    print(f"详情片段: 更新 {fragments_written} 个，删除 {removed} 个，共 {len(projects)} 个")
+    # 搜索索引单独写入，页面在首次搜索时加载
+    search_index_path = os.path.join(get_fragments_dir(output_path), SEARCH_INDEX_FILENAME)
+    search_index = {token: postings[token] for token in sorted(postings)}
+    write_if_changed(search_index_path, json.dumps(search_index, ensure_ascii=False, separators=(',', ':')), precompress)
 
     return output_path
 
 
+def build_dataset_entry(project):
+    """数据集中单个项目的字段"""
+    return {
+        'id': project['id'],
+        'name': project['title'],
+        'summary': project['description'],
+        'url': project['link'],
+        'logo': project['logo_url'],
+        'downloads': project['downloads'],
+        'dateModified': project['iso_date'],
+        'downloadUrl': project.get('download_url')
+    }
+
+
+def diff_datasets(previous, current):
+    """比较两次的数据集，返回新增、更新和下架的项目"""
+    previous_by_id = {entry['id']: entry for entry in previous}
+    current_ids = {entry['id'] for entry in current}
+    added = [entry for entry in current if entry['id'] not in previous_by_id]
+    updated = [entry for entry in current
+               if entry['id'] in previous_by_id and entry['dateModified'] != previous_by_id[entry['id']]['dateModified']]
+    removed = [{'id': entry['id'], 'name': entry['name'], 'url': entry['url']}
+               for entry in previous if entry['id'] not in current_ids]
+    return added, updated, removed
+
+
+def build_atom_feed(config, entries, updated_at):
+    """生成最近更新的项目的 Atom 订阅源，每次项目更新都是一个新条目"""
+    site_url = config['output'].get('site_url', '')
+    max_entries = int(config.get('feed', {}).get('max_entries', 50))
+    recent = sorted(entries, key=lambda entry: entry['dateModified'], reverse=True)[:max_entries]
+
+    ET.register_namespace('', ATOM_NAMESPACE)
+    feed = ET.Element(f'{{{ATOM_NAMESPACE}}}feed')
+
+    def add(parent, tag, text=None, **attributes):
+        element = ET.SubElement(parent, f'{{{ATOM_NAMESPACE}}}{tag}', attributes)
+        if text is not None:
+            element.text = text
+        return element
+
+    add(feed, 'title', config['output']['title'])
+    add(feed, 'id', f"urn:curseforge:search:{config['search']['gameId']}:{config['search']['classId']}:{config['search']['searchFilter']}")
+    add(feed, 'updated', recent[0]['dateModified'] if recent else updated_at)
+    if site_url:
+        page_url = site_url.rstrip('/') + '/' + config['output']['filename']
+        add(feed, 'link', rel='alternate', type='text/html', href=page_url)
+        add(feed, 'link', rel='self', type='application/atom+xml',
+            href=site_url.rstrip('/') + '/' + os.path.splitext(config['output']['filename'])[0] + '/' + FEED_FILENAME)
+    add(add(feed, 'author'), 'name', 'CurseForge')
+
+    for entry in recent:
+        item = add(feed, 'entry')
+        add(item, 'title', entry['name'])
+        add(item, 'id', f"urn:curseforge:project:{entry['id']}:{entry['dateModified']}")
+        add(item, 'updated', entry['dateModified'])
+        add(item, 'link', rel='alternate', type='text/html', href=entry['url'])
+        if entry['downloadUrl']:
+            add(item, 'link', rel='enclosure', href=entry['downloadUrl'])
+        add(item, 'summary', entry['summary'])
+
+    return ET.tostring(feed, encoding='unicode', xml_declaration=True) + '\n'
+
+
+def export_dataset(config, projects, output_path):
+    """
+    在详情片段目录中写入机器可读的数据:
+    projects.json 为所有项目的数据集，changes.json 为与上次运行相比新增、更新和下架的项目，
+    feed.xml 为最近更新的项目的 Atom 订阅源。
+    """
+    data_dir = get_fragments_dir(output_path)
+    os.makedirs(data_dir, exist_ok=True)
+    precompress = config['output'].get('precompress', True)
+    dataset_path = os.path.join(data_dir, DATASET_FILENAME)
+    generated_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    previous = None
+    if os.path.exists(dataset_path):
+        try:
+            with open(dataset_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except Exception as e:
+            print(f"读取上次的数据集失败，本次不生成变更: {e}")
+
+    entries = [build_dataset_entry(project) for project in projects]
+    if previous is not None:
+        added, updated, removed = diff_datasets(previous['projects'], entries)
+        changes = {
+            'generated': generated_at,
+            'since': previous['generated'],
+            'added': added,
+            'updated': updated,
+            'removed': removed
+        }
+        write_if_changed(os.path.join(data_dir, CHANGES_FILENAME), json.dumps(changes, ensure_ascii=False, separators=(',', ':')), precompress)
+        print(f"与上次相比: 新增 {len(added)} 个，更新 {len(updated)} 个，下架 {len(removed)} 个")
+
+    dataset = {'generated': generated_at, 'count': len(entries), 'projects': entries}
+    write_if_changed(dataset_path, json.dumps(dataset, ensure_ascii=False, separators=(',', ':')), precompress)
+    write_if_changed(os.path.join(data_dir, FEED_FILENAME), build_atom_feed(config, entries, generated_at), precompress)
+    print(f"数据集和订阅源已写入: {os.path.abspath(data_dir)}")
+
+
 def fetch_all_projects(config):
-    """获取所有项目，包括分页处理"""
-    all_projects = []
-    index = 0
-    total_count = None
+    """
+    获取所有项目，包括分页处理。
+    第一页返回总数后，其余页面并发请求，再按索引顺序拼接并按项目ID去重。
+    总数超过搜索窗口 (index + pageSize <= 10000) 时，将查询拆分为多个分片分别抓取。
+    """
     page_size = config['search']['pageSize']
     
     print(f"搜索关键词: {config['search']['searchFilter']}")
     print(f"搜索类别: {config['search']['classId']}")
     print(f"每页大小: {page_size}")
     
-    progress_bar = None
-    
-    while total_count is None or index < total_count:
-        current_page = index // page_size + 1
-        projects, total = fetch_projects_via_api(config, index)
-        
-        if not projects:
-            print("没有更多项目数据")
-            break
-            
-        all_projects.extend(projects)
-        
-        if total_count is None:
-            total_count = total
-            print(f"总共有 {total_count} 个项目")
-            # 初始化进度条
-            progress_bar = tqdm(total=total_count, desc="获取项目", unit="项目")
-            progress_bar.update(len(projects))
-        else:
-            progress_bar.update(len(projects))
-        
-        index += len(projects)
-        if len(projects) < page_size:  # 如果返回的项目数小于请求的页面大小，说明已经到达末尾
-            break
-    
-    if progress_bar is not None:
-        progress_bar.close()
-    
+    first_page, total_count = fetch_projects_via_api(config, 0)
+    if not first_page:
+        print("没有更多项目数据")
+        return []
+    print(f"总共有 {total_count} 个项目")
+
+    if total_count > SEARCH_WINDOW:
+        print(f"项目总数超过搜索窗口 {SEARCH_WINDOW}，使用分片抓取")
+        shards = plan_search_shards(config, first_page, total_count)
+    else:
+        shards = [({}, first_page, total_count)]
+
+    # 每个分片的第一页已经获取，其余页面统一放入同一个线程池
+    pages = {}
+    page_jobs = []
+    for shard_no, (overrides, shard_first_page, shard_total) in enumerate(shards):
+        pages[(shard_no, 0)] = shard_first_page
+        if len(shard_first_page) >= page_size:
+            last_index = min(shard_total, SEARCH_WINDOW - page_size + 1)
+            page_jobs += [(shard_no, overrides, index) for index in range(len(shard_first_page), last_index, page_size)]
+
+    expected = sum(min(shard_total, SEARCH_WINDOW) for _, _, shard_total in shards)
+    progress_bar = tqdm(total=expected, desc="获取项目", unit="项目")
+    progress_bar.update(sum(len(page) for page in pages.values()))
+    if page_jobs:
+        max_workers = min(get_page_workers(config), len(page_jobs))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {(shard_no, index): executor.submit(fetch_projects_via_api, config, index, overrides)
+                       for shard_no, overrides, index in page_jobs}
+            for key, future in futures.items():
+                projects, _ = future.result()
+                if not projects:
+                    print(f"分片 {key[0]} 索引 {key[1]} 处的页面没有返回数据")
+                pages[key] = projects
+                progress_bar.update(len(projects))
+
+    progress_bar.close()
+    all_projects = merge_project_pages(pages)
+    if len(all_projects) < total_count:
+        print(f"警告: 共获取 {len(all_projects)} 个项目，少于总数 {total_count}，部分项目可能缺失")
+    return all_projects
+
+
+def plan_search_shards(config, first_page, total_count):
+    """
+    将搜索拆分为每个都不超过搜索窗口的分片，返回 [(参数覆盖, 第一页, 总数)]。
+    依次按 config['sharding']['dimensions'] 中的维度（模组加载器、游戏版本）拆分，
+    仍然超过窗口的分片再按相反的排序方向各抓取一次，两端合计可覆盖两倍窗口。
+    拆分后各分片的总数之和少于拆分前时（如没有声明模组加载器的项目不属于任何加载器分片），
+    改用下一个维度拆分；没有维度能覆盖全部项目时，保留最后一次拆分的分片，
+    并按正反两个排序方向补充抓取拆分前的查询。
+    同一项目可能出现在多个分片中，合并时按ID去重。
+    """
+    sharding = config.get('sharding', {})
+    dimensions = sharding.get('dimensions', ['modLoaderType', 'gameVersion'])
+    reverse_order = 'asc' if config['search'].get('sortOrder', 'desc') == 'desc' else 'desc'
+    leaves = []
+    # (参数覆盖, 第一页, 总数, 下一个拆分维度的位置)
+    pending = [({}, first_page, total_count, 0)]
+
+    with ThreadPoolExecutor(max_workers=get_page_workers(config)) as executor:
+        while pending:
+            splits = []
+            reverse_shards = []
+            for shard in pending:
+                overrides, shard_first_page, shard_total, depth = shard
+                if shard_total <= SEARCH_WINDOW:
+                    leaves.append((overrides, shard_first_page, shard_total))
+                elif depth < len(dimensions):
+                    values = get_shard_values(config, dimensions[depth])
+                    splits.append((shard, [{**overrides, dimensions[depth]: value} for value in values]))
+                else:
+                    print(f"分片 {overrides or '(全部)'} 仍有 {shard_total} 个项目，按正反两个排序方向抓取")
+                    leaves.append((overrides, shard_first_page, shard_total))
+                    reverse_shards.append({**overrides, 'sortOrder': reverse_order})
+
+            # 并发探测下一层分片的第一页和总数
+            split_futures = [[executor.submit(fetch_projects_via_api, config, 0, child) for child in children]
+                             for _, children in splits]
+            reverse_futures = [(overrides, executor.submit(fetch_projects_via_api, config, 0, overrides))
+                               for overrides in reverse_shards]
+
+            pending = []
+            for ((overrides, shard_first_page, shard_total, depth), children), futures in zip(splits, split_futures):
+                results = [(child, *future.result()) for child, future in zip(children, futures)]
+                child_shards = [(child, page, total, depth + 1) for child, page, total in results if page]
+                covered = sum(total for _, page, total in results if page)
+                if covered >= shard_total:
+                    pending += child_shards
+                    continue
+                print(f"分片 {overrides or '(全部)'} 按 {dimensions[depth]} 拆分后合计 {covered} 个项目，"
+                      f"少于拆分前的 {shard_total} 个")
+                if depth + 1 < len(dimensions):
+                    print(f"改按 {dimensions[depth + 1]} 拆分")
+                    pending.append((overrides, shard_first_page, shard_total, depth + 1))
+                else:
+                    # 没有能覆盖全部项目的维度，拆分前的查询按正反两个排序方向补充缺少的项目
+                    pending += child_shards
+                    pending.append((overrides, shard_first_page, shard_total, len(dimensions)))
+
+            for overrides, future in reverse_futures:
+                shard_first_page, shard_total = future.result()
+                if shard_first_page:
+                    # 反向排序分片不再拆分
+                    leaves.append((overrides, shard_first_page, shard_total))
+
+    print(f"共拆分为 {len(leaves)} 个分片")
+    return leaves
+
+
+def get_shard_values(config, dimension):
+    """返回分片维度的取值列表"""
+    sharding = config.get('sharding', {})
+    if dimension == 'modLoaderType':
+        return sharding.get('modLoaderTypes', DEFAULT_SHARD_MOD_LOADER_TYPES)
+    if dimension == 'gameVersion':
+        return sharding.get('gameVersions') or fetch_game_versions(config)
+    return sharding.get(dimension, [])
+
+
+def fetch_game_versions(config):
+    """从CurseForge API获取Minecraft版本列表"""
+    try:
+        data = get_client(config).get('/minecraft/version')
+        return [version['versionString'] for version in data.get('data', [])]
+    except CurseForgeError as e:
+        print(f"获取Minecraft版本列表失败: {e}")
+        return []
+
+
+def merge_project_pages(pages):
+    """按页面索引顺序拼接项目，排名在抓取过程中变化导致的重复项目只保留第一次出现"""
+    all_projects = []
+    seen_ids = set()
+    for index in sorted(pages):
+        for project in pages[index]:
+            if project['id'] in seen_ids:
+                continue
+            seen_ids.add(project['id'])
+            all_projects.append(project)
     return all_projects
 
+
+def get_page_workers(config):
+    """返回并发请求搜索页面的最大线程数"""
+    return max(1, int(config.get('fetch', {}).get('page_workers', 4)))
+
+def get_report_path(config, listings):
+    """运行报告路径，报告目录相对于脚本目录；多个列表时报告名为 listings.report.json"""
+    report_dir = config.get('report', {}).get('dir', 'reports')
+    name = os.path.splitext(listings[0]['output']['filename'])[0] if len(listings) == 1 else 'listings'
+    return os.path.join(BASE_DIR, report_dir, name + '.report.json')
+
+
+def get_listings(config):
+    """
+    返回本次要生成的列表配置。
+    没有 config['listings'] 时只有顶层配置一个列表；否则每一项覆盖顶层配置中的同名设置
+    （字典按键合并，如只需写出 search 和 output 中不同的字段）。
+    """
+    if not config.get('listings'):
+        return [config]
+    base = {key: value for key, value in config.items() if key != 'listings'}
+    listings = []
+    for overrides in config['listings']:
+        listing = copy.deepcopy(base)
+        for key, value in overrides.items():
+            if isinstance(value, dict) and isinstance(listing.get(key), dict):
+                listing[key] = {**listing[key], **value}
+            else:
+                listing[key] = value
+        listings.append(listing)
+
+    filenames = [listing['output']['filename'] for listing in listings]
+    duplicates = {name for name in filenames if filenames.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"多个列表使用了相同的输出文件名: {', '.join(sorted(duplicates))}")
+    return listings
+
+
 def parse_arguments():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description='CurseForge项目爬取工具')
@@ -748,6 +2597,11 @@ def parse_arguments():
     parser.add_argument('--search', help='搜索关键词', default=None)
     parser.add_argument('--output', help='输出文件名', default=None)
     parser.add_argument('--non-interactive', help='非交互模式，不等待用户输入', action='store_true')
+    parser.add_argument('--full-rebuild', help='忽略缓存，重新获取所有项目详情', action='store_true')
+    parser.add_argument('--record', metavar='DIR', help='将API响应录制到指定目录', default=None)
+    parser.add_argument('--replay', metavar='DIR', help='从指定目录回放录制的API响应，不访问网络', default=None)
+    parser.add_argument('--report', metavar='PATH', help='运行报告的路径，默认为 reports/<输出文件名>.report.json', default=None)
+    parser.add_argument('--replay-latency', type=float, metavar='SECONDS', help='回放时为每个请求模拟的延迟（秒）', default=0.0)
     return parser.parse_args()
 
 def main():
@@ -771,32 +2625,78 @@ def main():
     # 加载配置
     config = load_config()
     
-    # 应用命令行参数覆盖配置
-    if args.search:
-        config['search']['searchFilter'] = args.search
-        print(f"使用命令行搜索关键词: {args.search}")
-    
-    if args.output:
-        config['output']['filename'] = args.output
-        print(f"使用命令行输出文件名: {args.output}")
+    # 应用命令行参数覆盖配置，只对单个列表的配置有效
+    if config.get('listings') and (args.search or args.output):
+        print("配置文件中定义了多个列表，忽略 --search 和 --output")
+    else:
+        if args.search:
+            config['search']['searchFilter'] = args.search
+            print(f"使用命令行搜索关键词: {args.search}")
+
+        if args.output:
+            config['output']['filename'] = args.output
+            print(f"使用命令行输出文件名: {args.output}")
     
-    # 检查API密钥
-    if not config['api']['key'] or config['api']['key'] == "xxx":
+    if args.record and args.replay:
+        print("--record 和 --replay 不能同时使用")
+        sys.exit(1)
+    if args.record or args.replay:
+        config.setdefault('fetch', {})['cassette'] = {
+            'mode': 'record' if args.record else 'replay',
+            'dir': os.path.abspath(args.record or args.replay),
+            'latency': args.replay_latency
+        }
+    replaying = config.get('fetch', {}).get('cassette', {}).get('mode') == 'replay'
+
+    # 检查API密钥，回放模式不需要
+    if not replaying and (not config['api']['key'] or config['api']['key'] == "xxx"):
         print("请先在配置文件中设置CurseForge API密钥")
         print(f"配置文件路径: {os.path.abspath(CONFIG_FILE)}")
         if not args.non_interactive:
             input("按任意键退出...")
         sys.exit(1)
     
-    print(f"正在获取{config['search']['searchFilter']}相关数据...")
-    projects = fetch_all_projects(config)
-    
-    if projects:
-        print(f"找到 {len(projects)} 个相关项目，正在生成HTML...")
-        output_file = generate_html(config, projects)
-        print(f"HTML文件已生成：{os.path.abspath(output_file)}")
-    else:
-        print("没有找到项目数据")
+    listings = get_listings(config)
+    # 所有列表共用同一个客户端（连接池和限流器）和项目详情缓存，同一项目只获取一次详情
+    cache = {} if args.full_rebuild else load_project_cache(config)
+    mirror_enabled = any(listing.get('mirror', {}).get('enabled', False) for listing in listings)
+    mirror_index = load_mirror_index(config) if mirror_enabled else {}
+    current_ids = set()
+    mirrored_ids = set()
+    status = 'failed'
+    try:
+        for listing in listings:
+            # 只有一个列表时阶段名不加前缀
+            prefix = f"{os.path.splitext(listing['output']['filename'])[0]}: " if len(listings) > 1 else ""
+            print(f"正在获取{listing['search']['searchFilter']}相关数据...")
+            with metrics.stage(prefix + 'fetch_all_projects'):
+                projects = fetch_all_projects(listing)
+
+            if projects:
+                current_ids.update(str(project['id']) for project in projects)
+                if listing.get('mirror', {}).get('enabled', False):
+                    with metrics.stage(prefix + 'mirror_files'):
+                        mirrored_ids.update(mirror_files(listing, projects, mirror_index))
+                print(f"找到 {len(projects)} 个相关项目，正在生成HTML...")
+                with metrics.stage(prefix + 'generate_html'):
+                    output_file = generate_html(listing, projects, cache)
+                print(f"HTML文件已生成：{os.path.abspath(output_file)}")
+                with metrics.stage(prefix + 'export_dataset'):
+                    export_dataset(listing, projects, output_file)
+            else:
+                print("没有找到项目数据")
+        status = 'succeeded'
+        # 只保留本次仍然存在于某个列表中的项目
+        cache = {pid: entry for pid, entry in cache.items() if pid in current_ids}
+        if mirror_enabled:
+            mirror_index = {pid: entry for pid, entry in mirror_index.items() if pid in mirrored_ids}
+            prune_mirror(config, mirror_index)
+    finally:
+        # 运行失败时也保存已经获取的详情和镜像索引（不清理），并写入报告，便于排查
+        save_project_cache(config, cache)
+        if mirror_enabled:
+            save_mirror_index(config, mirror_index)
+        metrics.write_report(args.report or get_report_path(config, listings), status)
     
     print("=" * 50)
     print("任务完成!")
@@ -823,4 +2723,6 @@ if __name__ == "__main__":
             try:
                 input("按回车键退出...")
             except EOFError:
-                pass  # 在非交互环境中忽略EOF错误
\ No newline at end of file
+                pass  # 在非交互环境中忽略EOF错误
+        # 以非零状态退出，避免CI发布不完整的页面
+        sys.exit(1)
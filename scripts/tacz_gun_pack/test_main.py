@@ -0,0 +1,167 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main as tacz
+
+MOD_LOADER_TYPES = [1, 4, 5, 6]
+GAME_VERSIONS = ["1.20.1", "1.21.1"]
+
+
+class FakeSearch:
+    """按 modLoaderType、gameVersion 和 sortOrder 筛选的搜索接口，每 5 个项目中有 1 个没有声明模组加载器"""
+
+    def __init__(self, count):
+        self.projects = [
+            {
+                "id": i,
+                "loader": None if i % 5 == 0 else MOD_LOADER_TYPES[i % 4],
+                "version": GAME_VERSIONS[i % 2],
+            }
+            for i in range(count)
+        ]
+        self.queries = []
+
+    def __call__(self, config, index=0, overrides=None):
+        params = {**config["search"], **(overrides or {})}
+        self.queries.append(overrides or {})
+        matched = [
+            project for project in self.projects
+            if params.get("modLoaderType") in (None, project["loader"])
+            and params.get("gameVersion") in (None, project["version"])
+        ]
+        matched.sort(key=lambda project: project["id"], reverse=params.get("sortOrder", "desc") == "desc")
+        page_size = params["pageSize"]
+        assert index + page_size <= tacz.SEARCH_WINDOW
+        return [{"id": project["id"]} for project in matched[index:index + page_size]], len(matched)
+
+
+def make_config(**sharding):
+    return {
+        "search": {"searchFilter": "tacz", "classId": 4546, "pageSize": 50, "sortOrder": "desc"},
+        "sharding": {"dimensions": ["modLoaderType", "gameVersion"], "gameVersions": GAME_VERSIONS, **sharding},
+        "fetch": {"page_workers": 2},
+    }
+
+
+@mock.patch.object(tacz, "SEARCH_WINDOW", 100)
+class SearchShardTest(unittest.TestCase):
+    def test_loader_split_missing_projects_falls_back_to_next_dimension(self):
+        search = FakeSearch(300)
+        with mock.patch.object(tacz, "fetch_projects_via_api", search):
+            projects = tacz.fetch_all_projects(make_config())
+        self.assertEqual(sorted(project["id"] for project in projects), list(range(300)))
+
+    def test_remainder_query_when_no_dimension_covers_everything(self):
+        search = FakeSearch(300)
+        with mock.patch.object(tacz, "fetch_projects_via_api", search):
+            first_page, total = search(make_config(), 0)
+            shards = tacz.plan_search_shards(make_config(gameVersions=["1.20.1"]), first_page, total)
+        overrides = [shard[0] for shard in shards]
+        # 拆分前的查询按正反两个排序方向补充
+        self.assertIn({}, overrides)
+        self.assertIn({"sortOrder": "asc"}, overrides)
+        self.assertIn({"gameVersion": "1.20.1"}, overrides)
+
+
+class DescriptionSanitizerTest(unittest.TestCase):
+    def test_dropped_void_tags_do_not_swallow_following_content(self):
+        self.assertEqual(tacz.sanitize_description('<object><embed src="x.swf"></object><p>after</p>'), "<p>after</p>")
+        self.assertIn("<p>after frame</p>", tacz.sanitize_description("<p>a<frame src=x><p>after frame</p>"))
+        self.assertEqual(tacz.sanitize_description('<embed src="x.swf" /><p>z</p>'), "<p>z</p>")
+
+    def test_dropped_tags_removed_with_content(self):
+        self.assertEqual(tacz.sanitize_description("<script>alert(1)</script><p>ok</p>"), "<p>ok</p>")
+        self.assertEqual(tacz.sanitize_description("<object><object>x</object>y</object><p>ok</p>"), "<p>ok</p>")
+
+    def test_style_whitelist(self):
+        result = tacz.sanitize_description(
+            '<div style="position:fixed;top:0;left:0;width:100%;height:100%;z-index:9999;color:red">x</div>')
+        self.assertNotIn("position", result)
+        self.assertNotIn("z-index", result)
+        self.assertIn("color:red", result)
+
+    def test_style_values_filtered(self):
+        result = tacz.sanitize_description(
+            '<p style="background-color:url(x);margin:-500px 0;font-weight:bold;color:\\72 ed">y</p>')
+        self.assertEqual(result, '<p style="font-weight:bold">y</p>')
+        self.assertEqual(tacz.sanitize_description('<p style="position:absolute">y</p>'), "<p>y</p>")
+
+    def test_events_and_urls_removed(self):
+        result = tacz.sanitize_description('<a href="javascript:alert(1)" onclick="x()">link</a><img src="//cdn/x.png">')
+        self.assertEqual(result, '<a>link</a><img src="https://cdn/x.png" style="max-width:100%; height:auto;" loading="lazy">')
+
+    def test_iframe_host_allowlist(self):
+        allowed = tacz.sanitize_description('<iframe src="https://www.youtube.com/embed/x"></iframe>')
+        self.assertIn('<iframe src="https://www.youtube.com/embed/x"', allowed)
+        for src in [
+            "https://evil.com?.youtube.com",
+            "https://evil.com#.youtube.com",
+            "https://evil.com\\.youtube.com/",
+            "https://www.youtube.com@evil.com/",
+            "https://user@www.youtube.com/embed/x",
+            "https://www.youtube.com\t/embed/x",
+            "http://www.youtube.com/embed/x",
+        ]:
+            with self.subTest(src=src):
+                result = tacz.sanitize_description(f'<iframe src="{src}">x</iframe><p>after</p>')
+                self.assertEqual(result, "<p>after</p>")
+
+    def test_unclosed_tags_and_truncation(self):
+        self.assertEqual(tacz.sanitize_description("<p><b>bold"), "<p><b>bold</b></p>")
+        result = tacz.sanitize_description("<p>" + "a" * 100 + "</p>", max_length=20)
+        self.assertTrue(result.startswith("<p>" + "a" * 17 + "</p>"))
+        self.assertIn("已截断", result)
+
+
+class ProjectDetailsTest(unittest.TestCase):
+    def test_closing_generator_cancels_pending_requests(self):
+        projects = [{"id": i, "iso_date": "2024-01-01T00:00:00Z"} for i in range(20)]
+        fetched = []
+
+        def fetch(config, project, cached):
+            fetched.append(project["id"])
+            time.sleep(0.01)
+            return {"description": "", "description_hash": "", "complete": True, "screenshots": [], "download_url": None}
+
+        with mock.patch.object(tacz, "fetch_project_details", fetch), \
+                mock.patch.object(tacz, "fill_missing_media"), \
+                mock.patch.object(tacz, "get_max_workers", return_value=1):
+            details_iter = tacz.fetch_all_project_details({}, projects, {})
+            next(details_iter)
+            details_iter.close()
+        # 只有已经开始的请求会完成，其余请求被取消
+        self.assertLess(len(fetched), 5)
+
+
+class AssetTest(unittest.TestCase):
+    def test_old_assets_kept_until_pruned_and_one_generation_retained(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = os.path.join(tmp_dir, "page.html")
+            assets_dir = os.path.join(tmp_dir, "page", "assets")
+            names = []
+            for generation in range(3):
+                url = tacz.write_asset(output_path, "style.css", f"body{{margin:{generation}}}", precompress=True)
+                names.append(os.path.basename(url))
+                # 写入新资源时不删除旧版本，页面替换后才清理
+                self.assertTrue(all(os.path.exists(os.path.join(assets_dir, name)) for name in names))
+                tacz.prune_assets(output_path, [names[-1]])
+
+            files = set(os.listdir(assets_dir))
+            self.assertNotIn(names[0], files)
+            self.assertNotIn(names[0] + ".gz", files)
+            self.assertIn(names[1], files)
+            self.assertIn(names[2] + ".gz", files)
+
+            # 内容不变时不会把上一代当作过期资源删除
+            tacz.prune_assets(output_path, [names[2]])
+            self.assertIn(names[1], os.listdir(assets_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()